@@ -0,0 +1,157 @@
+# benchmarks/mock_server.py
+
+import asyncio
+import json
+import random
+import zlib
+from dataclasses import dataclass, asdict
+from typing import List
+from urllib.parse import urlsplit
+
+AVAILABLE_TITLE = b"<title>Page Not Found &bull; Instagram</title>"
+TAKEN_TITLE = b'<meta property="og:type" content="profile" /><title>Instagram</title>'
+
+
+@dataclass
+class MockConfig:
+    """
+    Mahalliy Instagram o'rnini bosuvchi server va soxta proksilar sozlamalari.
+    Kechikish log-normal taqsimotda: mediana latency_ms, tarqoqlik latency_sigma.
+    """
+    proxies: int = 20
+    dead_proxies: int = 0
+    latency_ms: float = 50.0
+    latency_sigma: float = 0.5
+    proxy_spread: float = 2.0
+    rate_429: float = 0.0
+    retry_after: float = 1.0
+    page_kb: int = 64
+    available_ratio: float = 0.1
+    fail_rate: float = 0.0
+    seed: int = 1
+
+    def to_dict(self) -> dict:
+        return asdict(self)
+
+
+class MockServer:
+    """
+    Bitta jarayon ichida origin port va har bir soxta proksi uchun alohida port ochadi.
+    httpx oddiy http:// manzilni proksi orqali so'raganda so'rov qatorida to'liq URL (absolute-form)
+    yuboradi, shuning uchun proksi porti javobni o'zi qaytaradi: tarmoq jihatidan bu haqiqiy
+    proksidan farq qilmaydi, lekin kechikish va xatolar proksi bo'yicha boshqariladi.
+    """
+    def __init__(self, config: MockConfig):
+        self.config = config
+        self.random = random.Random(config.seed)
+        page = max(config.page_kb * 1024, 512)
+        filler = b"<div>" + b"x" * 1018 + b"</div>"
+        padding = (filler * (page // len(filler) + 1))[:page]
+        self.available_body = b"<html><head>" + AVAILABLE_TITLE + b"</head><body>" + padding + b"</body></html>"
+        self.taken_body = b"<html><head>" + TAKEN_TITLE + b"</head><body>" + padding + b"</body></html>"
+        self.stats = {"requests": 0, "available": 0, "taken": 0, "throttled": 0, "failed": 0,
+                      "dead_rejects": 0, "bytes_sent": 0, "connections": 0}
+        self.origin_port = None
+        self.proxy_ports: List[int] = []
+        self._servers = []
+
+    def is_available(self, username: str) -> bool:
+        # Deterministik: bir xil username har doim bir xil natija beradi
+        return zlib.crc32(username.encode()) % 10000 < self.config.available_ratio * 10000
+
+    async def start(self, host: str = "127.0.0.1"):
+        origin = await asyncio.start_server(lambda r, w: self._serve(r, w, 1.0), host, 0)
+        self._servers.append(origin)
+        self.origin_port = origin.sockets[0].getsockname()[1]
+        for index in range(self.config.proxies):
+            if index < self.config.dead_proxies:
+                handler = self._reject
+            else:
+                factor = self.random.uniform(1.0, max(1.0, self.config.proxy_spread))
+                handler = (lambda f: lambda r, w: self._serve(r, w, f))(factor)
+            server = await asyncio.start_server(handler, host, 0)
+            self._servers.append(server)
+            self.proxy_ports.append(server.sockets[0].getsockname()[1])
+
+    async def _reject(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        self.stats["dead_rejects"] += 1
+        writer.transport.abort()
+
+    def _latency(self, factor: float) -> float:
+        if self.config.latency_ms <= 0:
+            return 0.0
+        median = self.config.latency_ms / 1000 * factor
+        return median * self.random.lognormvariate(0.0, self.config.latency_sigma)
+
+    async def _serve(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter, factor: float):
+        self.stats["connections"] += 1
+        try:
+            while True:
+                request_line = await reader.readline()
+                if not request_line:
+                    break
+                while (await reader.readline()) not in (b"\r\n", b"\n", b""):
+                    pass
+                parts = request_line.decode("latin-1").split()
+                path = urlsplit(parts[1]).path if len(parts) > 1 else "/"
+                if path == "/__stats":
+                    self._write(writer, 200, json.dumps(self.stats).encode(), b"application/json")
+                    await writer.drain()
+                    continue
+
+                self.stats["requests"] += 1
+                await asyncio.sleep(self._latency(factor))
+                roll = self.random.random()
+                if roll < self.config.fail_rate:
+                    self.stats["failed"] += 1
+                    writer.transport.abort()
+                    return
+                if roll < self.config.fail_rate + self.config.rate_429:
+                    self.stats["throttled"] += 1
+                    self._write(writer, 429, b"Too Many Requests", extra=f"Retry-After: {self.config.retry_after:g}\r\n")
+                else:
+                    username = path.strip("/")
+                    if self.is_available(username):
+                        self.stats["available"] += 1
+                        self._write(writer, 200, self.available_body)
+                    else:
+                        self.stats["taken"] += 1
+                        self._write(writer, 200, self.taken_body)
+                await writer.drain()
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            writer.close()
+
+    def _write(self, writer: asyncio.StreamWriter, status: int, body: bytes,
+               content_type: bytes = b"text/html", extra: str = ""):
+        reason = {200: "OK", 429: "Too Many Requests"}.get(status, "")
+        head = (f"HTTP/1.1 {status} {reason}\r\nContent-Type: {content_type.decode()}\r\n"
+                f"Content-Length: {len(body)}\r\n{extra}\r\n").encode()
+        writer.write(head + body)
+        self.stats["bytes_sent"] += len(head) + len(body)
+
+    async def serve_forever(self):
+        await asyncio.gather(*(server.serve_forever() for server in self._servers))
+
+    async def close(self):
+        for server in self._servers:
+            server.close()
+            await server.wait_closed()
+
+
+def run_mock_server(config_dict: dict, ready_queue):
+    """
+    Alohida jarayon uchun kirish nuqtasi: portlarni ready_queue'ga yuboradi va to'xtatilguncha ishlaydi.
+    Server benchmark o'lchovlari bilan bitta CPU'ni bo'lishmasligi uchun alohida jarayonda turadi.
+    """
+    async def main():
+        server = MockServer(MockConfig(**config_dict))
+        await server.start()
+        ready_queue.put((server.origin_port, server.proxy_ports))
+        await server.serve_forever()
+
+    try:
+        asyncio.run(main())
+    except KeyboardInterrupt:
+        pass
@@ -0,0 +1,365 @@
+# benchmarks/run_benchmarks.py
+
+"""
+Oflayn o'tkazuvchanlik benchmark'i. Mahalliy Instagram o'rnini bosuvchi server va soxta proksilar
+ishga tushiriladi, so'ng har bir ssenariy alohida jarayonda bajariladi va natija JSON ko'rinishida chiqariladi:
+
+    python benchmarks/run_benchmarks.py --usernames 100000 --proxies 50 --rate-429 0.01 --output bench.json
+
+Ssenariylar:
+    proxy    - ProxyHandler.get_random_proxy / report_* mikrobenchmark'i (tarmoqsiz)
+    db       - DBManager.save_results paketli yozish tezligi
+    checker  - CheckPipeline + check_username_with_retries mock server orqali
+    e2e      - run_all.main to'liq (--workers bilan shard rejimi ham)
+"""
+
+import argparse
+import asyncio
+import json
+import multiprocessing
+import os
+import platform
+import random
+import resource
+import shutil
+import sqlite3
+import subprocess
+import sys
+import tempfile
+import time
+from typing import Dict, List, Optional
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+sys.path.append(ROOT)
+
+from benchmarks.mock_server import MockConfig, run_mock_server
+
+SCENARIOS = ("proxy", "db", "checker", "e2e")
+
+
+def percentiles(values: List[float]) -> Dict[str, Optional[float]]:
+    if not values:
+        return {"p50": None, "p95": None, "p99": None, "max": None}
+    ordered = sorted(values)
+
+    def pick(q):
+        return round(ordered[min(len(ordered) - 1, int(q * len(ordered)))] * 1000, 3)
+
+    return {"p50": pick(0.50), "p95": pick(0.95), "p99": pick(0.99), "max": round(ordered[-1] * 1000, 3)}
+
+
+def memory_peak_mb() -> dict:
+    # Linux'da ru_maxrss kilobaytlarda
+    scale = 1024 * 1024 if sys.platform == "darwin" else 1024
+    return {
+        "self": round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / scale, 1),
+        "children": round(resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss / scale, 1),
+    }
+
+
+def write_usernames(path: str, count: int, seed: int = 1):
+    rng = random.Random(seed)
+    alphabet = "abcdefghijklmnopqrstuvwxyz0123456789_"
+    with open(path, "w") as f:
+        for i in range(count):
+            f.write(f"{''.join(rng.choices(alphabet, k=rng.randint(3, 10)))}{i:x}\n")
+
+
+def write_proxies(path: str, ports: List[int]):
+    with open(path, "w") as f:
+        for port in ports:
+            f.write(f"http://127.0.0.1:{port}\n")
+
+
+def scenario_env(options: dict, origin_port: int, workdir: str) -> Dict[str, str]:
+    # Tezlik cheklovlari mock serverga moslab yuqori qo'yiladi: o'lchanadigan narsa kodning o'zi
+    return {
+        "INSTAGRAM_BASE_URL": f"http://127.0.0.1:{origin_port}",
+        "CHECK_WORKERS": str(options["concurrency"]),
+        "PROXY_COOLDOWN": str(options["proxy_cooldown"]),
+        "PROXY_OPEN_TIME": "5",
+        "PROXY_STATS_PATH": os.path.join(workdir, "proxy_stats.json"),
+        # Pre-flight tekshiruvi username so'rovlari statistikasiga tushmasligi uchun xizmat manzili ishlatiladi
+        "PROXY_PROBE_URL": f"http://127.0.0.1:{origin_port}/__stats",
+        "PROXY_PROBE_CACHE": os.path.join(workdir, "proxy_probe.json"),
+        "RATE_LIMIT_GLOBAL": str(options["rate_global"]),
+        "RATE_LIMIT_GLOBAL_MAX": str(options["rate_global"]),
+        "RATE_LIMIT_PER_PROXY": str(options["rate_proxy"]),
+        "RATE_LIMIT_PER_PROXY_MAX": str(options["rate_proxy"]),
+        "HTTP_TIMEOUT": str(options["http_timeout"]),
+        "DB_BATCH_SIZE": str(options["db_batch"]),
+        "CHECKPOINT_EVERY": "1000",
+        "TQDM_DISABLE": "1",
+    }
+
+
+def bench_proxy(options: dict, workdir: str) -> dict:
+    from scripts.proxy_handler import ProxyHandler
+
+    proxies_path = os.path.join(workdir, "proxies.txt")
+    write_proxies(proxies_path, range(10000, 10000 + options["proxy_pool"]))
+    handler = ProxyHandler(proxies_path, cooldown_time=options["proxy_cooldown"],
+                           stats_path=os.path.join(workdir, "proxy_stats.json"), max_trips=10 ** 9)
+    rng = random.Random(1)
+    ops = options["usernames"]
+    samples = []
+    start = time.perf_counter()
+    for _ in range(ops):
+        t0 = time.perf_counter()
+        proxy = handler.get_random_proxy()
+        if proxy:
+            if rng.random() < 0.02:
+                handler.report_failure(proxy, "ConnectError")
+            else:
+                handler.report_success(proxy, rng.uniform(0.05, 0.5))
+        samples.append(time.perf_counter() - t0)
+    elapsed = time.perf_counter() - start
+    return {"operations": ops, "elapsed_s": round(elapsed, 3), "throughput_per_s": round(ops / elapsed, 1),
+            "latency_ms": percentiles(samples), "proxy_pool": options["proxy_pool"]}
+
+
+def bench_db(options: dict, workdir: str) -> dict:
+    from scripts.db_manager import DBManager
+
+    db_manager = DBManager(os.path.join(workdir, "results.db"))
+    batch = options["db_batch"]
+    total = options["usernames"]
+    samples = []
+    start = time.perf_counter()
+    checked_at = "2024-01-01T00:00:00"
+    for first in range(0, total, batch):
+        rows = [(f"user{i}", "taken", checked_at) for i in range(first, min(first + batch, total))]
+        t0 = time.perf_counter()
+        db_manager.save_results(rows)
+        samples.append(time.perf_counter() - t0)
+    elapsed = time.perf_counter() - start
+    db_manager.close()
+    return {"rows": total, "batch_size": batch, "elapsed_s": round(elapsed, 3),
+            "db_rows_per_s": round(total / elapsed, 1), "flush_latency_ms": percentiles(samples)}
+
+
+def _timed_checker(samples: List[float]):
+    # check_pipeline modulidagi nom almashtiriladi: CheckPipeline.check aynan shu funksiyani chaqiradi
+    import scripts.check_pipeline as check_pipeline
+    original = check_pipeline.check_username_with_retries
+
+    async def timed(*args, **kwargs):
+        t0 = time.perf_counter()
+        try:
+            return await original(*args, **kwargs)
+        finally:
+            samples.append(time.perf_counter() - t0)
+
+    check_pipeline.check_username_with_retries = timed
+
+
+def _count_results(db_path: str) -> int:
+    with sqlite3.connect(db_path) as conn:
+        return conn.execute("SELECT COUNT(*) FROM results").fetchone()[0]
+
+
+def bench_checker(options: dict, workdir: str, proxy_ports: List[int]) -> dict:
+    from scripts.check_pipeline import (CheckPipeline, create_proxy_handler, create_client_pool,
+                                        create_classifier, create_rate_limiter)
+    from scripts.db_manager import DBManager, ResultWriter
+
+    proxies_path = os.path.join(workdir, "proxies.txt")
+    write_proxies(proxies_path, proxy_ports)
+    db_path = os.path.join(workdir, "results.db")
+    samples: List[float] = []
+    _timed_checker(samples)
+
+    async def run():
+        db_manager = DBManager(db_path)
+        writer = ResultWriter(db_manager, batch_size=options["db_batch"])
+        classifier = create_classifier()
+        pipeline = CheckPipeline(create_proxy_handler(proxies_path), create_client_pool(), classifier,
+                                 create_rate_limiter(), worker_count=options["concurrency"])
+        counters = {"ok": 0, "none": 0, "errors": 0}
+
+        def on_result(item, result):
+            if isinstance(result, Exception):
+                counters["errors"] += 1
+            elif result:
+                counters["ok"] += 1
+                writer.submit(item[-1], result)
+            else:
+                counters["none"] += 1
+
+        writer.start()
+        start = time.perf_counter()
+        try:
+            await pipeline.run(((i, f"user{i:x}") for i in range(options["usernames"])), on_result)
+        finally:
+            await pipeline.aclose()
+            await writer.close()
+            db_manager.close()
+        elapsed = time.perf_counter() - start
+        return elapsed, counters, writer, classifier, pipeline
+
+    elapsed, counters, writer, classifier, pipeline = asyncio.run(run())
+    return {"usernames": options["usernames"], "elapsed_s": round(elapsed, 3),
+            "throughput_per_s": round(options["usernames"] / elapsed, 1),
+            "latency_ms": percentiles(samples), "results": counters,
+            "db_rows_written": writer.written, "db_rows_per_s": round(writer.written / elapsed, 1),
+            "exhausted": pipeline.exhausted, "bandwidth": classifier.stats.as_dict()}
+
+
+def bench_e2e(options: dict, workdir: str, proxy_ports: List[int]) -> dict:
+    proxies_path = os.path.join(workdir, "proxies.txt")
+    usernames_path = os.path.join(workdir, "usernames.txt")
+    db_path = os.path.join(workdir, "results.db")
+    write_proxies(proxies_path, proxy_ports)
+    write_usernames(usernames_path, options["usernames"])
+    os.environ.update({
+        "PROXY_LIST_PATH": proxies_path,
+        "USERNAME_LIST_PATH": usernames_path,
+        "OUTPUT_DB_PATH": db_path,
+        "METADATA_PATH": os.path.join(workdir, "output", "run_metadata.json"),
+        "LOG_FILE_PATH": os.path.join(workdir, "logs", "checker.log"),
+        "ERROR_LOG_PATH": os.path.join(workdir, "logs", "errors.log"),
+        "TELEGRAM_BOT_TOKEN": "benchmark",
+        "TELEGRAM_CHAT_ID": "benchmark",
+    })
+
+    # Benchmark tashqi tarmoqqa chiqmasligi kerak
+    from scripts.telegram_notifier import TelegramNotifier
+    TelegramNotifier.send_message = lambda self, message, key=None: False
+
+    samples: List[float] = []
+    _timed_checker(samples)
+    from scripts import run_all
+    import logging
+    logging.getLogger().setLevel(logging.WARNING)
+
+    start = time.perf_counter()
+    asyncio.run(run_all.main(workers=options["workers"]))
+    elapsed = time.perf_counter() - start
+    rows = _count_results(db_path)
+    return {"usernames": options["usernames"], "workers": options["workers"], "elapsed_s": round(elapsed, 3),
+            "throughput_per_s": round(options["usernames"] / elapsed, 1),
+            # Shard rejimida tekshiruvlar bola jarayonlarda bajariladi, kechikish faqat bitta jarayonda o'lchanadi
+            "latency_ms": percentiles(samples) if options["workers"] == 1 else None,
+            "db_rows_written": rows, "db_rows_per_s": round(rows / elapsed, 1)}
+
+
+def _scenario_main(name: str, options: dict, origin_port: int, proxy_ports: List[int], result_queue):
+    workdir = tempfile.mkdtemp(prefix=f"bench-{name}-")
+    try:
+        os.chdir(workdir)
+        os.environ.update(scenario_env(options, origin_port, workdir))
+        if name == "proxy":
+            result = bench_proxy(options, workdir)
+        elif name == "db":
+            result = bench_db(options, workdir)
+        elif name == "checker":
+            result = bench_checker(options, workdir, proxy_ports)
+        else:
+            result = bench_e2e(options, workdir, proxy_ports)
+        result["memory_peak_mb"] = memory_peak_mb()
+        result_queue.put((name, result))
+    except BaseException as e:
+        result_queue.put((name, {"error": f"{type(e).__name__}: {e}"}))
+        raise
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+
+def _server_stats(origin_port: int) -> dict:
+    import httpx
+    try:
+        return httpx.get(f"http://127.0.0.1:{origin_port}/__stats", timeout=5).json()
+    except httpx.HTTPError:
+        return {}
+
+
+def _git_commit() -> Optional[str]:
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=ROOT, capture_output=True,
+                              text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def run(options: dict, mock_config: MockConfig, scenarios) -> dict:
+    ctx = multiprocessing.get_context("spawn")
+    ready_queue = ctx.Queue()
+    server = ctx.Process(target=run_mock_server, args=(mock_config.to_dict(), ready_queue), daemon=True)
+    server.start()
+    origin_port, proxy_ports = ready_queue.get(timeout=30)
+
+    report = {"commit": _git_commit(), "python": platform.python_version(), "platform": platform.platform(),
+              "started_at": time.strftime("%Y-%m-%dT%H:%M:%S"), "options": options,
+              "mock": mock_config.to_dict(), "scenarios": {}}
+    try:
+        for name in scenarios:
+            before = _server_stats(origin_port)
+            result_queue = ctx.Queue()
+            process = ctx.Process(target=_scenario_main, name=f"bench-{name}",
+                                  args=(name, options, origin_port, proxy_ports, result_queue))
+            process.start()
+            _, result = result_queue.get()
+            process.join()
+            after = _server_stats(origin_port)
+            if name in ("checker", "e2e"):
+                result["server"] = {key: after.get(key, 0) - before.get(key, 0) for key in after}
+            report["scenarios"][name] = result
+            print(f"[{name}] {json.dumps(result)}", file=sys.stderr)
+    finally:
+        server.terminate()
+        server.join()
+    return report
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Oflayn o'tkazuvchanlik benchmark'i")
+    parser.add_argument("--scenarios", default=",".join(SCENARIOS), help="Vergul bilan: proxy,db,checker,e2e")
+    parser.add_argument("--usernames", type=int, default=10000, help="Tekshiriladigan usernamelar soni")
+    parser.add_argument("--concurrency", type=int, default=200, help="CHECK_WORKERS qiymati")
+    parser.add_argument("--workers", type=int, default=1, help="e2e uchun jarayonlar (shard) soni")
+    parser.add_argument("--proxy-pool", type=int, default=10000, help="proxy ssenariysidagi proksilar soni")
+    parser.add_argument("--proxy-cooldown", type=float, default=0.0)
+    parser.add_argument("--rate-global", type=float, default=100000.0)
+    parser.add_argument("--rate-proxy", type=float, default=100000.0)
+    parser.add_argument("--http-timeout", type=float, default=15.0)
+    parser.add_argument("--db-batch", type=int, default=500)
+    parser.add_argument("--proxies", type=int, default=20, help="Soxta proksilar soni")
+    parser.add_argument("--dead-proxies", type=int, default=0, help="Ulanishni darhol uzadigan proksilar soni")
+    parser.add_argument("--latency-ms", type=float, default=50.0, help="Javob kechikishi medianasi (ms)")
+    parser.add_argument("--latency-sigma", type=float, default=0.5, help="Log-normal taqsimot tarqoqligi")
+    parser.add_argument("--proxy-spread", type=float, default=2.0, help="Eng sekin proksi necha barobar sekin")
+    parser.add_argument("--rate-429", type=float, default=0.0, help="429 javoblar ulushi")
+    parser.add_argument("--retry-after", type=float, default=1.0)
+    parser.add_argument("--page-kb", type=int, default=64, help="Sahifa hajmi (KB)")
+    parser.add_argument("--available-ratio", type=float, default=0.1)
+    parser.add_argument("--fail-rate", type=float, default=0.0, help="Ulanish uzilishi ulushi")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--output", help="JSON natija fayli (berilmasa stdout)")
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    scenarios = [s.strip() for s in args.scenarios.split(",") if s.strip()]
+    unknown = set(scenarios) - set(SCENARIOS)
+    if unknown:
+        raise SystemExit(f"Noma'lum ssenariy: {', '.join(sorted(unknown))}")
+    mock_config = MockConfig(proxies=args.proxies, dead_proxies=args.dead_proxies, latency_ms=args.latency_ms,
+                             latency_sigma=args.latency_sigma, proxy_spread=args.proxy_spread,
+                             rate_429=args.rate_429, retry_after=args.retry_after, page_kb=args.page_kb,
+                             available_ratio=args.available_ratio, fail_rate=args.fail_rate, seed=args.seed)
+    options = {"usernames": args.usernames, "concurrency": args.concurrency, "workers": args.workers,
+               "proxy_pool": args.proxy_pool, "proxy_cooldown": args.proxy_cooldown,
+               "rate_global": args.rate_global, "rate_proxy": args.rate_proxy,
+               "http_timeout": args.http_timeout, "db_batch": args.db_batch}
+    report = run(options, mock_config, scenarios)
+    output = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(output + "\n")
+    else:
+        print(output)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,123 @@
+# scripts/async_utils.py
+
+import asyncio
+import functools
+import logging
+import os
+import sys
+import threading
+import time
+import traceback
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Optional
+
+from scripts.metrics import REGISTRY
+
+watchdog_logger = logging.getLogger(__name__)
+
+LOOP_STALLS = REGISTRY.counter("event_loop_stalls_total", "Event loop chegaradan uzoq bloklangan holatlar")
+
+_executor: Optional[ThreadPoolExecutor] = None
+_executor_lock = threading.Lock()
+
+
+def get_blocking_executor() -> ThreadPoolExecutor:
+    # Bloklovchi ishlar uchun cheklangan pool: SQLite, hisobot va fayl I/O event loop'ni to'xtatmaydi
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(max_workers=int(os.getenv("BLOCKING_POOL_SIZE", "4")),
+                                           thread_name_prefix="blocking")
+        return _executor
+
+
+async def run_blocking(func: Callable[..., Any], *args, **kwargs) -> Any:
+    """
+    Bloklovchi funksiyani cheklangan thread pool'da bajaradi va natijasini kutadi.
+    """
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(get_blocking_executor(), functools.partial(func, *args, **kwargs))
+
+
+async def async_safe_execute(func: Callable[..., Any], *args, retries: int = 3, delay: float = 5, **kwargs) -> Any:
+    """
+    error_handler.safe_execute'ning asinxron varianti: urinishlar orasida asyncio.sleep ishlatiladi,
+    oddiy (sinxron) funksiyalar esa thread pool'da bajariladi.
+    """
+    name = getattr(func, "__name__", repr(func))
+    for i in range(retries):
+        try:
+            if asyncio.iscoroutinefunction(func):
+                return await func(*args, **kwargs)
+            return await run_blocking(func, *args, **kwargs)
+        except Exception as e:
+            logging.error(f"Xato yuz berdi ({name}): {e}. Qayta urinish {i + 1}/{retries} dan so'ng.")
+            if i + 1 < retries:
+                await asyncio.sleep(delay)
+
+    logging.error(f"Funksiya {name} {retries} marta qayta urinishdan keyin ham muvaffaqiyatsiz tugadi.")
+    return None
+
+
+class LoopWatchdog:
+    """
+    Event loop'ni kuzatuvchi alohida thread. Loop har interval soniyada "yurak urishi"ni yangilaydi;
+    u threshold'dan uzoq yangilanmasa, loop thread'ining joriy stack'i log'ga yoziladi -
+    aynan qaysi chaqiruv loop'ni bloklayotgani ko'rinadi.
+    """
+    def __init__(self, threshold: float = 0.5, interval: float = 0.1):
+        self.threshold = threshold
+        self.interval = interval
+        self.stalls = 0
+        self._heartbeat = time.monotonic()
+        self._loop_thread_id: Optional[int] = None
+        self._task: Optional[asyncio.Task] = None
+        self._thread: Optional[threading.Thread] = None
+        self._stop = threading.Event()
+
+    def start(self):
+        if self._task is not None or self.threshold <= 0:
+            return
+        self._loop_thread_id = threading.get_ident()
+        self._heartbeat = time.monotonic()
+        self._stop.clear()
+        self._task = asyncio.get_running_loop().create_task(self._beat())
+        self._thread = threading.Thread(target=self._watch, name="loop-watchdog", daemon=True)
+        self._thread.start()
+
+    async def _beat(self):
+        while True:
+            self._heartbeat = time.monotonic()
+            await asyncio.sleep(self.interval)
+
+    def _watch(self):
+        reported = None
+        while not self._stop.wait(self.interval):
+            heartbeat = self._heartbeat
+            blocked = time.monotonic() - heartbeat
+            if blocked < self.threshold + self.interval or reported == heartbeat:
+                continue
+            # Bitta bloklanish uchun faqat bir marta yoziladi
+            reported = heartbeat
+            self.stalls += 1
+            LOOP_STALLS.inc()
+            frame = sys._current_frames().get(self._loop_thread_id)
+            stack = "".join(traceback.format_stack(frame)) if frame is not None else "(stack topilmadi)"
+            watchdog_logger.warning(f"Event loop {blocked:.2f} s dan beri bloklangan. Joriy stack:\n{stack}")
+
+    async def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout=1)
+            self._thread = None
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+
+def create_loop_watchdog() -> LoopWatchdog:
+    return LoopWatchdog(threshold=float(os.getenv("LOOP_WATCHDOG_THRESHOLD", "0.5")))
@@ -0,0 +1,163 @@
+# scripts/check_pipeline.py
+
+import os
+import asyncio
+import logging
+from datetime import timedelta
+from typing import Any, Callable, Optional, Tuple
+
+from scripts.proxy_handler import ProxyHandler
+from scripts.proxy_prober import ProxyProber
+from scripts.username_checker import INSTAGRAM_BASE_URL, check_username_with_retries
+from scripts.http_client_pool import ClientPool
+from scripts.work_queue import WorkQueue
+from scripts.response_classifier import (DEFAULT_AVAILABLE_MARKERS, DEFAULT_AVAILABLE_STATUS_CODES,
+                                         DEFAULT_MAX_SCAN_BYTES, DEFAULT_TAKEN_MARKERS, MarkerClassifier)
+from scripts.rate_limiter import AdaptiveRateLimiter
+from scripts.recheck_scheduler import RecheckScheduler
+from scripts.error_handler import log_exception
+from scripts.metrics import GLOBAL_RATE, RESULTS, USABLE_PROXIES
+from scripts.username_rules import is_valid_username
+
+def probe_enabled() -> bool:
+    return os.getenv("PROXY_PROBE", "true").lower() == "true"
+
+
+def retry_max_attempts() -> int:
+    # Shuncha marta xato bilan tugagan username qayta tekshirish jurnalida qoladi, lekin endi tekshirilmaydi (0 - cheklovsiz)
+    return int(os.getenv("RETRY_MAX_ATTEMPTS", "5"))
+
+
+def create_proxy_prober(proxies_path: str) -> ProxyProber:
+    return ProxyProber(
+        test_url=os.getenv("PROXY_PROBE_URL", f"{INSTAGRAM_BASE_URL}/robots.txt"),
+        timeout=float(os.getenv("PROXY_PROBE_TIMEOUT", "5")),
+        concurrency=int(os.getenv("PROXY_PROBE_CONCURRENCY", "100")),
+        cache_path=os.getenv("PROXY_PROBE_CACHE", os.path.join(os.path.dirname(proxies_path), 'proxy_probe.json')),
+        ttl=float(os.getenv("PROXY_PROBE_TTL", "1800")),
+    )
+
+
+def create_proxy_handler(proxies_path: str, partition: Optional[Tuple[int, int]] = None) -> ProxyHandler:
+    # Pre-flight natijalari keshdan o'qiladi: shard jarayonlari ham qayta tekshirmasdan foydalanadi
+    probe_results = create_proxy_prober(proxies_path).cached_results() if probe_enabled() else None
+    return ProxyHandler(proxies_path,
+                        cooldown_time=float(os.getenv("PROXY_COOLDOWN", "120")),
+                        stats_path=os.getenv("PROXY_STATS_PATH"),
+                        failure_threshold=int(os.getenv("PROXY_FAILURE_THRESHOLD", "3")),
+                        open_time=float(os.getenv("PROXY_OPEN_TIME", "60")),
+                        max_trips=int(os.getenv("PROXY_MAX_TRIPS", "10")),
+                        partition=partition,
+                        probe_results=probe_results)
+
+
+def create_client_pool() -> ClientPool:
+    return ClientPool(
+        timeout=float(os.getenv("HTTP_TIMEOUT", "15")),
+        max_connections_per_proxy=int(os.getenv("HTTP_MAX_CONNECTIONS_PER_PROXY", "10")),
+        max_keepalive_per_proxy=int(os.getenv("HTTP_MAX_KEEPALIVE_PER_PROXY") or 0) or None,
+        keepalive_expiry=float(os.getenv("HTTP_KEEPALIVE_EXPIRY", "60")),
+        http2=os.getenv("HTTP2_ENABLED", "false").lower() == "true",
+        max_clients=int(os.getenv("HTTP_MAX_CLIENTS", "1000")),
+    )
+
+
+def create_rate_limiter(share: int = 1) -> AdaptiveRateLimiter:
+    # Bir nechta jarayon bo'lsa, global tezlik ular o'rtasida teng bo'linadi
+    return AdaptiveRateLimiter(
+        global_rate=float(os.getenv("RATE_LIMIT_GLOBAL", "10")) / share,
+        proxy_rate=float(os.getenv("RATE_LIMIT_PER_PROXY", "1")),
+        max_global_rate=float(os.getenv("RATE_LIMIT_GLOBAL_MAX", "200")) / share,
+        max_proxy_rate=float(os.getenv("RATE_LIMIT_PER_PROXY_MAX", "5")),
+    )
+
+
+def create_classifier() -> MarkerClassifier:
+    # Bo'sh qiymat (masalan TAKEN_MARKERS=) markerlarni o'chiradi, o'zgaruvchi yo'q bo'lsa standart ishlatiladi
+    return MarkerClassifier(
+        available_markers=os.getenv("AVAILABLE_MARKERS", "|".join(DEFAULT_AVAILABLE_MARKERS)).split("|"),
+        taken_markers=os.getenv("TAKEN_MARKERS", "|".join(DEFAULT_TAKEN_MARKERS)).split("|"),
+        available_status_codes=[int(code) for code in os.getenv(
+            "AVAILABLE_STATUS_CODES", ",".join(map(str, DEFAULT_AVAILABLE_STATUS_CODES))).split(",") if code.strip()],
+        max_scan_bytes=int(os.getenv("CLASSIFIER_MAX_SCAN_BYTES", str(DEFAULT_MAX_SCAN_BYTES))),
+    )
+
+
+def create_recheck_scheduler(db_path: Optional[str] = None) -> RecheckScheduler:
+    scheduler = RecheckScheduler({
+        'available': timedelta(hours=float(os.getenv("RECHECK_TTL_AVAILABLE_HOURS", "6"))),
+        'taken': timedelta(hours=float(os.getenv("RECHECK_TTL_TAKEN_HOURS", "720"))),
+    })
+    # db_path'siz faqat TTL qoidalari (xizmat rejimi natijalarni har so'rovda bazadan tekshiradi)
+    if db_path is not None:
+        scheduler.load(db_path)
+    return scheduler
+
+
+class CheckPipeline:
+    """
+    Bitta event loop ichidagi tekshiruv quvuri: username validatsiyasi, qayta tekshirish filtri,
+    proksi tanlash va qayta urinishlar bilan tekshirish. Elementlar oxirgi maydoni username bo'lgan tuple'lar.
+    """
+    def __init__(self, proxy_handler: ProxyHandler, client_pool: ClientPool, classifier: MarkerClassifier,
+                 rate_limiter: AdaptiveRateLimiter, recheck_scheduler: Optional[RecheckScheduler] = None,
+                 worker_count: int = 50, on_exhausted: Optional[Callable[[], None]] = None,
+                 stop_on_exhausted: bool = True):
+        self.proxy_handler = proxy_handler
+        self.client_pool = client_pool
+        self.classifier = classifier
+        self.rate_limiter = rate_limiter
+        self.recheck_scheduler = recheck_scheduler
+        self.on_exhausted = on_exhausted
+        # Uzoq ishlaydigan xizmat proksilar tugaganda to'xtamaydi: so'rovlar tekshirilmay (None) qaytadi
+        self.stop_on_exhausted = stop_on_exhausted
+        self.work_queue = WorkQueue(worker_count=worker_count)
+        self.exhausted = False
+        USABLE_PROXIES.set_function(lambda: proxy_handler.usable_count)
+        GLOBAL_RATE.set_function(lambda: rate_limiter.global_rate)
+
+    @property
+    def skipped(self) -> int:
+        return self.recheck_scheduler.skipped if self.recheck_scheduler else 0
+
+    async def check(self, item) -> Optional[str]:
+        username = item[-1]
+        if not is_valid_username(username):
+            return None
+        if self.recheck_scheduler is not None and not self.recheck_scheduler.should_check(username):
+            return None
+        proxy_handler = self.proxy_handler
+        proxy = proxy_handler.get_random_proxy()
+        while not proxy and proxy_handler.has_usable_proxies() and not self.work_queue.stopped:
+            # Barcha proksilar vaqtincha band yoki circuit'i ochiq: birinchisi bo'shashini kutish
+            await asyncio.sleep(min(max(proxy_handler.next_ready_in(), 0.1), 5))
+            proxy = proxy_handler.get_random_proxy()
+        if not proxy:
+            logging.warning(f"Username '{username}' proksi yo'qligi sababli tekshirilmadi.")
+            return None
+        return await check_username_with_retries(username, proxy, self.client_pool, self.classifier,
+                                                 proxy_handler, self.rate_limiter)
+
+    async def run(self, items, on_result: Callable[[Any, Any], None]):
+        def handle_result(item, result):
+            RESULTS.labels("error" if isinstance(result, Exception) else result or "none").inc()
+            if isinstance(result, Exception):
+                # Xato check_username ichida aynan muvaffaqiyatsiz proksiga yozilgan
+                log_exception(result, f"Username '{item[-1]}'ni tekshirishda xato")
+                # Agar proksi tugagan bo'lsa, quvurni to'xtatish
+                if not self.proxy_handler.has_usable_proxies() and not self.exhausted and not self.work_queue.stopped:
+                    self.exhausted = True
+                    if self.stop_on_exhausted:
+                        self.work_queue.stop()
+                    if self.on_exhausted is not None:
+                        self.on_exhausted()
+            on_result(item, result)
+
+        await self.work_queue.run(items, self.check, handle_result)
+
+    @property
+    def watermark(self):
+        return self.work_queue.watermark
+
+    async def aclose(self):
+        await self.client_pool.aclose()
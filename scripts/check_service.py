@@ -0,0 +1,340 @@
+# scripts/check_service.py
+
+import asyncio
+import logging
+import os
+import time
+from datetime import datetime
+from collections import OrderedDict
+from typing import Dict, List, Optional, Set
+
+from scripts.async_utils import run_blocking
+from scripts.check_pipeline import CheckPipeline
+from scripts.db_manager import ResultWriter, fetch_results
+from scripts.local_http import LocalHTTPServer, Request, Response, json_response
+from scripts.metadata_manager import MetadataManager
+from scripts.recheck_scheduler import RecheckScheduler
+from scripts.username_rules import clean_username
+
+service_logger = logging.getLogger(__name__)
+
+MAX_SUBMIT = 10000
+MAX_WAIT = 60.0
+FRESH_LOOKUP_BATCH = 500
+RECENT_RESULTS = 100_000
+
+
+class CheckService:
+    """
+    Doimiy ishlaydigan tekshiruv xizmati: proksilar, HTTP pool va baza ulanishi bir marta tayyorlanadi,
+    yangi username'lar esa API, kuzatilayotgan fayl yoki "drop" papkasi orqali kelib, navbatga tushadi.
+    Yaqinda tekshirilgan username'lar bazadagi natija bilan darhol javob beriladi.
+    """
+    def __init__(self, pipeline: CheckPipeline, result_writer: ResultWriter, db_path: str,
+                 recheck_scheduler: Optional[RecheckScheduler] = None, state: Optional[MetadataManager] = None,
+                 tail_path: Optional[str] = None, drop_dir: Optional[str] = None,
+                 poll_interval: float = 1.0, queue_size: int = 10000, stats_interval: float = 300):
+        self.pipeline = pipeline
+        self.result_writer = result_writer
+        self.db_path = db_path
+        self.recheck_scheduler = recheck_scheduler
+        self.state = state
+        self.tail_path = tail_path
+        self.drop_dir = drop_dir
+        self.poll_interval = poll_interval
+        self.stats_interval = stats_interval
+        self.counters = {"submitted": 0, "cached": 0, "checked": 0, "available": 0, "taken": 0, "errors": 0}
+        self._queue: asyncio.Queue = asyncio.Queue(maxsize=queue_size)
+        # Navbatda yoki tekshiruvda turgan username'lar: bir username bir vaqtda faqat bir marta tekshiriladi
+        self._pending: Set[str] = set()
+        self._waiters: Dict[str, List[asyncio.Future]] = {}
+        # So'nggi natijalar: ResultWriter ularni bazaga yozib ulgurmagan bo'lsa ham qayta tekshirilmaydi
+        self._recent: "OrderedDict[str, tuple]" = OrderedDict()
+        self._stopping = False
+        self._tasks: List[asyncio.Task] = []
+
+    # --- Navbat ---
+
+    async def _items(self):
+        while True:
+            username = await self._queue.get()
+            if username is None:
+                return
+            yield ("service", username)
+
+    def _enqueue_nowait(self, username: str) -> bool:
+        if username in self._pending:
+            return True
+        try:
+            self._queue.put_nowait(username)
+        except asyncio.QueueFull:
+            return False
+        self._pending.add(username)
+        self.counters["submitted"] += 1
+        return True
+
+    async def _enqueue(self, username: str):
+        # Fayl va papkadan kelganlar uchun: navbat to'lsa kutiladi (backpressure)
+        self._pending.add(username)
+        self.counters["submitted"] += 1
+        await self._queue.put(username)
+
+    async def _enqueue_many(self, lines: List[str]) -> int:
+        usernames = list(dict.fromkeys(u for u in map(clean_username, lines) if u is not None))
+        count = 0
+        for i in range(0, len(usernames), FRESH_LOOKUP_BATCH):
+            chunk = usernames[i:i + FRESH_LOOKUP_BATCH]
+            fresh = await self._fresh_results(chunk)
+            self.counters["cached"] += len(fresh)
+            for username in chunk:
+                # Oldingi put() kutilayotganda tugagan tekshiruvlar ham qayta navbatga tushmaydi
+                if username in fresh or username in self._pending or self._recent_result(username) is not None:
+                    continue
+                await self._enqueue(username)
+                count += 1
+        return count
+
+    def _on_result(self, item, result):
+        username = item[-1]
+        self._pending.discard(username)
+        if isinstance(result, Exception):
+            self.counters["errors"] += 1
+            status = "error"
+        else:
+            status = result
+            if result:
+                checked_at = datetime.now().isoformat()
+                self.result_writer.submit(username, result, checked_at)
+                self._recent[username] = (result, checked_at)
+                self._recent.move_to_end(username)
+                if len(self._recent) > RECENT_RESULTS:
+                    self._recent.popitem(last=False)
+                self.counters["checked"] += 1
+                if result in self.counters:
+                    self.counters[result] += 1
+        for future in self._waiters.pop(username, []):
+            if not future.done():
+                future.set_result(status)
+
+    def _recent_result(self, username: str) -> Optional[dict]:
+        entry = self._recent.get(username)
+        if entry is None or self.recheck_scheduler is None or not self.recheck_scheduler.is_fresh(*entry):
+            return None
+        return {"status": entry[0], "checked_at": entry[1]}
+
+    async def _fresh_results(self, usernames: List[str]) -> Dict[str, dict]:
+        # Bazada (yoki xotiradagi so'nggi natijalarda) TTL tugamagan natijasi bor username'lar qayta tekshirilmaydi
+        if self.recheck_scheduler is None or not usernames:
+            return {}
+        missing = [u for u in usernames if u not in self._recent]
+        rows = await run_blocking(fetch_results, self.db_path, missing) if missing else []
+        now = datetime.now()
+        fresh = {username: {"status": status, "checked_at": checked_at}
+                 for username, status, checked_at in rows
+                 if self.recheck_scheduler.is_fresh(status, checked_at, now)}
+        # Baza o'qilayotganda tugagan tekshiruvlar ham hisobga olinadi
+        for username in usernames:
+            recent = self._recent_result(username)
+            if recent is not None:
+                fresh[username] = recent
+        return fresh
+
+    async def submit(self, raw_usernames: List[str], wait: float = 0.0) -> dict:
+        """
+        Username'larni tekshiruvga qo'yadi. wait > 0 bo'lsa, natijalar shu vaqt (soniya) ichida kutiladi.
+        """
+        results: Dict[str, dict] = {}
+        invalid, rejected, queued = [], [], []
+        usernames = []
+        for raw in raw_usernames:
+            username = clean_username(raw)
+            if username is None:
+                invalid.append(raw)
+            else:
+                usernames.append(username)
+        usernames = list(dict.fromkeys(usernames))
+
+        fresh = await self._fresh_results([u for u in usernames if u not in self._pending])
+        self.counters["cached"] += len(fresh)
+        results.update(fresh)
+        loop = asyncio.get_running_loop()
+        futures = {}
+        for username in usernames:
+            if username in fresh:
+                continue
+            if self._stopping or not self._enqueue_nowait(username):
+                rejected.append(username)
+                continue
+            queued.append(username)
+            if wait > 0:
+                futures[username] = loop.create_future()
+                self._waiters.setdefault(username, []).append(futures[username])
+
+        if futures:
+            await asyncio.wait(futures.values(), timeout=min(wait, MAX_WAIT))
+            skipped = []
+            for username, future in futures.items():
+                if not future.done():
+                    future.cancel()
+                    continue
+                status = future.result()
+                if status is None:
+                    skipped.append(username)
+                else:
+                    results[username] = {"status": status}
+            if skipped:
+                # Tekshirilmay qolganlar (masalan, proksi yo'q): bazada bor bo'lsa, o'sha natija
+                for username, status, checked_at in await run_blocking(fetch_results, self.db_path, skipped):
+                    results[username] = {"status": status, "checked_at": checked_at}
+
+        return {"results": results, "queued": queued, "pending": [u for u in queued if u not in results],
+                "invalid": invalid, "rejected": rejected}
+
+    # --- Fayl va papka kuzatuvi ---
+
+    def _read_tail(self):
+        # Faqat to'liq (\n bilan tugagan) qatorlar o'qiladi; fayl qisqargan yoki almashtirilgan bo'lsa, boshidan
+        stat = os.stat(self.tail_path)
+        offset = self.state.get_metadata("tail_offset")
+        if offset is None:
+            # Birinchi ishga tushirish: fayldagi mavjud qatorlar paketli rejimga tegishli
+            offset = stat.st_size
+        elif self.state.get_metadata("tail_inode") != stat.st_ino or stat.st_size < offset:
+            offset = 0
+        with open(self.tail_path, 'rb') as f:
+            f.seek(offset)
+            data = f.read()
+        end = data.rfind(b"\n") + 1
+        lines = data[:end].decode('utf-8', errors='replace').splitlines()
+        return lines, offset + end, stat.st_ino
+
+    async def _tail(self):
+        while not self._stopping:
+            if os.path.exists(self.tail_path):
+                try:
+                    lines, offset, inode = await run_blocking(self._read_tail)
+                except OSError as e:
+                    service_logger.error(f"Kuzatilayotgan faylni o'qishda xato: {e}")
+                    lines, offset, inode = [], None, None
+                if offset is not None:
+                    count = await self._enqueue_many(lines)
+                    if count:
+                        service_logger.info(f"Fayldan {count} ta yangi username navbatga qo'yildi.")
+                    # Pozitsiya navbatga qo'yilgandan keyin saqlanadi: to'xtashda navbat oxirigacha tekshiriladi
+                    self.state.update_metadata("tail_offset", offset)
+                    self.state.update_metadata("tail_inode", inode)
+                    await run_blocking(self.state.save_metadata)
+            await asyncio.sleep(self.poll_interval)
+
+    def _take_drop_files(self) -> List[str]:
+        processed_dir = os.path.join(self.drop_dir, "processed")
+        os.makedirs(processed_dir, exist_ok=True)
+        taken = []
+        names = sorted(n for n in os.listdir(self.drop_dir) if n.endswith(".txt"))
+        for name in names:
+            target = os.path.join(processed_dir, f"{int(time.time())}-{name}")
+            # Fayl avval ko'chiriladi: yozilayotgan fayl ".tmp" nomi bilan tashlanib, keyin .txt ga o'zgartirilishi kerak
+            os.replace(os.path.join(self.drop_dir, name), target)
+            taken.append(target)
+        return taken
+
+    async def _watch_drop_dir(self):
+        while not self._stopping:
+            try:
+                paths = await run_blocking(self._take_drop_files)
+            except OSError as e:
+                service_logger.error(f"Drop papkasini o'qishda xato: {e}")
+                paths = []
+            for path in paths:
+                count = await self._enqueue_many(await run_blocking(_read_lines, path))
+                service_logger.info(f"{os.path.basename(path)}: {count} ta username navbatga qo'yildi.")
+            await asyncio.sleep(self.poll_interval)
+
+    async def _persist_proxy_stats(self):
+        # Paketli rejimda statistika ish oxirida saqlanadi; xizmat esa kunlab ishlaydi
+        while True:
+            await asyncio.sleep(self.stats_interval)
+            await run_blocking(self.pipeline.proxy_handler.save_stats)
+
+    # --- HTTP API ---
+
+    async def _handle_check(self, request: Request) -> Response:
+        try:
+            body = request.json() or {}
+        except ValueError:
+            return json_response({"error": "JSON kutilgan"}, status=400)
+        usernames = body.get("usernames")
+        if isinstance(body.get("username"), str):
+            usernames = [body["username"]]
+        if not isinstance(usernames, list) or not all(isinstance(u, str) for u in usernames):
+            return json_response({"error": "'usernames' ro'yxati kutilgan"}, status=400)
+        if len(usernames) > MAX_SUBMIT:
+            return json_response({"error": f"Bir so'rovda ko'pi bilan {MAX_SUBMIT} ta username"}, status=413)
+        try:
+            wait = float(body.get("wait", 0) or 0)
+        except (TypeError, ValueError):
+            return json_response({"error": "'wait' soniyalarda bo'lishi kerak"}, status=400)
+        outcome = await self.submit(usernames, wait=wait)
+        status = 503 if outcome["rejected"] and not outcome["queued"] and not outcome["results"] else 202
+        if wait > 0 and not outcome["pending"] and not outcome["rejected"]:
+            status = 200
+        return json_response(outcome, status=status)
+
+    async def _handle_results(self, request: Request) -> Response:
+        raw = request.query.get("username") or request.query.get("usernames") or ""
+        usernames = [u for u in (clean_username(part) for part in raw.split(",")) if u]
+        if not usernames:
+            return json_response({"error": "'username' parametri kutilgan"}, status=400)
+        rows = await run_blocking(fetch_results, self.db_path, usernames[:MAX_SUBMIT])
+        results = {username: {"status": status, "checked_at": checked_at} for username, status, checked_at in rows}
+        return json_response({"results": results,
+                              "pending": [u for u in usernames if u in self._pending],
+                              "unknown": [u for u in usernames if u not in results and u not in self._pending]})
+
+    async def _handle_status(self, request: Request) -> Response:
+        return json_response({**self.counters, "queued": self._queue.qsize(), "in_flight": len(self._pending),
+                              "usable_proxies": self.pipeline.proxy_handler.usable_count,
+                              "written": self.result_writer.written})
+
+    def attach(self, server: LocalHTTPServer):
+        server.route("POST", "/check", self._handle_check)
+        server.route("GET", "/results", self._handle_results)
+        server.route("GET", "/status", self._handle_status)
+
+    # --- Hayot sikli ---
+
+    async def run(self, stop_event: asyncio.Event):
+        """
+        stop_event o'rnatilguncha ishlaydi; keyin yangi username qabul qilinmaydi, navbatdagilar tekshirib bo'linadi.
+        """
+        loop = asyncio.get_running_loop()
+        if self.tail_path:
+            self._tasks.append(loop.create_task(self._tail()))
+        if self.drop_dir:
+            os.makedirs(self.drop_dir, exist_ok=True)
+            self._tasks.append(loop.create_task(self._watch_drop_dir()))
+        if self.stats_interval > 0:
+            self._tasks.append(loop.create_task(self._persist_proxy_stats()))
+        pipeline_task = loop.create_task(self.pipeline.run(self._items(), self._on_result))
+        stop_task = loop.create_task(stop_event.wait())
+        try:
+            await asyncio.wait([pipeline_task, stop_task], return_when=asyncio.FIRST_COMPLETED)
+        finally:
+            stop_task.cancel()
+            self._stopping = True
+            for task in self._tasks:
+                task.cancel()
+            await asyncio.gather(*self._tasks, return_exceptions=True)
+            if not pipeline_task.done():
+                await self._queue.put(None)
+            await pipeline_task
+            for futures in self._waiters.values():
+                for future in futures:
+                    future.cancel()
+            service_logger.info(f"Xizmat to'xtadi: {self.counters['checked']} ta tekshirildi, "
+                                f"{self.counters['cached']} ta bazadan javob berildi.")
+
+
+def _read_lines(path: str) -> List[str]:
+    with open(path, 'r', encoding='utf-8', errors='replace') as f:
+        return f.read().splitlines()
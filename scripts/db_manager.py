@@ -2,27 +2,236 @@
 
 import sqlite3
 import logging
-from datetime import datetime
-import shutil
+from datetime import datetime, timedelta
 import os
+import asyncio
+import threading
+import time
+from contextlib import closing
+from typing import Iterable, Iterator, List, Optional, Tuple
+
+from scripts.async_utils import run_blocking
+from scripts.metrics import DB_BATCH_ROWS, DB_FLUSH_SECONDS
+
+UPSERT_RESULT_SQL = """
+    INSERT INTO results (username, status, checked_at) VALUES (?, ?, ?)
+    ON CONFLICT(username) DO UPDATE SET status = excluded.status, checked_at = excluded.checked_at
+"""
+
+# Hisobot uchun yig'ma jadvallar: status bo'yicha sonlar trigger'lar orqali har bir yozuv bilan yangilanadi,
+# shuning uchun hisobot jadval hajmidan qat'i nazar o'zgarmas vaqtda tayyorlanadi
+SUMMARY_SCHEMA = """
+    CREATE TABLE IF NOT EXISTS status_counts (
+        status TEXT PRIMARY KEY,
+        count INTEGER NOT NULL
+    );
+    CREATE TABLE IF NOT EXISTS run_stats (
+        run_id INTEGER PRIMARY KEY AUTOINCREMENT,
+        started_at TEXT NOT NULL,
+        updated_at TEXT,
+        finished_at TEXT,
+        checked INTEGER NOT NULL DEFAULT 0,
+        available INTEGER NOT NULL DEFAULT 0,
+        taken INTEGER NOT NULL DEFAULT 0
+    );
+    CREATE INDEX IF NOT EXISTS idx_results_checked_at_username ON results (checked_at, username);
+    CREATE INDEX IF NOT EXISTS idx_results_status_username ON results (status, username);
+"""
+
+SUMMARY_TRIGGERS = """
+    CREATE TRIGGER results_count_insert AFTER INSERT ON results BEGIN
+        INSERT INTO status_counts (status, count) VALUES (NEW.status, 1)
+        ON CONFLICT(status) DO UPDATE SET count = count + 1;
+    END;
+    CREATE TRIGGER results_count_update AFTER UPDATE OF status ON results WHEN OLD.status != NEW.status BEGIN
+        UPDATE status_counts SET count = count - 1 WHERE status = OLD.status;
+        INSERT INTO status_counts (status, count) VALUES (NEW.status, 1)
+        ON CONFLICT(status) DO UPDATE SET count = count + 1;
+    END;
+    CREATE TRIGGER results_count_delete AFTER DELETE ON results BEGIN
+        UPDATE status_counts SET count = count - 1 WHERE status = OLD.status;
+    END;
+"""
+
+# Qayta tekshirish jurnali: xato bilan tugagan (natijasiz) username'lar. Resume nuqtasi ular ustidan siljiydi,
+# username'lar esa keyingi ishga tushirishda birinchi bo'lib qayta tekshiriladi
+RETRY_SCHEMA = """
+    CREATE TABLE IF NOT EXISTS retry_queue (
+        username TEXT PRIMARY KEY,
+        attempts INTEGER NOT NULL DEFAULT 1,
+        failed_at TEXT NOT NULL
+    );
+"""
+
+RECORD_FAILURE_SQL = """
+    INSERT INTO retry_queue (username, attempts, failed_at) VALUES (?, 1, ?)
+    ON CONFLICT(username) DO UPDATE SET attempts = attempts + 1, failed_at = excluded.failed_at
+"""
+
+UPDATE_RUN_SQL = """
+    UPDATE run_stats SET checked = checked + ?, available = available + ?, taken = taken + ?, updated_at = ?
+    WHERE run_id = ?
+"""
+
+def iter_results_since(db_path: str, cutoff_iso: str, timeout: float = 30) -> Iterator[Tuple[str, str, str]]:
+    # Alohida faqat o'qish ulanishi: WAL rejimida yozuvchini bloklamaydi, generator tugaganda yopiladi
+    if not os.path.exists(db_path):
+        return
+    with closing(sqlite3.connect(f"file:{db_path}?mode=ro", uri=True, timeout=timeout)) as conn:
+        cursor = conn.execute(
+            "SELECT username, status, checked_at FROM results WHERE checked_at >= ?", (cutoff_iso,)
+        )
+        yield from cursor
+
+def fetch_results(db_path: str, usernames: List[str], batch_size: int = 500,
+                  timeout: float = 30) -> List[Tuple[str, str, str]]:
+    # Berilgan username'larning natijalari (faqat o'qish ulanishi, IN ro'yxati bo'laklab)
+    if not usernames or not os.path.exists(db_path):
+        return []
+    rows = []
+    with closing(sqlite3.connect(f"file:{db_path}?mode=ro", uri=True, timeout=timeout)) as conn:
+        for i in range(0, len(usernames), batch_size):
+            chunk = usernames[i:i + batch_size]
+            placeholders = ",".join("?" * len(chunk))
+            rows.extend(conn.execute(
+                f"SELECT username, status, checked_at FROM results WHERE username IN ({placeholders})", chunk
+            ))
+    return rows
+
+def fetch_retry_usernames(db_path: str, max_attempts: int = 0, timeout: float = 30) -> List[str]:
+    # Qayta tekshirish jurnalidagi username'lar, eng eskisi birinchi; max_attempts'ga yetganlari tashlab ketiladi
+    if not os.path.exists(db_path):
+        return []
+    sql = "SELECT username FROM retry_queue"
+    params: Tuple = ()
+    if max_attempts > 0:
+        sql += " WHERE attempts < ?"
+        params = (max_attempts,)
+    with closing(sqlite3.connect(f"file:{db_path}?mode=ro", uri=True, timeout=timeout)) as conn:
+        return [row[0] for row in conn.execute(sql + " ORDER BY failed_at", params)]
+
+def iter_result_chunks(db_path: str, after: Optional[Tuple[str, str]] = None, until: Optional[str] = None,
+                       status: Optional[str] = None, chunk_size: int = 10000,
+                       timeout: float = 30) -> Iterator[List[Tuple[str, str, str]]]:
+    """
+    Natijalarni (checked_at, username) tartibida bo'laklab o'qiydi (keyset pagination).
+    Har bir bo'lak alohida qisqa so'rov: uzoq o'qish tranzaksiyasi WAL checkpoint'ini to'xtatib qo'ymaydi.
+    after - oxirgi eksport qilingan (checked_at, username), until - checked_at yuqori chegarasi (kirmaydi).
+    """
+    conditions, params = [], []
+    if until is not None:
+        conditions.append("checked_at < ?")
+        params.append(until)
+    if status is not None:
+        # "+status": status indeksi tanlanmasin, aks holda butun natija saralash uchun vaqtinchalik jadvalga tushadi
+        conditions.append("+status = ?")
+        params.append(status)
+    base = " AND ".join(conditions)
+    # closing(): eksport erta to'xtasa yoki xato bersa ham generator yopilganda ulanish yopiladi
+    with closing(sqlite3.connect(f"file:{db_path}?mode=ro", uri=True, timeout=timeout)) as conn:
+        while True:
+            where = [base] if base else []
+            chunk_params = list(params)
+            if after is not None:
+                where.append("(checked_at, username) > (?, ?)")
+                chunk_params.extend(after)
+            sql = "SELECT username, status, checked_at FROM results"
+            if where:
+                sql += " WHERE " + " AND ".join(where)
+            sql += " ORDER BY checked_at, username LIMIT ?"
+            rows = conn.execute(sql, (*chunk_params, chunk_size)).fetchall()
+            if not rows:
+                return
+            yield rows
+            after = (rows[-1][2], rows[-1][0])
+            if len(rows) < chunk_size:
+                return
+
+MAINTENANCE_SCHEMA = """
+CREATE TABLE IF NOT EXISTS maintenance (
+    name TEXT PRIMARY KEY,
+    value TEXT NOT NULL
+);
+"""
+INTEGRITY_MODES = ("quick", "full", "off")
+
 
 class DBManager:
-    def __init__(self, db_path):
+    def __init__(self, db_path, integrity_mode: Optional[str] = None, full_check_days: Optional[float] = None):
         self.db_path = db_path
         self.db_timeout = 30  # SQLite lock uchun timeout
+        self.integrity_mode = (integrity_mode or os.getenv("DB_INTEGRITY_CHECK", "quick")).lower()
+        self.full_check_days = (full_check_days if full_check_days is not None
+                                else float(os.getenv("DB_FULL_CHECK_DAYS", "7")))
+        self._conn = None
+        self._lock = threading.Lock()
+        self.run_id: Optional[int] = None
+        self._backup_thread: Optional[threading.Thread] = None
         self._backup_db()
         self._create_table()
+        self._create_summary()
         self._check_integrity()
 
+    @staticmethod
+    def _data_signature(path: str):
+        # Indekslar orqali arzon hisoblanadigan belgi: har qanday yozuv (upsert ham) checked_at'ni o'zgartiradi
+        with closing(sqlite3.connect(f"file:{path}?mode=ro", uri=True)) as conn:
+            return conn.execute("SELECT (SELECT MAX(rowid) FROM results), (SELECT MAX(checked_at) FROM results)").fetchone()
+
+    def _backup_is_current(self, backup_path: str) -> bool:
+        # Zaxiradagi ma'lumotlar bazadagisi bilan bir xil bo'lsa, qayta nusxa kerak emas
+        if not os.path.exists(backup_path):
+            return False
+        try:
+            return self._data_signature(self.db_path) == self._data_signature(backup_path)
+        except sqlite3.Error:
+            return False
+
     def _backup_db(self):
-        # ... (oldingi kod o'zgarmadi)
-        if os.path.exists(self.db_path):
-            backup_path = f"{self.db_path}.bak"
+        """
+        Zaxira SQLite backup API orqali fon thread'ida olinadi: WAL rejimida o'qish tranzaksiyasi yozuvchini
+        bloklamaydi, shuning uchun tekshiruv zaxira tugashini kutmasdan boshlanadi.
+        Baza oxirgi zaxiradan beri o'zgarmagan bo'lsa, nusxa olinmaydi.
+        """
+        if not os.path.exists(self.db_path) or os.getenv("DB_BACKUP", "true").lower() != "true":
+            return
+        backup_path = f"{self.db_path}.bak"
+        if self._backup_is_current(backup_path):
+            logging.info("Ma'lumotlar bazasi oxirgi zaxiradan beri o'zgarmagan, zaxiralash o'tkazib yuborildi.")
+            return
+        try:
+            # Eski (rollback journal) bazada o'quvchi yozuvchini bloklaydi: avval WAL rejimiga o'tkaziladi
+            with sqlite3.connect(self.db_path, timeout=self.db_timeout) as conn:
+                conn.execute("PRAGMA journal_mode=WAL")
+        except sqlite3.Error as e:
+            logging.error(f"Ma'lumotlar bazasini zahiralashda xato: {e}")
+            return
+        self._backup_thread = threading.Thread(target=self._run_backup, args=(backup_path,),
+                                               name="db-backup", daemon=True)
+        self._backup_thread.start()
+
+    def _run_backup(self, backup_path: str):
+        tmp_path = f"{backup_path}.tmp"
+        try:
+            started = time.monotonic()
+            source = sqlite3.connect(f"file:{self.db_path}?mode=ro", uri=True, timeout=self.db_timeout)
+            target = sqlite3.connect(tmp_path)
             try:
-                shutil.copyfile(self.db_path, backup_path)
-                logging.info(f"Ma'lumotlar bazasi zaxira nusxasi yaratildi: {backup_path}")
-            except IOError as e:
-                logging.error(f"Ma'lumotlar bazasini zahiralashda xato: {e}")
+                source.backup(target)
+            finally:
+                target.close()
+                source.close()
+            os.replace(tmp_path, backup_path)
+            logging.info(f"Ma'lumotlar bazasi zaxira nusxasi yaratildi: {backup_path} "
+                         f"({time.monotonic() - started:.1f} s)")
+        except (sqlite3.Error, OSError) as e:
+            logging.error(f"Ma'lumotlar bazasini zahiralashda xato: {e}")
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+
+    def wait_backup(self, timeout: Optional[float] = None):
+        if self._backup_thread is not None:
+            self._backup_thread.join(timeout)
 
     def _create_table(self):
         try:
@@ -36,35 +245,223 @@ class DBManager:
                     )
                 """)
                 conn.commit()
+                conn.executescript(RETRY_SCHEMA)
                 logging.info("Ma'lumotlar bazasi jadvallari tayyor.")
         except sqlite3.Error as e:
             logging.critical(f"Ma'lumotlar bazasi jadvalini yaratishda xato: {e}")
 
+    def _create_summary(self):
+        try:
+            with sqlite3.connect(self.db_path, timeout=self.db_timeout) as conn:
+                conn.executescript(SUMMARY_SCHEMA)
+                has_triggers = conn.execute(
+                    "SELECT 1 FROM sqlite_master WHERE type = 'trigger' AND name = 'results_count_insert'"
+                ).fetchone()
+                if not has_triggers:
+                    # Eski bazalar uchun bir martalik to'ldirish; trigger'lar bilan bitta tranzaksiyada
+                    conn.executescript(f"""
+                        BEGIN;
+                        DELETE FROM status_counts;
+                        INSERT INTO status_counts (status, count) SELECT status, COUNT(*) FROM results GROUP BY status;
+                        {SUMMARY_TRIGGERS}
+                        COMMIT;
+                    """)
+                    logging.info("Yig'ma jadvallar va trigger'lar yaratildi.")
+        except sqlite3.Error as e:
+            logging.critical(f"Yig'ma jadvallarni yaratishda xato: {e}")
+
+    def _full_check_due(self, conn) -> bool:
+        row = conn.execute("SELECT value FROM maintenance WHERE name = 'last_full_check'").fetchone()
+        if row is None:
+            return True
+        return datetime.now() - datetime.fromisoformat(row[0]) >= timedelta(days=self.full_check_days)
+
     def _check_integrity(self):
-        # ... (oldingi kod o'zgarmadi)
+        """
+        Odatda arzonroq PRAGMA quick_check bajariladi; to'liq integrity_check esa
+        DB_FULL_CHECK_DAYS kunda bir marta (yoki DB_INTEGRITY_CHECK=full bo'lsa har safar).
+        """
+        if self.integrity_mode == "off":
+            return
         try:
             with sqlite3.connect(self.db_path, timeout=self.db_timeout) as conn:
+                conn.executescript(MAINTENANCE_SCHEMA)
+                full = self.integrity_mode == "full" or self._full_check_due(conn)
                 cursor = conn.cursor()
-                cursor.execute("PRAGMA integrity_check;")
+                cursor.execute("PRAGMA integrity_check;" if full else "PRAGMA quick_check;")
                 result = cursor.fetchone()
-                
+
                 if result[0] == 'ok':
                     logging.info("Ma'lumotlar bazasi butunligi tekshiruvidan o'tdi.")
+                    if full:
+                        conn.execute("INSERT OR REPLACE INTO maintenance (name, value) VALUES ('last_full_check', ?)",
+                                     (datetime.now().isoformat(),))
                 else:
                     logging.critical(f"‼️ Jiddiy xato: Ma'lumotlar bazasi butunligi buzilgan: {result[0]}")
         except sqlite3.Error as e:
             logging.critical(f"‼️ Jiddiy xato: Ma'lumotlar bazasi butunligini tekshirishda xato yuz berdi: {e}")
 
+    def _connection(self) -> sqlite3.Connection:
+        # Yozish uchun bitta doimiy ulanish (WAL rejimida o'quvchilar yozuvchini bloklamaydi)
+        if self._conn is None:
+            conn = sqlite3.connect(self.db_path, timeout=self.db_timeout, check_same_thread=False)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.execute("PRAGMA temp_store=MEMORY")
+            conn.execute("PRAGMA cache_size=-20000")
+            conn.execute(f"PRAGMA busy_timeout={self.db_timeout * 1000}")
+            self._conn = conn
+        return self._conn
+
+    def save_results(self, rows: Iterable[Tuple[str, str, str]]):
+        """
+        (username, status, checked_at) qatorlarini bitta tranzaksiyada yozadi.
+        Qayta tekshirilgan username'ning holati va vaqti yangilanadi. status None bo'lgan qator - xato bilan
+        tugagan tekshiruv: username qayta tekshirish jurnaliga yoziladi, natijasi kelganda jurnaldan o'chiriladi.
+        """
+        rows = list(rows)
+        results = [row for row in rows if row[1] is not None]
+        failures = [(row[0], row[2]) for row in rows if row[1] is None]
+        with self._lock:
+            conn = self._connection()
+            with conn:
+                conn.executemany(UPSERT_RESULT_SQL, results)
+                if failures:
+                    conn.executemany(RECORD_FAILURE_SQL, failures)
+                if results and conn.execute("SELECT 1 FROM retry_queue LIMIT 1").fetchone():
+                    conn.executemany("DELETE FROM retry_queue WHERE username = ?", ((row[0],) for row in results))
+                if self.run_id is not None and results:
+                    available = sum(1 for row in results if row[1] == 'available')
+                    taken = sum(1 for row in results if row[1] == 'taken')
+                    conn.execute(UPDATE_RUN_SQL, (len(results), available, taken, results[-1][2], self.run_id))
+
+    def begin_run(self) -> int:
+        """
+        Joriy ishga tushirish uchun run_stats yozuvini ochadi; keyingi save_results chaqiruvlari uni yangilaydi.
+        """
+        with self._lock:
+            conn = self._connection()
+            with conn:
+                cursor = conn.execute("INSERT INTO run_stats (started_at) VALUES (?)", (datetime.now().isoformat(),))
+            self.run_id = cursor.lastrowid
+        return self.run_id
+
+    def finish_run(self):
+        if self.run_id is None:
+            return
+        with self._lock:
+            conn = self._connection()
+            with conn:
+                conn.execute("UPDATE run_stats SET finished_at = ? WHERE run_id = ?",
+                             (datetime.now().isoformat(), self.run_id))
+
     def save_result(self, username, status):
         try:
-            with sqlite3.connect(self.db_path, timeout=self.db_timeout) as conn:
-                cursor = conn.cursor()
-                cursor.execute(
-                    "INSERT INTO results (username, status, checked_at) VALUES (?, ?, ?)",
-                    (username, status, datetime.now().isoformat())
-                )
-                conn.commit()
-        except sqlite3.IntegrityError:
-            logging.warning(f"Username '{username}' ma'lumotlar bazasida allaqachon mavjud.")
+            self.save_results([(username, status, datetime.now().isoformat())])
         except sqlite3.Error as e:
             logging.error(f"Ma'lumotlar bazasiga yozishda xato yuz berdi: {e}")
+
+    def close(self):
+        self.wait_backup()
+        with self._lock:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
+
+
+class ResultWriter:
+    """
+    Natijalarni fon vazifasi orqali DBManager'ga paket holida yozadi.
+    Paket hajmi yoki vaqt oynasi to'lganda executemany bilan bitta tranzaksiya bajariladi,
+    SQLite I/O esa event loop'dan tashqarida (cheklangan thread pool'da) ishlaydi.
+    """
+    def __init__(self, db_manager: DBManager, batch_size: int = 500, flush_interval: float = 1.0,
+                 retries: int = 3, retry_delay: float = 1.0):
+        self.db_manager = db_manager
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.retries = retries
+        self.retry_delay = retry_delay
+        self.written = 0
+        self.failed = 0
+        # Ticket'lar: topshirilgan qatorlar soni, tartib bilan ishlangan (yozilgan yoki xato) qatorlar soni
+        # va birinchi yozilmagan qator raqami - checkpoint undan o'tib ketmasligi kerak
+        self.submitted = 0
+        self._processed = 0
+        self._failed_from: Optional[int] = None
+        self._pending: List[Tuple[str, str, str]] = []
+        self._wakeup = asyncio.Event()
+        self._flushed = asyncio.Event()
+        self._closing = False
+        self._task = None
+
+    def start(self):
+        self._task = asyncio.get_running_loop().create_task(self._run())
+
+    def submit(self, username: str, status: Optional[str], checked_at: Optional[str] = None):
+        self._pending.append((username, status, checked_at or datetime.now().isoformat()))
+        self.submitted += 1
+        if len(self._pending) >= self.batch_size:
+            self._wakeup.set()
+
+    def submit_failure(self, username: str, checked_at: Optional[str] = None):
+        # Natijalar bilan bir navbatda: checkpoint username jurnalga yozilgandan keyingina undan o'tadi
+        self.submit(username, None, checked_at)
+
+    async def _run(self):
+        while True:
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), self.flush_interval)
+            except asyncio.TimeoutError:
+                pass
+            self._wakeup.clear()
+            while self._pending:
+                batch = self._pending[:self.batch_size]
+                del self._pending[:self.batch_size]
+                await self._flush(batch)
+                self._processed += len(batch)
+                self._flushed.set()
+            if self._closing:
+                return
+
+    async def _flush(self, batch):
+        for attempt in range(1, self.retries + 1):
+            try:
+                started = time.monotonic()
+                await run_blocking(self.db_manager.save_results, batch)
+                DB_FLUSH_SECONDS.observe(time.monotonic() - started)
+                DB_BATCH_ROWS.observe(len(batch))
+                self.written += len(batch)
+                return
+            except sqlite3.Error as e:
+                logging.error(f"Natijalar paketini yozishda xato ({len(batch)} ta): {e}. Urinish {attempt}/{self.retries}.")
+                await asyncio.sleep(self.retry_delay * attempt)
+        self.failed += len(batch)
+        if self._failed_from is None:
+            self._failed_from = self._processed
+        logging.error(f"{len(batch)} ta natija {self.retries} urinishdan keyin ham yozilmadi.")
+
+    @property
+    def durable(self) -> int:
+        """
+        Shu ticket'gacha bo'lgan barcha qatorlar bazaga commit qilingan.
+        """
+        if self._failed_from is not None:
+            return min(self._processed, self._failed_from)
+        return self._processed
+
+    async def sync(self):
+        # Hozirgacha topshirilgan qatorlar yozilguncha (yoki yozilmasligi aniq bo'lguncha) kutish
+        target = self.submitted
+        while self._processed < target and self._task is not None and not self._task.done():
+            self._flushed.clear()
+            self._wakeup.set()
+            await self._flushed.wait()
+
+    async def close(self):
+        # Qolgan barcha natijalar yozilguncha kutiladi
+        self._closing = True
+        self._wakeup.set()
+        if self._task is not None:
+            await self._task
+        logging.info(f"Natijalar yozuvchisi yopildi: {self.written} ta yozildi, {self.failed} ta xato.")
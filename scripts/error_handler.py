@@ -1,13 +1,11 @@
 import logging
 import time
-from .telegram_notifier import TelegramNotifier
 
-try:
-    notifier = TelegramNotifier()
-except ImportError:
-    notifier = None
+# Notifier birinchi xabar kerak bo'lganda yaratiladi (httpx/Telegram import vaqtini ishga tushishdan olib tashlash uchun)
+notifier = None
 
 def safe_execute(func, *args, retries=3, delay=5):
+    # Sinxron kod uchun: event loop ichida async_utils.async_safe_execute ishlatiladi (time.sleep loop'ni to'xtatadi)
     for i in range(retries):
         try:
             return func(*args)
@@ -21,7 +19,14 @@ def safe_execute(func, *args, retries=3, delay=5):
 def log_exception(e, message):
     logging.error(f"{message}: {e}")
 
-def notify_critical(message):
+def get_notifier():
+    global notifier
+    if notifier is None:
+        from .telegram_notifier import TelegramNotifier
+        notifier = TelegramNotifier()
+    return notifier
+
+def notify_critical(message, key=None):
+    # Xabar fon navbatiga qo'yiladi: chaqiruvchi Telegram javobini kutmaydi
     logging.critical(f"MUHIM XATO: {message}")
-    if notifier:
-        notifier.send_message(f"‼️ Jiddiy xato yuz berdi: {message}")
+    get_notifier().send_message(f"‼️ Jiddiy xato yuz berdi: {message}", key=key)
@@ -0,0 +1,135 @@
+# scripts/exporter.py
+
+import csv
+import gzip
+import json
+import logging
+import os
+from contextlib import closing
+from datetime import datetime, timedelta
+from typing import List, Optional, Tuple
+
+from scripts.db_manager import iter_result_chunks
+
+EXPORT_FORMATS = ("csv", "ndjson", "parquet")
+
+
+class _TextSink:
+    def __init__(self, path: str, fmt: str, compress: bool):
+        self.fmt = fmt
+        self.file = gzip.open(path, 'wt', encoding='utf-8', newline='') if compress else open(path, 'w', encoding='utf-8', newline='')
+        self.csv = None
+        if fmt == "csv":
+            self.csv = csv.writer(self.file)
+            self.csv.writerow(("username", "status", "checked_at"))
+
+    def write(self, rows: List[Tuple[str, str, str]]):
+        if self.csv is not None:
+            self.csv.writerows(rows)
+        else:
+            self.file.write("".join(
+                json.dumps({"username": u, "status": s, "checked_at": c}, ensure_ascii=False) + "\n"
+                for u, s, c in rows))
+
+    def close(self):
+        self.file.close()
+
+
+class _ParquetSink:
+    def __init__(self, path: str, compression: str):
+        try:
+            import pyarrow as pa
+            import pyarrow.parquet as pq
+        except ImportError:
+            raise RuntimeError("Parquet eksporti uchun 'pyarrow' o'rnatilishi kerak (pip install pyarrow).")
+        self.pa = pa
+        self.schema = pa.schema([("username", pa.string()), ("status", pa.string()), ("checked_at", pa.string())])
+        self.writer = pq.ParquetWriter(path, self.schema, compression=compression)
+
+    def write(self, rows: List[Tuple[str, str, str]]):
+        # Har bir bo'lak alohida row group bo'lib yoziladi: xotirada bitta bo'lakdan ortiq turmaydi
+        usernames, statuses, checked = zip(*rows)
+        self.writer.write_table(self.pa.Table.from_arrays(
+            [self.pa.array(usernames), self.pa.array(statuses), self.pa.array(checked)], schema=self.schema))
+
+    def close(self):
+        self.writer.close()
+
+
+class ResultExporter:
+    """
+    Natijalarni bazadan bo'laklab o'qib CSV/NDJSON (ixtiyoriy gzip) yoki Parquet fayliga yozadi.
+    Har bir inkremental eksport nomi uchun oxirgi (checked_at, username) belgisi va status filtri saqlanadi,
+    shuning uchun keyingi eksport faqat shundan keyin yozilgan yoki yangilangan natijalarni oladi.
+    """
+    def __init__(self, db_path: str, state_path: str, chunk_size: int = 10000, safety_lag: float = 60):
+        self.db_path = db_path
+        self.state_path = state_path
+        self.chunk_size = chunk_size
+        # Hali yozilayotgan paketlar belgidan oldinroq checked_at bilan tushishi mumkin: oxirgi soniyalar keyingi safarga qoldiriladi
+        self.safety_lag = safety_lag
+
+    def _load_state(self) -> dict:
+        if not os.path.exists(self.state_path):
+            return {}
+        try:
+            with open(self.state_path, 'r') as f:
+                return json.load(f)
+        except (json.JSONDecodeError, OSError) as e:
+            logging.error(f"Eksport holatini o'qishda xato: {e}")
+            return {}
+
+    def _save_state(self, state: dict):
+        os.makedirs(os.path.dirname(self.state_path) or ".", exist_ok=True)
+        tmp_path = f"{self.state_path}.{os.getpid()}.tmp"
+        with open(tmp_path, 'w') as f:
+            json.dump(state, f, indent=4)
+        os.replace(tmp_path, self.state_path)
+
+    def export(self, output_path: str, fmt: str = "csv", name: str = "default", incremental: bool = False,
+               status: Optional[str] = None, compress: bool = False, compression: str = "snappy") -> dict:
+        if fmt not in EXPORT_FORMATS:
+            raise ValueError(f"Noma'lum format: {fmt}")
+        state = self._load_state()
+        previous = state.get(name) if incremental else None
+        if previous and previous.get("status") != status:
+            # Belgi boshqa filtr bilan olingan: undan davom etilsa filtrdan tashqaridagi qatorlar tushib qoladi
+            raise ValueError(f"'{name}' eksporti status={previous.get('status')} filtri bilan boshlangan, "
+                             f"status={status} uchun boshqa --name tanlang.")
+        after = (previous["checked_at"], previous["username"]) if previous and previous.get("checked_at") else None
+        until = (datetime.now() - timedelta(seconds=self.safety_lag)).isoformat()
+
+        os.makedirs(os.path.dirname(output_path) or ".", exist_ok=True)
+        tmp_path = f"{output_path}.tmp"
+        sink = _ParquetSink(tmp_path, compression) if fmt == "parquet" else _TextSink(tmp_path, fmt, compress)
+        rows_written = 0
+        last = None
+        try:
+            with closing(iter_result_chunks(self.db_path, after=after, until=until, status=status,
+                                            chunk_size=self.chunk_size)) as chunks:
+                for rows in chunks:
+                    sink.write(rows)
+                    rows_written += len(rows)
+                    last = rows[-1]
+        except BaseException:
+            sink.close()
+            os.remove(tmp_path)
+            raise
+        sink.close()
+        os.replace(tmp_path, output_path)
+
+        # Belgi faqat inkremental eksportda va fayl to'liq yozilgandan keyin siljiydi
+        entry = dict(previous or {})
+        if last is not None:
+            entry.update(checked_at=last[2], username=last[0])
+        entry.update(exported_at=datetime.now().isoformat(), rows=rows_written, file=output_path, status=status)
+        if incremental:
+            state[name] = entry
+            self._save_state(state)
+        logging.info(f"{rows_written} ta natija eksport qilindi: {output_path}")
+        return entry
+
+
+def default_export_path(output_dir: str, fmt: str, compress: bool) -> str:
+    suffix = fmt + (".gz" if compress and fmt != "parquet" else "")
+    return os.path.join(output_dir, "exports", f"results-{datetime.now().strftime('%Y%m%d-%H%M%S')}.{suffix}")
@@ -0,0 +1,132 @@
+# scripts/http_client_pool.py
+
+import asyncio
+import importlib.util
+import logging
+from collections import OrderedDict
+from contextlib import asynccontextmanager
+from typing import AsyncIterator, Dict, Optional
+
+import httpx
+
+pool_logger = logging.getLogger(__name__)
+
+
+def normalize_proxy_url(proxy: str) -> str:
+    # Fayldagi "host:port" ko'rinishidagi proksilarga sxema qo'shiladi
+    if "://" not in proxy:
+        return f"http://{proxy}"
+    return proxy
+
+
+class ClientPool:
+    """
+    Har bir proksi uchun bitta uzoq yashovchi httpx.AsyncClient saqlaydi.
+    Ulanishlar keep-alive orqali qayta ishlatiladi, shuning uchun TCP+TLS
+    handshake har bir username uchun emas, balki har bir ulanish uchun bir marta bo'ladi.
+    Klientlar borrow() orqali olinadi: LRU'dan chiqarilgan klient undagi oxirgi so'rov tugagach yopiladi.
+    """
+    def __init__(self,
+                 timeout: float = 15,
+                 max_connections_per_proxy: int = 10,
+                 max_keepalive_per_proxy: Optional[int] = None,
+                 keepalive_expiry: float = 60,
+                 http2: bool = False,
+                 max_clients: int = 1000):
+        self.timeout = timeout
+        # Keep-alive chegarasi parallel ulanishlardan kichik bo'lsa, har bir to'lqinda ortiqcha ulanishlar
+        # yopilib, keyingi so'rovlar uchun qaytadan ochiladi: standart holatda ikkalasi teng
+        if max_keepalive_per_proxy is None:
+            max_keepalive_per_proxy = max_connections_per_proxy
+        self.limits = httpx.Limits(
+            max_connections=max_connections_per_proxy,
+            max_keepalive_connections=max_keepalive_per_proxy,
+            keepalive_expiry=keepalive_expiry,
+        )
+        self.http2 = http2 and self._h2_available()
+        self.max_clients = max_clients
+        # CA sertifikatlarini yuklash qimmat (o'nlab ms): kontekst bir marta yaratilib, barcha klientlarga beriladi
+        self.ssl_context = httpx.create_ssl_context()
+        self._clients: "OrderedDict[str, httpx.AsyncClient]" = OrderedDict()
+        self._closing = set()
+        # Klient -> hozir shu klient orqali bajarilayotgan so'rovlar soni
+        self._in_use: Dict[httpx.AsyncClient, int] = {}
+        # Pool'dan chiqarilgan, lekin hali ishlatilayotgan klientlar
+        self._retired = set()
+
+    @staticmethod
+    def _h2_available() -> bool:
+        if importlib.util.find_spec("h2") is None:
+            pool_logger.warning("HTTP/2 so'ralgan, lekin 'h2' kutubxonasi o'rnatilmagan. HTTP/1.1 ishlatiladi.")
+            return False
+        return True
+
+    def _create_client(self, proxy: str) -> httpx.AsyncClient:
+        return httpx.AsyncClient(proxy=normalize_proxy_url(proxy),
+                                 timeout=self.timeout,
+                                 limits=self.limits,
+                                 http2=self.http2,
+                                 verify=self.ssl_context,
+                                 follow_redirects=True)
+
+    def get(self, proxy: str) -> httpx.AsyncClient:
+        client = self._clients.get(proxy)
+        if client is not None and not client.is_closed:
+            self._clients.move_to_end(proxy)
+            return client
+
+        client = self._create_client(proxy)
+        self._clients[proxy] = client
+        if len(self._clients) > self.max_clients:
+            # Eng uzoq ishlatilmagan klient yopiladi (LRU)
+            _, evicted = self._clients.popitem(last=False)
+            self._retire(evicted)
+        return client
+
+    @asynccontextmanager
+    async def borrow(self, proxy: str) -> AsyncIterator[httpx.AsyncClient]:
+        client = self.get(proxy)
+        self._in_use[client] = self._in_use.get(client, 0) + 1
+        try:
+            yield client
+        finally:
+            count = self._in_use.pop(client) - 1
+            if count:
+                self._in_use[client] = count
+            elif client in self._retired:
+                self._retired.discard(client)
+                self._schedule_close(client)
+
+    def _retire(self, client: httpx.AsyncClient):
+        if self._in_use.get(client):
+            # Boshqa worker'lar hali shu klient orqali o'qiyapti: oxirgisi qaytarganda yopiladi
+            self._retired.add(client)
+        else:
+            self._schedule_close(client)
+
+    def _schedule_close(self, client: httpx.AsyncClient):
+        task = asyncio.get_running_loop().create_task(client.aclose())
+        self._closing.add(task)
+        task.add_done_callback(self._closing.discard)
+
+    async def discard(self, proxy: str):
+        # Ishlamaydigan proksi ulanishlari yopiladi (davom etayotgan so'rovlar tugagach)
+        client = self._clients.pop(proxy, None)
+        if client is not None:
+            if self._in_use.get(client):
+                self._retired.add(client)
+            else:
+                await client.aclose()
+
+    async def aclose(self):
+        clients = list(self._clients.values()) + list(self._retired)
+        self._clients.clear()
+        self._retired.clear()
+        results = await asyncio.gather(*(c.aclose() for c in clients), *self._closing, return_exceptions=True)
+        for result in results:
+            if isinstance(result, Exception):
+                pool_logger.error(f"HTTP klientni yopishda xato: {result}")
+        pool_logger.info(f"{len(clients)} ta HTTP klient yopildi.")
+
+    def __len__(self):
+        return len(self._clients)
@@ -0,0 +1,269 @@
+# scripts/lease_runner.py
+
+import asyncio
+import logging
+import sqlite3
+import time
+from datetime import datetime
+from typing import Callable, Dict, Optional
+
+from scripts.async_utils import run_blocking
+from scripts.check_pipeline import CheckPipeline
+from scripts.db_manager import ResultWriter
+from scripts.username_source import iterate_spans
+from scripts.work_leases import DONE, FAILED, LEASED, PENDING, Lease, LeaseStore
+
+lease_logger = logging.getLogger(__name__)
+
+REPORT_BATCH_SIZE = 500
+DRAIN_BATCH_SIZE = 5000
+
+
+async def _wait(event: asyncio.Event, timeout: float) -> bool:
+    try:
+        await asyncio.wait_for(event.wait(), timeout)
+        return True
+    except asyncio.TimeoutError:
+        return False
+
+
+class LeaseNode:
+    """
+    Umumiy ombordan username oraliqlarini ijaraga olib tekshiradigan tugun. Proksilar, HTTP klientlar va
+    tezlik cheklovchisi barcha oraliqlar uchun bitta; har bir oraliq uchun faqat yangi CheckPipeline yaratiladi.
+    Natijalar va erishilgan ofset har report_interval soniyada bitta tranzaksiyada yuboriladi - bu heartbeat ham.
+    max_attempts marta ijaraga berilib tugallanmagan oraliq (masalan, har safar tugunni qulatadigan) FAILED bo'ladi.
+    """
+    def __init__(self, store: LeaseStore, source, proxy_handler, client_pool, classifier, rate_limiter,
+                 node_id: str, worker_count: int = 50, lease_ttl: float = 30.0, report_interval: float = 1.0,
+                 idle_interval: float = 5.0, max_attempts: int = 0):
+        self.store = store
+        self.source = source
+        self.proxy_handler = proxy_handler
+        self.client_pool = client_pool
+        self.classifier = classifier
+        self.rate_limiter = rate_limiter
+        self.node_id = node_id
+        self.worker_count = worker_count
+        self.lease_ttl = lease_ttl
+        self.report_interval = report_interval
+        self.idle_interval = idle_interval
+        self.max_attempts = max_attempts
+        self.counters = {"ranges": 0, "lost": 0, "checked": 0, "available": 0, "taken": 0, "errors": 0}
+        self.exhausted = False
+
+    async def _run_lease(self, lease: Lease, stop_event: asyncio.Event) -> str:
+        pipeline = CheckPipeline(self.proxy_handler, self.client_pool, self.classifier, self.rate_limiter,
+                                 worker_count=self.worker_count)
+        rows = []
+        processed = 0
+        lost = False
+        finished = False
+        wakeup = asyncio.Event()
+
+        def checkpoint_offset() -> int:
+            # Xato bilan tugagan username'lar natija sifatida (status=None) yuboriladi va koordinator bazasidagi
+            # qayta tekshirish jurnaliga tushadi, shuning uchun ofset ular ustidan siljiydi
+            watermark = pipeline.watermark
+            return watermark[1] if watermark else lease.offset
+
+        async def report():
+            nonlocal rows, processed, lost
+            # Watermark'gacha bo'lgan barcha natijalar on_result orqali rows'ga tushgan (on_result _mark_done'dan oldin)
+            batch, count, offset = rows, processed, checkpoint_offset()
+            rows, processed = [], 0
+            try:
+                ok = await run_blocking(self.store.report, lease, batch, offset, self.lease_ttl, count)
+            except sqlite3.Error as e:
+                # Umumiy papka vaqtincha javob bermadi: natijalar keyingi urinishda yuboriladi
+                lease_logger.error(f"Ijara omboriga yozishda xato: {e}")
+                rows, processed = batch + rows, processed + count
+                return
+            if not ok and not lost:
+                lost = True
+                self.counters["lost"] += 1
+                pipeline.work_queue.stop()
+                lease_logger.warning(f"{lease} boshqa tugunga o'tdi (muddati tugagan): oraliq tashlab ketildi.")
+
+        async def reporter():
+            while not finished:
+                await _wait(wakeup, self.report_interval)
+                wakeup.clear()
+                if not finished and not lost:
+                    await report()
+
+        def on_result(item, result):
+            nonlocal processed
+            username = item[-1]
+            if isinstance(result, Exception):
+                self.counters["errors"] += 1
+                rows.append((username, None, datetime.now().isoformat()))
+            elif result:
+                rows.append((username, result, datetime.now().isoformat()))
+                self.counters["checked"] += 1
+                if result in self.counters:
+                    self.counters[result] += 1
+            processed += 1
+            if len(rows) >= REPORT_BATCH_SIZE:
+                wakeup.set()
+
+        async def watch_stop():
+            await stop_event.wait()
+            pipeline.work_queue.stop()
+
+        reporter_task = asyncio.create_task(reporter())
+        watcher = asyncio.create_task(watch_stop())
+        try:
+            await pipeline.run(iterate_spans(self.source, lease.offset, lease.end), on_result)
+        finally:
+            watcher.cancel()
+            # Reporter bekor qilinmaydi: yarim yuborilgan paket yo'qolmasligi uchun joriy report tugashi kutiladi
+            finished = True
+            wakeup.set()
+            await reporter_task
+            if not lost:
+                await report()
+
+        if lost:
+            return "lost"
+        self.exhausted = self.exhausted or pipeline.exhausted
+        completed = not (pipeline.exhausted or stop_event.is_set() or rows)
+        try:
+            if completed:
+                ok = await run_blocking(self.store.complete, lease)
+            else:
+                # Tugunni to'xtatish oraliqning aybi emas: bunday qaytarish urinishlar soniga kirmaydi
+                ok = await run_blocking(self.store.release, lease, not stop_event.is_set())
+            if not ok:
+                return "lost"
+        except sqlite3.Error as e:
+            # Ijara muddati o'tgach boshqa tugun saqlangan ofsetdan davom ettiradi
+            lease_logger.error(f"Ijarani yakunlashda xato ({lease}): {e}")
+            return "lost"
+        return "done" if completed else "released"
+
+    async def run(self, stop_event: asyncio.Event) -> Dict[str, int]:
+        """
+        Ijaraga beriladigan oraliq qolmaguncha (yoki to'xtatilguncha) ishlaydi.
+        Boshqa tugunlardagi ijaralar tugamagan bo'lsa kutadi: ular qulasa, muddati o'tgach shu tugun davom ettiradi.
+        """
+        fingerprint = await run_blocking(self.source.fingerprint)
+        while not stop_event.is_set():
+            planned = await run_blocking(self.store.fingerprint)
+            if planned is None:
+                lease_logger.info("Koordinator hali reja tuzmagan, kutilmoqda...")
+            elif planned != fingerprint:
+                lease_logger.error("Username manbasi koordinator rejasiga mos emas (fayl boshqa). Tugun to'xtatildi.")
+                break
+            else:
+                lease = await run_blocking(self.store.claim, self.node_id, self.lease_ttl, self.max_attempts)
+                if lease is not None:
+                    lease_logger.info(f"Ijara olindi: {lease}")
+                    outcome = await self._run_lease(lease, stop_event)
+                    if outcome == "done":
+                        self.counters["ranges"] += 1
+                    if self.exhausted:
+                        lease_logger.critical("Barcha proksilar ishlamayapti: tugun to'xtatildi, oraliq qaytarildi.")
+                        break
+                    continue
+                summary = await run_blocking(self.store.summary)
+                if summary[PENDING] == 0 and summary[LEASED] == 0:
+                    if summary[FAILED]:
+                        lease_logger.warning(f"Ijaraga beriladigan oraliq qolmadi, {summary[FAILED]} tasi urinishlar "
+                                             f"chegarasidan keyin tashlab qo'yilgan.")
+                    else:
+                        lease_logger.info("Barcha oraliqlar tugallandi.")
+                    break
+            await _wait(stop_event, self.idle_interval)
+        lease_logger.info(f"Tugun {self.node_id} yakunladi: {self.counters['ranges']} ta oraliq, "
+                          f"{self.counters['checked']} ta username tekshirildi.")
+        return self.counters
+
+
+class LeaseCoordinator:
+    """
+    Username manbasini oraliqlarga bo'lib omborga yozadi, tugunlar yuborgan natijalarni asosiy bazaga ko'chiradi
+    va barcha oraliqlar tugallanguncha holatni kuzatadi. Natija ombordan faqat bazaga commit qilingandan keyin o'chiriladi.
+    """
+    def __init__(self, store: LeaseStore, source, result_writer: ResultWriter, range_count: int = 64,
+                 poll_interval: float = 2.0, status_interval: float = 30.0):
+        self.store = store
+        self.source = source
+        self.result_writer = result_writer
+        self.range_count = range_count
+        self.poll_interval = poll_interval
+        self.status_interval = status_interval
+        self.drained = 0
+
+    def plan(self, replan: bool = False, retry_failed: bool = False) -> bool:
+        """
+        replan=True - mavjud reja tashlanib, manba boshidan qayta bo'linadi;
+        retry_failed=True - urinishlar chegarasiga yetgan (FAILED) oraliqlar qayta navbatga qo'yiladi.
+        """
+        fingerprint = self.source.fingerprint()
+        ranges = self.source.split(self.range_count)
+        created = self.store.plan(fingerprint, ranges, replan=replan)
+        if created:
+            lease_logger.info(f"Yangi reja: {len(ranges)} ta oraliq.")
+            return created
+        if retry_failed:
+            lease_logger.info(f"{self.store.reset_failed()} ta muvaffaqiyatsiz oraliq qayta navbatga qo'yildi.")
+        summary = self.store.summary()
+        if summary[PENDING] == 0 and summary[LEASED] == 0:
+            lease_logger.info(f"Shu manba uchun reja allaqachon yakunlangan ({summary[DONE]} tugallangan, "
+                              f"{summary[FAILED]} muvaffaqiyatsiz): qayta boshlash uchun --replan, "
+                              f"muvaffaqiyatsizlarini qaytarish uchun --retry-failed.")
+        else:
+            lease_logger.info("Shu manba uchun reja mavjud: tugallanmagan oraliqlar davom ettiriladi.")
+        return created
+
+    async def drain(self) -> int:
+        moved = 0
+        while True:
+            batch = await run_blocking(self.store.fetch_results, DRAIN_BATCH_SIZE)
+            if not batch:
+                return moved
+            writer = self.result_writer
+            failed = writer.failed
+            for _, username, status, checked_at in batch:
+                if status is None:
+                    writer.submit_failure(username, checked_at)
+                else:
+                    writer.submit(username, status, checked_at)
+            ticket = writer.submitted
+            await writer.sync()
+            # Natija shu paket bo'yicha baholanadi: durable bitta xato paketdan keyin ish oxirigacha o'sha joyda qoladi
+            if writer.failed > failed or writer.written + writer.failed < ticket:
+                # Bazaga yozilmadi: natijalar omborda qoladi va keyingi safar qayta urinib ko'riladi
+                lease_logger.error("Tugun natijalari bazaga yozilmadi, ombordan o'chirilmaydi.")
+                return moved
+            await run_blocking(self.store.ack_results, batch[-1][0])
+            moved += len(batch)
+            self.drained += len(batch)
+            if len(batch) < DRAIN_BATCH_SIZE:
+                return moved
+
+    async def run(self, stop_event: asyncio.Event,
+                  on_progress: Optional[Callable[[Dict[str, int]], None]] = None) -> Dict[str, int]:
+        last_status = 0.0
+        while True:
+            await self.drain()
+            summary = await run_blocking(self.store.summary)
+            if on_progress is not None:
+                on_progress(summary)
+            if time.monotonic() - last_status >= self.status_interval:
+                last_status = time.monotonic()
+                lease_logger.info(f"Oraliqlar: {summary[DONE]} tugallandi, {summary[LEASED]} ijarada "
+                                  f"({summary['expired']} tasi muddati o'tgan), {summary[PENDING]} kutmoqda, "
+                                  f"{summary[FAILED]} muvaffaqiyatsiz; {self.drained} ta natija bazaga ko'chirildi.")
+            if summary[PENDING] == 0 and summary[LEASED] == 0 and summary["results_pending"] == 0:
+                if summary[FAILED]:
+                    lease_logger.warning(f"{summary[FAILED]} ta oraliq urinishlar chegarasidan keyin tugallanmadi, "
+                                         f"qolgan {summary[DONE]} tasi tugallandi.")
+                else:
+                    lease_logger.info("Barcha oraliqlar tugallandi.")
+                return summary
+            if await _wait(stop_event, self.poll_interval):
+                # To'xtatishda ham tugunlar yuborib bo'lgan natijalar bazaga ko'chiriladi
+                await self.drain()
+                return await run_blocking(self.store.summary)
@@ -0,0 +1,110 @@
+# scripts/local_http.py
+
+import asyncio
+import json
+import logging
+from typing import Awaitable, Callable, Dict, Optional, Tuple
+from urllib.parse import parse_qs, urlsplit
+
+http_logger = logging.getLogger(__name__)
+
+MAX_BODY_BYTES = 10 * 1024 * 1024
+REASONS = {200: "OK", 201: "Created", 202: "Accepted", 400: "Bad Request", 404: "Not Found",
+           405: "Method Not Allowed", 413: "Payload Too Large", 500: "Internal Server Error",
+           503: "Service Unavailable"}
+
+
+class Request:
+    def __init__(self, method: str, target: str, headers: Dict[str, str], body: bytes):
+        parts = urlsplit(target)
+        self.method = method
+        self.path = parts.path
+        self.query = {key: values[-1] for key, values in parse_qs(parts.query).items()}
+        self.headers = headers
+        self.body = body
+
+    def json(self):
+        return json.loads(self.body or b"null")
+
+
+Response = Tuple[int, bytes, str]
+Handler = Callable[[Request], Awaitable[Response]]
+
+
+def json_response(data, status: int = 200) -> Response:
+    return status, json.dumps(data, ensure_ascii=False).encode(), "application/json"
+
+
+class LocalHTTPServer:
+    """
+    Faqat mahalliy foydalanish uchun minimal HTTP/1.1 server (metrikalar, boshqaruv API'si).
+    Har bir so'rovdan keyin ulanish yopiladi, shuning uchun keep-alive va chunked kodlash kerak emas.
+    """
+    def __init__(self, host: str = "127.0.0.1", port: int = 0):
+        self.host = host
+        self.port = port
+        self._routes: Dict[Tuple[str, str], Handler] = {}
+        self._server: Optional[asyncio.AbstractServer] = None
+
+    def route(self, method: str, path: str, handler: Handler):
+        self._routes[(method.upper(), path)] = handler
+
+    async def start(self):
+        self._server = await asyncio.start_server(self._handle, self.host, self.port)
+        self.port = self._server.sockets[0].getsockname()[1]
+        http_logger.info(f"Mahalliy HTTP server ishga tushdi: http://{self.host}:{self.port}")
+
+    async def close(self):
+        if self._server is not None:
+            self._server.close()
+            await self._server.wait_closed()
+            self._server = None
+
+    async def _read_request(self, reader: asyncio.StreamReader) -> Optional[Request]:
+        request_line = await reader.readline()
+        if not request_line:
+            return None
+        method, target, _ = request_line.decode("latin-1").split(" ", 2)
+        headers = {}
+        while True:
+            line = await reader.readline()
+            if line in (b"\r\n", b"\n", b""):
+                break
+            name, _, value = line.decode("latin-1").partition(":")
+            headers[name.strip().lower()] = value.strip()
+        length = int(headers.get("content-length", 0) or 0)
+        if length > MAX_BODY_BYTES:
+            raise ValueError("payload too large")
+        body = await reader.readexactly(length) if length else b""
+        return Request(method.upper(), target, headers, body)
+
+    async def _handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        try:
+            try:
+                request = await self._read_request(reader)
+            except (ValueError, asyncio.IncompleteReadError):
+                status, body, content_type = 400, b"bad request", "text/plain"
+            else:
+                if request is None:
+                    return
+                status, body, content_type = await self._dispatch(request)
+            reason = REASONS.get(status, "")
+            writer.write((f"HTTP/1.1 {status} {reason}\r\nContent-Type: {content_type}\r\n"
+                          f"Content-Length: {len(body)}\r\nConnection: close\r\n\r\n").encode() + body)
+            await writer.drain()
+        except ConnectionError:
+            pass
+        finally:
+            writer.close()
+
+    async def _dispatch(self, request: Request) -> Response:
+        handler = self._routes.get((request.method, request.path))
+        if handler is None:
+            if any(path == request.path for _, path in self._routes):
+                return 405, b"method not allowed", "text/plain"
+            return 404, b"not found", "text/plain"
+        try:
+            return await handler(request)
+        except Exception as e:
+            http_logger.error(f"HTTP so'rovni qayta ishlashda xato ({request.method} {request.path}): {e}")
+            return 500, b"internal error", "text/plain"
@@ -0,0 +1,202 @@
+# scripts/logging_setup.py
+
+import copy
+import gzip
+import json
+import logging
+import logging.handlers
+import os
+import queue
+import shutil
+import sys
+import time
+from datetime import datetime
+from typing import List, Optional
+
+TEXT_FORMAT = '%(asctime)s - %(levelname)s - %(message)s'
+# Yozuvga extra= orqali berilgan va JSON qatoriga qo'shiladigan maydonlar
+JSON_FIELDS = ("username", "proxy", "status", "shard", "suppressed")
+# Bu logger'larning INFO yozuvlari ham har bir so'rov uchun chiqadi (httpx: "HTTP Request: ...")
+SAMPLED_LOGGERS = ("httpx",)
+
+_listener: Optional[logging.handlers.QueueListener] = None
+_queue_handler: Optional[logging.Handler] = None
+
+
+class JsonFormatter(logging.Formatter):
+    """
+    Har bir yozuvni bitta JSON qatori sifatida chiqaradi (log yig'uvchi tizimlar uchun).
+    """
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            "ts": datetime.fromtimestamp(record.created).isoformat(timespec="milliseconds"),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+        }
+        for field in JSON_FIELDS:
+            value = getattr(record, field, None)
+            if value is not None:
+                entry[field] = value
+        if record.exc_text:
+            entry["exception"] = record.exc_text
+        return json.dumps(entry, ensure_ascii=False)
+
+
+class SamplingFilter(logging.Filter):
+    """
+    extra={"sampled": True} bilan belgilangan (yoki SAMPLED_LOGGERS'dan kelgan) har bir username uchun INFO yozuvlarini
+    soniyasiga ko'pi bilan `rate` tagacha kamaytiradi. WARNING va undan yuqori yozuvlar doim o'tadi.
+    Tashlab yuborilganlar soni keyingi o'tgan yozuvning `suppressed` maydonida ko'rsatiladi.
+    """
+    def __init__(self, rate: float):
+        super().__init__()
+        self.rate = rate
+        self._window = 0
+        self._passed = 0
+        self._suppressed = 0
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if self.rate <= 0 or record.levelno >= logging.WARNING:
+            return True
+        if not getattr(record, "sampled", False) and record.name not in SAMPLED_LOGGERS:
+            return True
+        window = int(time.monotonic())
+        if window != self._window:
+            self._window = window
+            self._passed = 0
+        if self._passed >= self.rate:
+            self._suppressed += 1
+            return False
+        self._passed += 1
+        if self._suppressed:
+            record.suppressed = self._suppressed
+            self._suppressed = 0
+        return True
+
+
+class _QueueHandler(logging.handlers.QueueHandler):
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        # Standart prepare() yozuvni to'liq formatlaydi; bu yerda faqat xabar va traceback matnga aylantiriladi,
+        # vaqt belgisi va formatlash esa listener thread'ida bajariladi
+        record = copy.copy(record)
+        record.msg = record.getMessage()
+        record.args = None
+        if record.exc_info:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+            record.exc_info = None
+        return record
+
+
+def _gzip_namer(name: str) -> str:
+    return f"{name}.gz"
+
+
+def _gzip_rotator(source: str, dest: str):
+    # Aylantirilgan fayl darhol siqiladi (listener thread'ida, event loop'dan tashqarida)
+    with open(source, 'rb') as src, gzip.open(dest, 'wb') as dst:
+        shutil.copyfileobj(src, dst)
+    os.remove(source)
+
+
+def _file_handler(path: str, level: int, formatter: logging.Formatter) -> logging.Handler:
+    backup_count = int(os.getenv("LOG_BACKUP_COUNT", "10"))
+    when = os.getenv("LOG_ROTATE_WHEN")
+    if when:
+        handler = logging.handlers.TimedRotatingFileHandler(path, when=when, backupCount=backup_count,
+                                                            encoding='utf-8', delay=True)
+    else:
+        handler = logging.handlers.RotatingFileHandler(path, maxBytes=int(os.getenv("LOG_MAX_BYTES", str(50 * 1024 * 1024))),
+                                                       backupCount=backup_count, encoding='utf-8', delay=True)
+    handler.namer = _gzip_namer
+    handler.rotator = _gzip_rotator
+    handler.setLevel(level)
+    handler.setFormatter(formatter)
+    return handler
+
+
+def setup_logging(log_file: Optional[str] = None, error_log_file: Optional[str] = None,
+                  log_format: Optional[str] = None, sample_rate: Optional[float] = None) -> bool:
+    """
+    Root logger'ni QueueHandler'ga ulaydi: yozuvlar navbatga tushadi, formatlash va fayl yozish esa
+    alohida listener thread'ida bajariladi. Allaqachon sozlangan bo'lsa hech narsa qilmaydi va False qaytaradi.
+    """
+    global _listener, _queue_handler
+    if _listener is not None:
+        return False
+
+    log_file = log_file or os.getenv("LOG_FILE_PATH", "logs/checker.log")
+    error_log_file = error_log_file or os.getenv("ERROR_LOG_PATH", "logs/errors.log")
+    log_format = (log_format or os.getenv("LOG_FORMAT", "text")).lower()
+    sample_rate = sample_rate if sample_rate is not None else float(os.getenv("LOG_SAMPLE_RATE", "10"))
+    for path in (log_file, error_log_file):
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+
+    text_formatter = logging.Formatter(TEXT_FORMAT)
+    file_formatter = JsonFormatter() if log_format == "json" else text_formatter
+
+    stream_handler = logging.StreamHandler(sys.stdout)
+    stream_handler.setFormatter(text_formatter)
+    stream_handler.setLevel(logging.INFO)
+    handlers: List[logging.Handler] = [
+        stream_handler,
+        _file_handler(log_file, logging.INFO, file_formatter),
+        _file_handler(error_log_file, logging.ERROR, file_formatter),
+    ]
+
+    log_queue: "queue.SimpleQueue" = queue.SimpleQueue()
+    _queue_handler = _QueueHandler(log_queue)
+    _queue_handler.addFilter(SamplingFilter(sample_rate))
+    root = logging.getLogger()
+    root.setLevel(logging.INFO)
+    root.addHandler(_queue_handler)
+    _listener = logging.handlers.QueueListener(log_queue, *handlers, respect_handler_level=True)
+    _listener.start()
+    return True
+
+
+class _ForwardHandler(logging.Handler):
+    """
+    Bola jarayonlardan kelgan yozuvlarni shu jarayonning logger'lariga uzatadi: ular ota jarayonning
+    handler'lari (konsol, aylantiriladigan fayllar) orqali yoziladi.
+    """
+    def emit(self, record: logging.LogRecord):
+        logging.getLogger(record.name).handle(record)
+
+
+def setup_child_logging(log_queue, **fields):
+    """
+    Bola jarayon (shard) uchun: yozuvlar formatlanmasdan log_queue orqali ota jarayonga yuboriladi,
+    fayllarni faqat ota jarayon yozadi (aylantirish bir nechta jarayondan buzilmaydi). fields har bir yozuvga qo'shiladi.
+    """
+    def add_fields(record: logging.LogRecord) -> bool:
+        for key, value in fields.items():
+            setattr(record, key, value)
+        return True
+
+    handler = _QueueHandler(log_queue)
+    handler.addFilter(SamplingFilter(float(os.getenv("LOG_SAMPLE_RATE", "10"))))
+    handler.addFilter(add_fields)
+    root = logging.getLogger()
+    root.setLevel(logging.INFO)
+    root.addHandler(handler)
+
+
+def start_log_forwarding(log_queue) -> logging.handlers.QueueListener:
+    # setup_child_logging bilan sozlangan jarayonlar yozuvlarini qabul qiladi; to'xtatish uchun listener.stop()
+    listener = logging.handlers.QueueListener(log_queue, _ForwardHandler())
+    listener.start()
+    return listener
+
+
+def shutdown_logging():
+    # Navbatdagi barcha yozuvlar yozib bo'linguncha kutiladi, keyin fayllar yopiladi
+    global _listener, _queue_handler
+    if _listener is None:
+        return
+    logging.getLogger().removeHandler(_queue_handler)
+    _listener.stop()
+    for handler in _listener.handlers:
+        handler.close()
+    _listener = None
+    _queue_handler = None
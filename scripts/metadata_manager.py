@@ -1,6 +1,8 @@
 import os
 import json
+import time
 import logging
+from collections import deque
 from datetime import datetime
 
 class MetadataManager:
@@ -24,15 +26,26 @@ class MetadataManager:
             "last_run_time": datetime.now().isoformat(),
             "total_usernames_checked": 0,
             "last_checked_username": None,
-            "status": "initial"
+            "status": "initial",
+            "source_fingerprint": None,
+            "byte_offset": 0
         }
 
-    def save_metadata(self):
+    def save_metadata(self, durable: bool = False):
+        """
+        Metadata vaqtinchalik faylga yozilib, os.replace bilan almashtiriladi: yarim yozilgan fayl qolmaydi.
+        fsync faqat durable=True bo'lganda (ish oxirida) bajariladi, oraliq checkpoint'lar uchun emas.
+        """
+        tmp_path = f"{self.metadata_path}.tmp"
         try:
-            with open(self.metadata_path, 'w') as f:
+            with open(tmp_path, 'w') as f:
                 json.dump(self.metadata, f, indent=4)
-            logging.info("Metadata muvaffaqiyatli saqlandi.")
-        except IOError as e:
+                if durable:
+                    f.flush()
+                    os.fsync(f.fileno())
+            os.replace(tmp_path, self.metadata_path)
+            logging.debug("Metadata muvaffaqiyatli saqlandi.")
+        except OSError as e:
             logging.error(f"Metadata faylini saqlashda xato: {e}")
 
     def update_metadata(self, key, value):
@@ -40,3 +53,81 @@ class MetadataManager:
 
     def get_metadata(self, key):
         return self.metadata.get(key)
+
+    def set_checkpoint(self, fingerprint, byte_offset, line_index):
+        self.metadata["source_fingerprint"] = fingerprint
+        self.metadata["byte_offset"] = byte_offset
+        self.metadata["total_usernames_checked"] = line_index
+
+    def get_resume_offset(self, source):
+        """
+        Manba fayli o'zgarmagan bo'lsa, saqlangan bayt ofsetini qaytaradi, aks holda 0.
+        """
+        fingerprint = source.fingerprint()
+        size = source.size
+        saved_fingerprint = self.metadata.get("source_fingerprint")
+        if saved_fingerprint is None and self.metadata.get("total_usernames_checked"):
+            # Ofset saqlanmagan eski metadata
+            offset = source.offset_after_lines(self.metadata["total_usernames_checked"])
+        elif saved_fingerprint == fingerprint:
+            offset = self.metadata.get("byte_offset") or 0
+        else:
+            if saved_fingerprint is not None:
+                logging.warning("Username fayli o'zgargan, tekshiruv boshidan boshlanadi.")
+            offset = 0
+
+        if offset >= size:
+            offset = 0
+        if offset == 0:
+            self.set_checkpoint(fingerprint, 0, 0)
+        return offset
+
+
+class CheckpointJournal:
+    """
+    Resume nuqtasini faqat bazaga yozilgan (commit qilingan) natijalargacha siljitadi.
+    Har bir checkpoint ResultWriter'ga shu paytgacha topshirilgan qatorlar soni (ticket) bilan navbatga qo'yiladi
+    va yozuvchi shu ticket'gacha commit qilgandagina metadata'ga tushadi. Saqlash vaqt yoki son bo'yicha
+    siyraklashtirilgan, shuning uchun qulash holatida faqat oxirgi kichik oyna qayta tekshiriladi.
+    """
+    def __init__(self, metadata_manager: MetadataManager, result_writer=None,
+                 interval: float = 5.0, every: int = 1000):
+        self.metadata_manager = metadata_manager
+        self.result_writer = result_writer
+        self.interval = interval
+        self.every = every
+        self._pending = deque()
+        self._count = 0
+        self._last_save = time.monotonic()
+
+    def tick(self) -> bool:
+        # Navbatdagi checkpoint vaqti kelganini bildiradi
+        self._count += 1
+        return self._count >= self.every or time.monotonic() - self._last_save >= self.interval
+
+    def _durable_ticket(self) -> float:
+        return self.result_writer.durable if self.result_writer is not None else float("inf")
+
+    def record(self, state: dict, durable: bool = False) -> bool:
+        """
+        Yangi holatni navbatga qo'yadi va bazaga yozilganlari ichidan eng oxirgisini saqlaydi.
+        """
+        ticket = self.result_writer.submitted if self.result_writer is not None else 0
+        self._pending.append((ticket, state))
+        self._count = 0
+        self._last_save = time.monotonic()
+        committed = self._durable_ticket()
+        ready = None
+        while self._pending and self._pending[0][0] <= committed:
+            ready = self._pending.popleft()[1]
+        if ready is None:
+            return False
+        self.metadata_manager.metadata.update(ready)
+        self.metadata_manager.save_metadata(durable=durable)
+        return True
+
+    async def finalize(self, state: dict) -> bool:
+        # Ish oxirida yozuvchi navbati bo'shatiladi va oxirgi holat diskka to'liq (fsync bilan) tushiriladi
+        if self.result_writer is not None:
+            await self.result_writer.sync()
+        return self.record(state, durable=True)
@@ -0,0 +1,344 @@
+# scripts/metrics.py
+
+import asyncio
+import bisect
+import functools
+import math
+from abc import ABC, abstractmethod
+from typing import Callable, Dict, Iterable, List, Optional, Sequence, Tuple
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+SIZE_BUCKETS = (1, 10, 50, 100, 250, 500, 1000, 2500, 5000)
+
+
+@functools.lru_cache(maxsize=65536)
+def proxy_label(proxy: str) -> str:
+    # Proksi login/paroli metrikalarga va /metrics javobiga tushmasligi kerak
+    scheme, sep, rest = proxy.rpartition("://")
+    host = rest.rsplit("@", 1)[-1]
+    return f"{scheme}{sep}{host}"
+
+
+class _CounterChild:
+    __slots__ = ("value",)
+
+    def __init__(self):
+        self.value = 0.0
+
+    def inc(self, amount: float = 1.0):
+        self.value += amount
+
+
+class _GaugeChild:
+    __slots__ = ("value", "function")
+
+    def __init__(self):
+        self.value = 0.0
+        self.function: Optional[Callable[[], float]] = None
+
+    def set(self, value: float):
+        self.value = value
+
+    def inc(self, amount: float = 1.0):
+        self.value += amount
+
+    def dec(self, amount: float = 1.0):
+        self.value -= amount
+
+    def set_function(self, function: Callable[[], float]):
+        # Qiymat faqat o'qilganda hisoblanadi: issiq yo'lda yangilash shart emas
+        self.function = function
+
+    def get(self) -> float:
+        if self.function is not None:
+            try:
+                return float(self.function())
+            except Exception:
+                return math.nan
+        return self.value
+
+
+class _HistogramChild:
+    __slots__ = ("buckets", "counts", "sum", "count")
+
+    def __init__(self, buckets: Sequence[float]):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value: float):
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+
+class _Metric(ABC):
+    kind = ""
+
+    def __init__(self, name: str, documentation: str, labelnames: Iterable[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._children: Dict[Tuple[str, ...], object] = {}
+        if not self.labelnames:
+            self._default = self.labels()
+
+    @abstractmethod
+    def _new_child(self):
+        pass
+
+    def labels(self, *values: str):
+        child = self._children.get(values)
+        if child is None:
+            child = self._children[values] = self._new_child()
+        return child
+
+    @abstractmethod
+    def _series_value(self, child):
+        pass
+
+    def snapshot(self) -> dict:
+        return {"kind": self.kind, "help": self.documentation, "labelnames": self.labelnames,
+                "buckets": getattr(self, "buckets", None),
+                "series": {labels: self._series_value(child) for labels, child in self._children.items()}}
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def _new_child(self):
+        return _CounterChild()
+
+    def inc(self, amount: float = 1.0):
+        self._default.inc(amount)
+
+    def _series_value(self, child):
+        return child.value
+
+
+class Gauge(_Metric):
+    kind = "gauge"
+
+    def _new_child(self):
+        return _GaugeChild()
+
+    def set(self, value: float):
+        self._default.set(value)
+
+    def set_function(self, function: Callable[[], float]):
+        self._default.set_function(function)
+
+    def _series_value(self, child):
+        return child.get()
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(self, name: str, documentation: str, labelnames: Iterable[str] = (),
+                 buckets: Sequence[float] = LATENCY_BUCKETS):
+        self.buckets = tuple(sorted(buckets))
+        super().__init__(name, documentation, labelnames)
+
+    def _new_child(self):
+        return _HistogramChild(self.buckets)
+
+    def observe(self, value: float):
+        self._default.observe(value)
+
+    def _series_value(self, child):
+        return (list(child.counts), child.sum, child.count)
+
+
+def _merge_value(kind: str, current, value):
+    if current is None:
+        return value
+    if kind == "histogram":
+        return ([a + b for a, b in zip(current[0], value[0])], current[1] + value[1], current[2] + value[2])
+    return current + value
+
+
+def _quantile(q: float, buckets: Sequence[float], counts: List[int]) -> Optional[float]:
+    # Prometheus histogram_quantile kabi: bucket ichida chiziqli interpolyatsiya
+    total = sum(counts)
+    if not total:
+        return None
+    rank = q * total
+    cumulative = 0
+    for index, count in enumerate(counts):
+        if cumulative + count >= rank and count:
+            lower = buckets[index - 1] if index > 0 else 0.0
+            if index >= len(buckets):
+                return lower
+            return lower + (buckets[index] - lower) * (rank - cumulative) / count
+        cumulative += count
+    return buckets[-1]
+
+
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _format_labels(labelnames: Sequence[str], values: Sequence[str], extra: str = "") -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(labelnames, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _format_number(value: float) -> str:
+    if value == math.inf:
+        return "+Inf"
+    if isinstance(value, float) and value.is_integer():
+        return str(int(value))
+    return repr(value)
+
+
+class MetricsRegistry:
+    """
+    Jarayon ichidagi metrikalar reyestri. Metrikalar event loop ichida yangilanadi, shuning uchun qulf kerak emas.
+    Shard jarayonlari o'z snapshot'larini yuboradi, ular merge_remote() orqali umumiy ko'rinishga qo'shiladi.
+    """
+    def __init__(self):
+        self._metrics: Dict[str, _Metric] = {}
+        self._remote: Dict[str, Dict[str, dict]] = {}
+
+    def _register(self, metric: _Metric) -> _Metric:
+        existing = self._metrics.get(metric.name)
+        if existing is not None:
+            return existing
+        self._metrics[metric.name] = metric
+        return metric
+
+    def counter(self, name: str, documentation: str, labelnames: Iterable[str] = ()) -> Counter:
+        return self._register(Counter(name, documentation, labelnames))
+
+    def gauge(self, name: str, documentation: str, labelnames: Iterable[str] = ()) -> Gauge:
+        return self._register(Gauge(name, documentation, labelnames))
+
+    def histogram(self, name: str, documentation: str, labelnames: Iterable[str] = (),
+                  buckets: Sequence[float] = LATENCY_BUCKETS) -> Histogram:
+        return self._register(Histogram(name, documentation, labelnames, buckets))
+
+    def snapshot(self) -> Dict[str, dict]:
+        return {name: metric.snapshot() for name, metric in self._metrics.items()}
+
+    def merge_remote(self, source: str, snapshot: Dict[str, dict]):
+        # Har bir manbadan faqat oxirgi snapshot saqlanadi (qiymatlar kumulyativ)
+        self._remote[source] = snapshot
+
+    def collect(self) -> Dict[str, dict]:
+        combined: Dict[str, dict] = {}
+        for snapshot in [self.snapshot(), *self._remote.values()]:
+            for name, data in snapshot.items():
+                target = combined.setdefault(name, {**data, "series": {}})
+                for labels, value in data["series"].items():
+                    target["series"][labels] = _merge_value(data["kind"], target["series"].get(labels), value)
+        return combined
+
+    def render_prometheus(self) -> str:
+        lines = []
+        for name, data in sorted(self.collect().items()):
+            lines.append(f"# HELP {name} {data['help']}")
+            lines.append(f"# TYPE {name} {data['kind']}")
+            labelnames = data["labelnames"]
+            for labels, value in sorted(data["series"].items()):
+                if data["kind"] != "histogram":
+                    lines.append(f"{name}{_format_labels(labelnames, labels)} {_format_number(value)}")
+                    continue
+                counts, total, count = value
+                cumulative = 0
+                for bound, bucket_count in zip(list(data["buckets"]) + [math.inf], counts):
+                    cumulative += bucket_count
+                    le = 'le="' + _format_number(float(bound)) + '"'
+                    lines.append(f"{name}_bucket{_format_labels(labelnames, labels, le)} {cumulative}")
+                lines.append(f"{name}_sum{_format_labels(labelnames, labels)} {_format_number(total)}")
+                lines.append(f"{name}_count{_format_labels(labelnames, labels)} {count}")
+        return "\n".join(lines) + "\n"
+
+    def summary(self) -> Dict[str, dict]:
+        """
+        Hisobot uchun ixcham ko'rinish: hisoblagichlar qiymati, gistogrammalar uchun son, o'rtacha va p50/p95/p99.
+        """
+        result = {}
+        for name, data in sorted(self.collect().items()):
+            series = {}
+            for labels, value in data["series"].items():
+                key = ",".join(f"{n}={v}" for n, v in zip(data["labelnames"], labels)) or "total"
+                if data["kind"] == "histogram":
+                    counts, total, count = value
+                    quantiles = {f"p{int(q * 100)}": _quantile(q, data["buckets"], counts) for q in (0.5, 0.95, 0.99)}
+                    series[key] = {"count": count, "sum": round(total, 6),
+                                   "mean": round(total / count, 6) if count else None,
+                                   **{k: round(v, 6) if v is not None else None for k, v in quantiles.items()}}
+                else:
+                    series[key] = value
+            result[name] = series
+        return result
+
+
+REGISTRY = MetricsRegistry()
+
+REQUEST_SECONDS = REGISTRY.histogram("checker_request_seconds", "Bitta HTTP so'rov davomiyligi (proksi bo'yicha)", ("proxy",))
+ATTEMPTS = REGISTRY.counter("checker_attempts_total", "Tekshiruv urinishlari (urinish raqami bo'yicha)", ("attempt",))
+THROTTLED = REGISTRY.counter("checker_throttled_total", "429 javoblar soni")
+BYTES_DOWNLOADED = REGISTRY.counter("checker_bytes_downloaded_total", "Yuklab olingan baytlar")
+RESULTS = REGISTRY.counter("checker_results_total", "Tekshiruv natijalari", ("status",))
+QUEUE_WAIT_SECONDS = REGISTRY.histogram("work_queue_wait_seconds", "Element navbatda kutgan vaqt")
+RATE_LIMIT_WAIT_SECONDS = REGISTRY.histogram("rate_limiter_wait_seconds", "Token bucket kutish vaqti")
+DB_FLUSH_SECONDS = REGISTRY.histogram("db_flush_seconds", "Natijalar paketini bazaga yozish vaqti")
+DB_BATCH_ROWS = REGISTRY.histogram("db_batch_rows", "Bitta paketdagi qatorlar soni", buckets=SIZE_BUCKETS)
+LOOP_LAG_SECONDS = REGISTRY.histogram("event_loop_lag_seconds", "Event loop kechikishi")
+USABLE_PROXIES = REGISTRY.gauge("proxy_usable", "Ishlatish mumkin bo'lgan proksilar soni")
+GLOBAL_RATE = REGISTRY.gauge("rate_limiter_global_rate", "Joriy global tezlik (so'rov/s)")
+
+
+class LoopLagMonitor:
+    """
+    Event loop kechikishini o'lchaydi: belgilangan vaqtga uxlab, qancha kech uyg'onganini yozadi.
+    """
+    def __init__(self, interval: float = 0.5, histogram: Histogram = LOOP_LAG_SECONDS):
+        self.interval = interval
+        self.histogram = histogram
+        self._task: Optional[asyncio.Task] = None
+
+    def start(self):
+        if self._task is None:
+            self._task = asyncio.get_running_loop().create_task(self._run())
+
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            expected = loop.time() + self.interval
+            await asyncio.sleep(self.interval)
+            self.histogram.observe(max(0.0, loop.time() - expected))
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+
+async def start_metrics_server(host: str, port: int, registry: MetricsRegistry = REGISTRY):
+    """
+    /metrics manzilida Prometheus matn formatini beruvchi mahalliy serverni ishga tushiradi.
+    """
+    from scripts.local_http import LocalHTTPServer, json_response
+
+    server = LocalHTTPServer(host, port)
+
+    async def metrics(request):
+        return 200, registry.render_prometheus().encode(), "text/plain; version=0.0.4"
+
+    async def metrics_json(request):
+        return json_response(registry.summary())
+
+    server.route("GET", "/metrics", metrics)
+    server.route("GET", "/metrics.json", metrics_json)
+    await server.start()
+    return server
@@ -1,21 +1,146 @@
 # scripts/proxy_handler.py
 
+import heapq
+import json
 import random
 import logging
 import os
 import time
-from typing import List, Set, Dict
+from collections import deque
+from typing import List, Optional, Set, Dict, Tuple
+
+CLOSED = 'closed'
+OPEN = 'open'
+HALF_OPEN = 'half_open'
+
+
+class ProxyStats:
+    """
+    Bitta proksining sog'lig'i: EWMA kechikish, EWMA muvaffaqiyat darajasi,
+    so'nggi xato turlari va circuit breaker holati.
+    """
+    __slots__ = ('latency', 'success_rate', 'consecutive_failures', 'state', 'open_until',
+                 'trips', 'successes', 'failures', 'recent_errors')
+
+    def __init__(self, latency: float = 1.0, success_rate: float = 1.0):
+        # Yangi proksilar uchun optimistik boshlang'ich qiymatlar, ular ham sinab ko'rilishi uchun
+        self.latency = latency
+        self.success_rate = success_rate
+        self.consecutive_failures = 0
+        self.state = CLOSED
+        self.open_until = 0.0
+        self.trips = 0
+        self.successes = 0
+        self.failures = 0
+        self.recent_errors = deque(maxlen=10)
+
+    def score(self) -> float:
+        return self.success_rate / max(self.latency, 0.05)
+
+    def to_dict(self) -> dict:
+        return {
+            "latency": round(self.latency, 4),
+            "success_rate": round(self.success_rate, 4),
+            "consecutive_failures": self.consecutive_failures,
+            "state": self.state,
+            "open_until": self.open_until,
+            "trips": self.trips,
+            "successes": self.successes,
+            "failures": self.failures,
+            "recent_errors": list(self.recent_errors),
+        }
+
+    @classmethod
+    def from_dict(cls, data: dict) -> "ProxyStats":
+        stats = cls(data.get("latency", 1.0), data.get("success_rate", 1.0))
+        stats.consecutive_failures = data.get("consecutive_failures", 0)
+        stats.state = data.get("state", CLOSED)
+        stats.open_until = data.get("open_until", 0.0)
+        stats.trips = data.get("trips", 0)
+        stats.successes = data.get("successes", 0)
+        stats.failures = data.get("failures", 0)
+        stats.recent_errors.extend(data.get("recent_errors", []))
+        return stats
+
+
+def merge_proxy_stats(stats_path: str, updates: Dict[str, dict]):
+    """
+    Statistikani faylga qo'shib yozadi: boshqa proksilar (masalan, boshqa jarayon qismi) yozuvlari saqlanib qoladi.
+    """
+    data = {}
+    if os.path.exists(stats_path):
+        try:
+            with open(stats_path, 'r') as f:
+                data = json.load(f)
+        except (json.JSONDecodeError, OSError) as e:
+            logging.error(f"Proksi statistikasini o'qishda xato: {e}")
+    data.update(updates)
+    tmp_path = f"{stats_path}.{os.getpid()}.tmp"
+    try:
+        with open(tmp_path, 'w') as f:
+            json.dump(data, f)
+        os.replace(tmp_path, stats_path)
+    except OSError as e:
+        logging.error(f"Proksi statistikasini saqlashda xato: {e}")
+
 
 class ProxyHandler:
-    def __init__(self, proxy_file_path: str):
+    def __init__(self, proxy_file_path: str, cooldown_time: float = 120,
+                 stats_path: Optional[str] = None,
+                 failure_threshold: int = 3,
+                 open_time: float = 60,
+                 max_open_time: float = 3600,
+                 max_trips: int = 10,
+                 ewma_alpha: float = 0.2,
+                 sample_size: int = 2,
+                 partition: Optional[Tuple[int, int]] = None,
+                 probe_results: Optional[Dict[str, dict]] = None):
         self.proxy_file_path = proxy_file_path
         self.bad_proxies_path = os.path.join(os.path.dirname(proxy_file_path), 'bad_proxies.txt')
-        
+        self.stats_path = stats_path or os.path.join(os.path.dirname(proxy_file_path), 'proxy_stats.json')
+        self.cooldown_time = cooldown_time
+        self.failure_threshold = failure_threshold
+        self.open_time = open_time
+        self.max_open_time = max_open_time
+        self.max_trips = max_trips
+        self.ewma_alpha = ewma_alpha
+        self.sample_size = max(1, sample_size)
+
         # Ro'yxatni set'ga o'zgartirdik, endi ularni bemalol ayirish mumkin
         self.proxies: Set[str] = self._load_proxies(self.proxy_file_path)
+        if partition is not None:
+            self.proxies = self._partition(self.proxies, *partition)
+        if probe_results:
+            self.proxies = self._drop_dead(self.proxies, probe_results)
         self.bad_proxies: Set[str] = self._load_proxies(self.bad_proxies_path)
         self.proxy_usage: Dict[str, float] = {p: 0.0 for p in self.proxies}
-        
+        self.stats: Dict[str, ProxyStats] = self._load_stats()
+
+        # Tayyor proksilar (O(1) tasodifiy tanlash uchun ro'yxat + indeks)
+        # va cooldown'dagi proksilar uchun min-heap (ready_at, proxy); _release_at har bir proksining
+        # amaldagi qaytish vaqti - vaqti unga mos kelmaydigan heap yozuvlari eskirgan va tashlab yuboriladi
+        self._ready: List[str] = []
+        self._ready_pos: Dict[str, int] = {}
+        self._cooldown: List[Tuple[float, str]] = []
+        self._release_at: Dict[str, float] = {}
+        live = list(self.proxies - self.bad_proxies)
+        random.shuffle(live)
+        now = time.time()
+        for proxy in live:
+            stats = self.stats.get(proxy)
+            if stats is None:
+                # Oldingi statistika yo'q: kechikish pre-flight tekshiruvidagi TTFB bilan boshlanadi
+                ttfb = (probe_results or {}).get(proxy, {}).get("ttfb")
+                stats = self.stats[proxy] = ProxyStats(latency=ttfb) if ttfb else ProxyStats()
+            if stats.state == OPEN and stats.open_until > now:
+                self._schedule(proxy, stats.open_until)
+            else:
+                if stats.state == OPEN:
+                    stats.state = HALF_OPEN
+                self._add_ready(proxy)
+        self._usable_count = len(live)
+        self._last_warning: Dict[str, float] = {}
+
         logging.info(f"{len(self.proxies)} ta proksi yuklandi. {len(self.bad_proxies)} ta yomon proksi topildi.")
 
     def _load_proxies(self, filepath: str) -> Set[str]:
@@ -27,38 +152,202 @@ class ProxyHandler:
                 logging.error(f"Fayldan proksilarni yuklashda xato '{filepath}': {e}")
         return set()
 
-    def _save_bad_proxies(self):
+    @staticmethod
+    def _partition(proxies: Set[str], index: int, count: int) -> Set[str]:
+        # Bir nechta jarayon uchun proksilar kesishmaydigan qismlarga bo'linadi
+        ordered = sorted(proxies)
+        if not ordered:
+            return set()
+        part = set(ordered[index::count])
+        return part or {ordered[index % len(ordered)]}
+
+    @staticmethod
+    def _drop_dead(proxies: Set[str], probe_results: Dict[str, dict]) -> Set[str]:
+        # Tekshiruvda javob bermaganlar chiqariladi, tekshirilmaganlar (masalan, ro'yxatga yangi qo'shilgan) qoladi
+        alive = {p for p in proxies if probe_results.get(p, {}).get("alive", True)}
+        if not alive and proxies:
+            logging.warning("Pre-flight tekshiruvida birorta proksi javob bermadi: barcha proksilar ishlatiladi.")
+            return proxies
+        if len(alive) < len(proxies):
+            logging.info(f"{len(proxies) - len(alive)} ta proksi pre-flight tekshiruvida javob bermagani uchun chetlatildi.")
+        return alive
+
+    def _load_stats(self) -> Dict[str, ProxyStats]:
+        # Oldingi ishga tushirishdagi statistika: yangi run "issiq" holatda boshlanadi
+        if not os.path.exists(self.stats_path):
+            return {}
+        try:
+            with open(self.stats_path, 'r') as f:
+                data = json.load(f)
+            return {p: ProxyStats.from_dict(d) for p, d in data.items() if p in self.proxies}
+        except (json.JSONDecodeError, OSError, TypeError) as e:
+            logging.error(f"Proksi statistikasini yuklashda xato: {e}")
+            return {}
+
+    def stats_snapshot(self) -> Dict[str, dict]:
+        return {p: s.to_dict() for p, s in self.stats.items()}
+
+    def save_stats(self):
+        merge_proxy_stats(self.stats_path, self.stats_snapshot())
+
+    def _append_bad_proxy(self, proxy: str):
+        # Butun faylni qayta yozish o'rniga faqat yangi qator qo'shiladi
         try:
-            with open(self.bad_proxies_path, 'w') as f:
-                for proxy in self.bad_proxies:
-                    f.write(f"{proxy}\n")
+            with open(self.bad_proxies_path, 'a') as f:
+                f.write(f"{proxy}\n")
         except Exception as e:
             logging.error(f"Yomon proksilarni saqlashda xato: {e}")
 
+    def _log_throttled(self, level: int, message: str, interval: float = 60):
+        # Har bir so'rovda takrorlanadigan ogohlantirishlar logni to'ldirib yubormasligi uchun
+        now = time.monotonic()
+        if now - self._last_warning.get(message, -interval) >= interval:
+            self._last_warning[message] = now
+            logging.log(level, message)
+
+    def _add_ready(self, proxy: str):
+        self._ready_pos[proxy] = len(self._ready)
+        self._ready.append(proxy)
+
+    def _remove_ready(self, proxy: str):
+        # Oxirgi element bilan almashtirib o'chirish: O(1)
+        index = self._ready_pos.pop(proxy)
+        last = self._ready.pop()
+        if last != proxy:
+            self._ready[index] = last
+            self._ready_pos[last] = index
+
+    def _schedule(self, proxy: str, ready_at: float):
+        # Yangi qaytish vaqti avvalgi heap yozuvini bekor qiladi (u heap'dan chiqqanda tashlab yuboriladi)
+        self._release_at[proxy] = ready_at
+        heapq.heappush(self._cooldown, (ready_at, proxy))
+
+    def _is_current(self, entry: Tuple[float, str]) -> bool:
+        return self._release_at.get(entry[1]) == entry[0]
+
+    def _is_selectable(self, proxy: str, now: float) -> bool:
+        if proxy in self.bad_proxies or proxy in self._ready_pos:
+            return False
+        stats = self.stats[proxy]
+        if stats.state == OPEN:
+            if stats.open_until > now:
+                # Circuit hali ochiq: proksi open_until yozuvi orqali qaytadi
+                return False
+            stats.state = HALF_OPEN
+        return True
+
+    def _release_cooled(self, now: float):
+        while self._cooldown and self._cooldown[0][0] <= now:
+            entry = heapq.heappop(self._cooldown)
+            if not self._is_current(entry):
+                continue
+            proxy = entry[1]
+            del self._release_at[proxy]
+            if self._is_selectable(proxy, now):
+                self._add_ready(proxy)
+
+    def _pick_ready(self) -> str:
+        # "Power of k choices": bir nechta tasodifiy nomzoddan eng sog'lomi tanlanadi
+        best = None
+        for _ in range(min(self.sample_size, len(self._ready))):
+            candidate = self._ready[random.randrange(len(self._ready))]
+            if best is None or self.stats[candidate].score() > self.stats[best].score():
+                best = candidate
+        return best
+
+    def has_usable_proxies(self) -> bool:
+        return self._usable_count > 0
+
+    @property
+    def usable_count(self) -> int:
+        return self._usable_count
+
+    def next_ready_in(self) -> float:
+        if self._ready or not self._cooldown:
+            return 0.0
+        return max(0.0, self._cooldown[0][0] - time.time())
+
     def get_random_proxy(self) -> str:
-        cooldown_time = 120
-        
-        # Bu yerda list() funksiyasini qo'shib, set'ni list'ga o'tkazdik
-        available_proxies = [
-            p for p in list(self.proxies - self.bad_proxies) 
-            if (time.time() - self.proxy_usage.get(p, 0) > cooldown_time)
-        ]
-
-        if not available_proxies:
-            logging.warning("Mavjud proksilarning barchasi 'cooldown' holatida yoki ishlamaydi.")
-            cooled_down_proxies = sorted(list(self.proxies), key=lambda p: self.proxy_usage.get(p, 0))
-            if cooled_down_proxies:
-                return cooled_down_proxies[0]
-            
-            logging.critical("Barcha proksilar ishlamayapti yoki tugagan.")
-            return None
-        
-        proxy = random.choice(available_proxies)
-        self.proxy_usage[proxy] = time.time()
+        now = time.time()
+        self._release_cooled(now)
+
+        if self._ready:
+            proxy = self._pick_ready()
+            self._remove_ready(proxy)
+        else:
+            # Yomon va circuit'i ochiq proksilar tashlab ketiladi, ochiqlari heap'ga qaytariladi
+            skipped = []
+            proxy = None
+            while self._cooldown:
+                entry = heapq.heappop(self._cooldown)
+                candidate = entry[1]
+                if candidate in self.bad_proxies or not self._is_current(entry):
+                    continue
+                if self.stats[candidate].state == OPEN and self.stats[candidate].open_until > now:
+                    skipped.append(entry)
+                    continue
+                proxy = candidate
+                break
+            for entry in skipped:
+                heapq.heappush(self._cooldown, entry)
+            if proxy is None:
+                if not self._cooldown:
+                    self._log_throttled(logging.CRITICAL, "Barcha proksilar ishlamayapti yoki tugagan.")
+                return None
+            self._log_throttled(logging.WARNING, "Mavjud proksilarning barchasi 'cooldown' holatida yoki ishlamaydi.")
+            if self.stats[proxy].state == OPEN:
+                self.stats[proxy].state = HALF_OPEN
+
+        self.proxy_usage[proxy] = now
+        self._schedule(proxy, now + self.cooldown_time)
         return proxy
 
+    def report_success(self, proxy: str, latency: float):
+        stats = self.stats.get(proxy)
+        if stats is None:
+            return
+        a = self.ewma_alpha
+        stats.latency = (1 - a) * stats.latency + a * latency
+        stats.success_rate = (1 - a) * stats.success_rate + a
+        stats.successes += 1
+        stats.consecutive_failures = 0
+        if stats.state != CLOSED:
+            logging.info(f"Proksi tiklandi: {proxy}")
+        stats.state = CLOSED
+        stats.trips = 0
+
+    def report_failure(self, proxy: str, error_kind: str):
+        stats = self.stats.get(proxy)
+        if stats is None or proxy in self.bad_proxies:
+            return
+        a = self.ewma_alpha
+        stats.success_rate = (1 - a) * stats.success_rate
+        stats.failures += 1
+        stats.consecutive_failures += 1
+        stats.recent_errors.append(error_kind)
+        if stats.state == HALF_OPEN or stats.consecutive_failures >= self.failure_threshold:
+            self._trip(proxy, stats)
+
+    def _trip(self, proxy: str, stats: ProxyStats):
+        stats.trips += 1
+        if stats.trips >= self.max_trips:
+            self.mark_as_unusable(proxy)
+            return
+        open_for = min(self.open_time * 2 ** (stats.trips - 1), self.max_open_time)
+        stats.state = OPEN
+        stats.open_until = time.time() + open_for
+        stats.consecutive_failures = 0
+        if proxy in self._ready_pos:
+            self._remove_ready(proxy)
+        self._schedule(proxy, stats.open_until)
+        logging.warning(f"Proksi vaqtincha o'chirildi ({open_for:.0f} s): {proxy}. So'nggi xatolar: {list(stats.recent_errors)[-3:]}")
+
     def mark_as_unusable(self, proxy: str):
         if proxy and proxy not in self.bad_proxies:
             self.bad_proxies.add(proxy)
-            self._save_bad_proxies()
-            logging.warning(f"Proksi ishlamayapti deb belgilandi: {proxy}. Qolgan proksilar: {len(self.proxies) - len(self.bad_proxies)}")
+            if proxy in self._ready_pos:
+                self._remove_ready(proxy)
+            if proxy in self.proxies:
+                self._usable_count -= 1
+            self._append_bad_proxy(proxy)
+            logging.warning(f"Proksi ishlamayapti deb belgilandi: {proxy}. Qolgan proksilar: {self._usable_count}")
@@ -0,0 +1,146 @@
+# scripts/proxy_prober.py
+
+import asyncio
+import json
+import logging
+import os
+import time
+from typing import Dict, Iterable, List, Optional
+
+import httpx
+
+from scripts.async_utils import run_blocking
+from scripts.http_client_pool import normalize_proxy_url
+from scripts.metrics import proxy_label
+
+prober_logger = logging.getLogger(__name__)
+
+# Ulanish o'rnatilgani (TCP, proksi tunneli va TLS) va javob sarlavhalari kelgani haqidagi trace hodisalari
+CONNECT_EVENTS = ("connection.connect_tcp.complete", "connection.start_tls.complete")
+HEADERS_EVENTS = ("http11.receive_response_headers.complete", "http2.receive_response_headers.complete")
+
+
+def read_proxy_list(path: str) -> List[str]:
+    if not path or not os.path.exists(path):
+        return []
+    with open(path, 'r') as f:
+        return list(dict.fromkeys(line.strip() for line in f if line.strip()))
+
+
+def rank_live(results: Dict[str, dict]) -> List[str]:
+    # Tirik proksilar TTFB bo'yicha (eng tezi birinchi)
+    return sorted((p for p, r in results.items() if r.get("alive")), key=lambda p: results[p].get("ttfb") or 0.0)
+
+
+class ProxyProber:
+    """
+    Proksilar ro'yxatini test manzili orqali bir vaqtda tekshiradi: har biri uchun ulanish (connect)
+    va birinchi bayt (TTFB) kechikishi o'lchanadi. Natijalar TTL bilan keshlanadi, shuning uchun
+    qayta ishga tushirishda yaqinda tekshirilgan proksilar qayta sinalmaydi.
+    """
+    def __init__(self, test_url: str, timeout: float = 5.0, concurrency: int = 100,
+                 cache_path: Optional[str] = None, ttl: float = 1800):
+        self.test_url = test_url
+        self.timeout = timeout
+        self.concurrency = max(1, concurrency)
+        self.cache_path = cache_path
+        self.ttl = ttl
+        self._ssl_context = None
+
+    def cached_results(self) -> Dict[str, dict]:
+        """
+        Keshdagi shu test manzili bilan olingan va TTL tugamagan natijalar.
+        """
+        if not self.cache_path or not os.path.exists(self.cache_path):
+            return {}
+        try:
+            with open(self.cache_path, 'r') as f:
+                data = json.load(f)
+        except (json.JSONDecodeError, OSError) as e:
+            prober_logger.error(f"Proksi tekshiruvi keshini o'qishda xato: {e}")
+            return {}
+        cutoff = time.time() - self.ttl
+        return {p: r for p, r in data.items()
+                if isinstance(r, dict) and r.get("url") == self.test_url and r.get("checked_at", 0) >= cutoff}
+
+    def _save(self, results: Dict[str, dict]):
+        # Boshqa proksilar yozuvlari saqlanib qoladi, fayl atomik almashtiriladi
+        data = {}
+        if os.path.exists(self.cache_path):
+            try:
+                with open(self.cache_path, 'r') as f:
+                    data = json.load(f)
+            except (json.JSONDecodeError, OSError):
+                data = {}
+        data.update(results)
+        tmp_path = f"{self.cache_path}.{os.getpid()}.tmp"
+        try:
+            os.makedirs(os.path.dirname(self.cache_path) or ".", exist_ok=True)
+            with open(tmp_path, 'w') as f:
+                json.dump(data, f)
+            os.replace(tmp_path, self.cache_path)
+        except OSError as e:
+            prober_logger.error(f"Proksi tekshiruvi keshini saqlashda xato: {e}")
+
+    async def probe(self, proxy: str) -> dict:
+        events: Dict[str, float] = {}
+
+        async def trace(event_name: str, info: dict):
+            # Tunnel (CONNECT) bo'lsa hodisalar ikki marta keladi: oxirgisi haqiqiy so'rovniki
+            events[event_name] = time.perf_counter()
+
+        result = {"alive": False, "connect": None, "ttfb": None, "status": None, "error": None,
+                  "url": self.test_url, "checked_at": time.time()}
+        start = time.perf_counter()
+        try:
+            async with httpx.AsyncClient(proxy=normalize_proxy_url(proxy), timeout=self.timeout,
+                                         verify=self._ssl_context or True) as client:
+                async with client.stream("GET", self.test_url, extensions={"trace": trace}) as response:
+                    result["status"] = response.status_code
+                    # 407 - proksi login/paroli noto'g'ri, 5xx - proksi manzilga ulana olmadi
+                    result["alive"] = response.status_code != 407 and response.status_code < 500
+        except (httpx.HTTPError, OSError) as e:
+            result["error"] = type(e).__name__
+        connected = [events[name] for name in CONNECT_EVENTS if name in events]
+        if connected:
+            result["connect"] = round(max(connected) - start, 4)
+        headers_at = [events[name] for name in HEADERS_EVENTS if name in events]
+        if headers_at:
+            result["ttfb"] = round(max(headers_at) - start, 4)
+        return result
+
+    async def probe_all(self, proxies: Iterable[str], use_cache: bool = True) -> Dict[str, dict]:
+        """
+        Keshda yangi natijasi bo'lmagan proksilarni concurrency chegarasida parallel tekshiradi
+        va barcha proksilar uchun natijalarni qaytaradi.
+        """
+        proxies = list(dict.fromkeys(proxies))
+        results = await run_blocking(self.cached_results) if use_cache else {}
+        results = {p: results[p] for p in proxies if p in results}
+        pending = [p for p in proxies if p not in results]
+        if pending:
+            if self._ssl_context is None:
+                # Har bir klient o'z kontekstini yaratsa, CA sertifikatlari har proksi uchun qayta yuklanadi
+                self._ssl_context = await run_blocking(httpx.create_ssl_context)
+            semaphore = asyncio.Semaphore(self.concurrency)
+
+            async def bounded(proxy: str):
+                async with semaphore:
+                    return proxy, await self.probe(proxy)
+
+            started = time.perf_counter()
+            fresh = dict(await asyncio.gather(*(bounded(p) for p in pending)))
+            results.update(fresh)
+            if self.cache_path:
+                await run_blocking(self._save, fresh)
+            prober_logger.info(f"{len(pending)} ta proksi {time.perf_counter() - started:.1f} s ichida tekshirildi.")
+
+        live = rank_live(results)
+        prober_logger.info(f"Proksilar: {len(live)} ta ishlaydi, {len(results) - len(live)} ta javob bermadi "
+                           f"({len(results) - len(pending)} tasi keshdan).")
+        for proxy in proxies:
+            result = results[proxy]
+            if not result["alive"]:
+                prober_logger.debug(f"Proksi javob bermadi: {proxy_label(proxy)} "
+                                    f"({result.get('error') or result.get('status')})")
+        return results
@@ -0,0 +1,127 @@
+# scripts/rate_limiter.py
+
+import asyncio
+import logging
+import time
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
+from typing import Dict, Optional
+
+from scripts.metrics import RATE_LIMIT_WAIT_SECONDS
+
+limiter_logger = logging.getLogger(__name__)
+
+
+def parse_retry_after(value: Optional[str]) -> Optional[float]:
+    """
+    Retry-After sarlavhasini soniyalarga o'giradi (son yoki HTTP sana ko'rinishida).
+    """
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        when = parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    if when.tzinfo is None:
+        when = when.replace(tzinfo=timezone.utc)
+    return max(0.0, (when - datetime.now(timezone.utc)).total_seconds())
+
+
+class TokenBucket:
+    def __init__(self, rate: float, capacity: Optional[float] = None):
+        self.rate = rate
+        self.capacity = capacity if capacity is not None else max(1.0, rate)
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+        self.blocked_until = 0.0
+
+    def _refill(self, now: float):
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def reserve(self) -> float:
+        """
+        Token band qiladi va uni ishlatishdan oldin kutish kerak bo'lgan vaqtni qaytaradi.
+        Token "qarzga" olinadi, shuning uchun kutayotganlar navbat tartibida xizmat qilinadi.
+        """
+        now = time.monotonic()
+        self._refill(now)
+        self.tokens -= 1
+        wait = -self.tokens / self.rate if self.tokens < 0 else 0.0
+        return max(wait, self.blocked_until - now)
+
+    def block(self, seconds: float):
+        self.blocked_until = max(self.blocked_until, time.monotonic() + seconds)
+
+
+class AdaptiveRateLimiter:
+    """
+    Global va har bir proksi uchun alohida token bucket.
+    Muvaffaqiyatli javoblarda tezlik sekin oshiriladi (additive increase),
+    429 kelganda esa keskin kamaytiriladi (multiplicative decrease) va Retry-After hurmat qilinadi.
+    """
+    def __init__(self,
+                 global_rate: float = 10,
+                 proxy_rate: float = 1,
+                 min_rate: float = 0.1,
+                 max_global_rate: float = 200,
+                 max_proxy_rate: float = 5,
+                 increase_step: float = 0.5,
+                 decrease_factor: float = 0.5,
+                 default_backoff: float = 30):
+        self.global_bucket = TokenBucket(global_rate)
+        self.proxy_rate = proxy_rate
+        self.min_rate = min_rate
+        self.max_global_rate = max_global_rate
+        self.max_proxy_rate = max_proxy_rate
+        self.increase_step = increase_step
+        self.decrease_factor = decrease_factor
+        self.default_backoff = default_backoff
+        self.throttled = 0
+        self._proxy_buckets: Dict[str, TokenBucket] = {}
+        self._last_decrease = 0.0
+
+    def _bucket(self, proxy: str) -> TokenBucket:
+        bucket = self._proxy_buckets.get(proxy)
+        if bucket is None:
+            bucket = self._proxy_buckets[proxy] = TokenBucket(self.proxy_rate)
+        return bucket
+
+    async def acquire(self, proxy: str):
+        started = time.monotonic()
+        wait = self._bucket(proxy).reserve()
+        if wait > 0:
+            await asyncio.sleep(wait)
+        wait = self.global_bucket.reserve()
+        if wait > 0:
+            await asyncio.sleep(wait)
+        RATE_LIMIT_WAIT_SECONDS.observe(time.monotonic() - started)
+
+    def _increase(self, bucket: TokenBucket, max_rate: float):
+        # Taxminan har soniyada increase_step ga oshadi
+        bucket.rate = min(max_rate, bucket.rate + self.increase_step / max(bucket.rate, 1.0))
+
+    def on_success(self, proxy: str):
+        self._increase(self._bucket(proxy), self.max_proxy_rate)
+        self._increase(self.global_bucket, self.max_global_rate)
+
+    def on_throttled(self, proxy: str, retry_after: Optional[float] = None):
+        self.throttled += 1
+        bucket = self._bucket(proxy)
+        bucket.rate = max(self.min_rate, bucket.rate * self.decrease_factor)
+        bucket.block(retry_after if retry_after is not None else self.default_backoff)
+
+        # Bir vaqtda kelgan 429'lar to'lqini global tezlikni faqat bir marta kamaytiradi
+        now = time.monotonic()
+        if now - self._last_decrease >= 1.0:
+            self._last_decrease = now
+            self.global_bucket.rate = max(self.min_rate, self.global_bucket.rate * self.decrease_factor)
+            limiter_logger.warning(f"429 qabul qilindi: global tezlik {self.global_bucket.rate:.2f} so'rov/s ga tushirildi.")
+
+    @property
+    def global_rate(self) -> float:
+        return self.global_bucket.rate
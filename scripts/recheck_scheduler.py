@@ -0,0 +1,49 @@
+# scripts/recheck_scheduler.py
+
+import logging
+from datetime import datetime, timedelta
+from typing import Dict, Optional, Set
+
+from scripts.db_manager import iter_results_since
+
+
+class RecheckScheduler:
+    """
+    Tekshiruvdan oldingi bosqich: yaqinda tekshirilgan username'lar qayta so'rov yuborilmasdan o'tkazib yuboriladi.
+    Har bir status uchun alohida TTL: bo'sh username'lar tez-tez, band'lari esa kamdan-kam qayta tekshiriladi.
+    Xotirada faqat hali "yangi" hisoblangan username'lar saqlanadi.
+    """
+    def __init__(self, ttl_by_status: Dict[str, timedelta], default_ttl: timedelta = timedelta(0)):
+        self.ttl_by_status = ttl_by_status
+        self.default_ttl = default_ttl
+        self.skipped = 0
+        self._fresh: Set[str] = set()
+
+    def load(self, db_path: str) -> int:
+        now = datetime.now()
+        max_ttl = max([self.default_ttl, *self.ttl_by_status.values()])
+        if max_ttl <= timedelta(0):
+            return 0
+
+        cutoffs = {status: (now - ttl).isoformat() for status, ttl in self.ttl_by_status.items()}
+        default_cutoff = (now - self.default_ttl).isoformat()
+        for username, status, checked_at in iter_results_since(db_path, (now - max_ttl).isoformat()):
+            if checked_at >= cutoffs.get(status, default_cutoff):
+                self._fresh.add(username)
+
+        logging.info(f"Qayta tekshirish rejalashtiruvchisi: {len(self._fresh)} ta username hali yangi, o'tkazib yuboriladi.")
+        return len(self._fresh)
+
+    def is_fresh(self, status: str, checked_at: str, now: Optional[datetime] = None) -> bool:
+        # Bitta natija uchun: uzoq ishlaydigan xizmat bazadagi natijani shu yerda tekshiradi
+        ttl = self.ttl_by_status.get(status, self.default_ttl)
+        return ttl > timedelta(0) and checked_at >= ((now or datetime.now()) - ttl).isoformat()
+
+    def should_check(self, username: str) -> bool:
+        if username in self._fresh:
+            self.skipped += 1
+            return False
+        return True
+
+    def __len__(self):
+        return len(self._fresh)
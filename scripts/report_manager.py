@@ -4,40 +4,51 @@ import sqlite3
 import logging
 import json
 import os
+import shutil
+import string
 from datetime import datetime
 from jinja2 import Environment, FileSystemLoader
 
+SAFE_PARTITION_CHARS = set(string.ascii_lowercase + string.digits)
+
+def partition_dir(first_char):
+    # Katta-kichik harfni farqlamaydigan fayl tizimlarida to'qnashuv bo'lmasligi uchun
+    return first_char if first_char in SAFE_PARTITION_CHARS else f"u{ord(first_char):04x}"
+
 class ReportManager:
     """
     Ma'lumotlar bazasidan hisobotlar yaratish uchun klass.
     """
-    def __init__(self, db_path, templates_dir="templates"):
+    def __init__(self, db_path, templates_dir="templates", page_size=1000):
         self.db_path = db_path
-        self.env = Environment(loader=FileSystemLoader(templates_dir))
+        self.page_size = page_size
+        self.env = Environment(loader=FileSystemLoader(templates_dir), autoescape=True)
         self.template = self.env.get_template('report_template.html')
 
-    def generate_report(self):
+    def generate_report(self, runtime_metrics=None):
         """
         Ma'lumotlar bazasidan hisobot yaratadi va uni metrics.json va report.html fayllariga yozadi.
+        runtime_metrics berilsa (ishlash vaqtidagi metrikalar snapshot'i), u ham metrics.json ga qo'shiladi.
         """
         try:
             with sqlite3.connect(self.db_path) as conn:
                 cursor = conn.cursor()
-                
-                # Natijalar sonini olish
-                cursor.execute("SELECT COUNT(*) FROM results")
-                total_checked = cursor.fetchone()[0]
 
-                # Mavjud va band username'lar sonini olish
-                cursor.execute("SELECT status, COUNT(*) FROM results GROUP BY status")
-                status_counts = dict(cursor.fetchall())
-                
+                # Status bo'yicha sonlar trigger'lar yuritadigan yig'ma jadvaldan olinadi
+                status_counts = self._status_counts(cursor)
+                total_checked = sum(status_counts.values())
                 available_count = status_counts.get('available', 0)
                 taken_count = status_counts.get('taken', 0)
-                
-                # Eng eski va eng yangi tekshirilgan vaqtni olish
-                cursor.execute("SELECT MIN(checked_at), MAX(checked_at) FROM results")
-                start_time_iso, end_time_iso = cursor.fetchone()
+
+                # Oxirgi ishga tushirish statistikasi; bo'lmasa checked_at indeksi bo'yicha chegaralar
+                run = self._latest_run(cursor)
+                if run is not None:
+                    start_time_iso = run["started_at"]
+                    end_time_iso = run["updated_at"] or run["finished_at"] or run["started_at"]
+                else:
+                    # MIN va MAX alohida so'rovlarda: shunda SQLite indeksdan bitta qatorni o'qiydi
+                    start_time_iso = cursor.execute("SELECT MIN(checked_at) FROM results").fetchone()[0]
+                    end_time_iso = cursor.execute("SELECT MAX(checked_at) FROM results").fetchone()[0]
 
                 start_time = datetime.fromisoformat(start_time_iso) if start_time_iso else None
                 end_time = datetime.fromisoformat(end_time_iso) if end_time_iso else None
@@ -47,7 +58,7 @@ class ReportManager:
                 if start_time and end_time:
                     duration = (end_time - start_time).total_seconds()
                     if duration > 0:
-                        performance = total_checked / duration
+                        performance = (run["checked"] if run is not None else total_checked) / duration
 
                 report_data = {
                     "start_time": start_time_iso,
@@ -58,6 +69,10 @@ class ReportManager:
                     "taken_count": taken_count,
                     "performance_usernames_per_second": round(performance, 2)
                 }
+                if run is not None:
+                    report_data["run"] = run
+                if runtime_metrics is not None:
+                    report_data["runtime_metrics"] = runtime_metrics
 
                 # Hisobotni JSON faylga yozish
                 output_dir = os.path.dirname(self.db_path)
@@ -73,6 +88,7 @@ class ReportManager:
                 
                 html_report_path = os.path.join(output_dir, "report.html")
                 html_output = self.template.render(
+                    pages_link="report/index.html" if os.path.exists(os.path.join(output_dir, "report", "index.html")) else None,
                     total_checked=total_checked,
                     available_count=available_count,
                     taken_count=taken_count,
@@ -91,3 +107,113 @@ class ReportManager:
             logging.error(f"Hisobot yaratishda ma'lumotlar bazasi xatosi: {e}")
         except Exception as e:
             logging.error(f"Hisobot yaratishda kutilmagan xato: {e}")
+
+    def generate_pages(self, output_dir=None):
+        """
+        Barcha natijalarni status va birinchi harf bo'yicha bo'lingan statik sahifalarga yozadi:
+        report/index.html -> report/<status>/<harf>/index.html (+ index.json) -> page-0001.html, ...
+        Qatorlar indeks bo'yicha tartibda oqim bilan o'qiladi, sahifalar template.generate() orqali
+        to'g'ridan-to'g'ri diskka yoziladi, shuning uchun xotirada bir sahifadan ko'p narsa turmaydi.
+        """
+        output_dir = output_dir or os.path.dirname(self.db_path)
+        final_dir = os.path.join(output_dir, "report")
+        work_dir = final_dir + ".tmp"
+        shutil.rmtree(work_dir, ignore_errors=True)
+        os.makedirs(work_dir)
+        try:
+            with sqlite3.connect(f"file:{self.db_path}?mode=ro", uri=True) as conn:
+                statuses = sorted(self._status_counts(conn.cursor()).items())
+                sections = []
+                for status, count in statuses:
+                    partitions = self._write_status_pages(conn, status, os.path.join(work_dir, status))
+                    sections.append({"status": status, "count": count, "partitions": partitions})
+            self._stream(self.env.get_template('report_index.html'), os.path.join(work_dir, "index.html"),
+                         sections=sections, generated_at=datetime.now().isoformat(timespec="seconds"))
+            # Tayyor hisobot bir zumda almashtiriladi: yarim yozilgan sahifalar ko'rinmaydi
+            old_dir = final_dir + ".old"
+            shutil.rmtree(old_dir, ignore_errors=True)
+            if os.path.exists(final_dir):
+                os.replace(final_dir, old_dir)
+            os.replace(work_dir, final_dir)
+            shutil.rmtree(old_dir, ignore_errors=True)
+            logging.info(f"Sahifalangan HTML hisobot yaratildi: {os.path.join(final_dir, 'index.html')}")
+            return final_dir
+        except (sqlite3.Error, OSError) as e:
+            shutil.rmtree(work_dir, ignore_errors=True)
+            logging.error(f"Sahifalangan hisobot yaratishda xato: {e}")
+            return None
+
+    def _write_status_pages(self, conn, status, status_dir):
+        page_template = self.env.get_template('report_page.html')
+        partition_template = self.env.get_template('report_partition.html')
+        partitions = []
+        state = {"key": None, "dir": None, "pages": [], "buffer": [], "count": 0}
+
+        def write_page(has_next):
+            buffer = state["buffer"]
+            number = len(state["pages"]) + 1
+            self._stream(page_template, os.path.join(state["dir"], f"page-{number:04d}.html"),
+                         status=status, partition=state["key"], number=number, has_next=has_next, rows=buffer)
+            state["pages"].append({"page": number, "first": buffer[0][0], "last": buffer[-1][0], "count": len(buffer)})
+            state["buffer"] = []
+
+        def close_partition():
+            if state["key"] is None:
+                return
+            if state["buffer"]:
+                write_page(has_next=False)
+            with open(os.path.join(state["dir"], "index.json"), 'w') as f:
+                json.dump({"status": status, "partition": state["key"], "count": state["count"],
+                           "pages": state["pages"]}, f)
+            self._stream(partition_template, os.path.join(state["dir"], "index.html"),
+                         status=status, partition=state["key"], count=state["count"], pages=state["pages"])
+            partitions.append({"key": state["key"], "dir": os.path.basename(state["dir"]),
+                               "count": state["count"], "pages": len(state["pages"])})
+
+        # (status, username) indeksi tartibni beradi: saralash uchun vaqtinchalik jadval kerak emas
+        cursor = conn.execute("SELECT username, checked_at FROM results WHERE status = ? ORDER BY username", (status,))
+        while True:
+            rows = cursor.fetchmany(self.page_size)
+            if not rows:
+                break
+            for username, checked_at in rows:
+                key = username[:1]
+                if key != state["key"]:
+                    close_partition()
+                    state.update(key=key, dir=os.path.join(status_dir, partition_dir(key)), pages=[], buffer=[], count=0)
+                    os.makedirs(state["dir"], exist_ok=True)
+                elif len(state["buffer"]) >= self.page_size:
+                    # Keyingi qator borligi ma'lum bo'lgandagina sahifa "keyingi" havolasi bilan yoziladi
+                    write_page(has_next=True)
+                state["buffer"].append((username, checked_at))
+                state["count"] += 1
+        close_partition()
+        return partitions
+
+    @staticmethod
+    def _stream(template, path, **context):
+        with open(path, 'w', encoding='utf-8') as f:
+            for chunk in template.generate(**context):
+                f.write(chunk)
+
+    @staticmethod
+    def _has_table(cursor, name):
+        return cursor.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = ?", (name,)).fetchone() is not None
+
+    def _status_counts(self, cursor):
+        if self._has_table(cursor, "status_counts"):
+            return {status: count for status, count in cursor.execute("SELECT status, count FROM status_counts") if count}
+        # DBManager yaratmagan eski baza: to'liq hisoblash
+        return dict(cursor.execute("SELECT status, COUNT(*) FROM results GROUP BY status").fetchall())
+
+    def _latest_run(self, cursor):
+        if not self._has_table(cursor, "run_stats"):
+            return None
+        row = cursor.execute(
+            "SELECT run_id, started_at, updated_at, finished_at, checked, available, taken "
+            "FROM run_stats ORDER BY run_id DESC LIMIT 1"
+        ).fetchone()
+        if row is None:
+            return None
+        keys = ("run_id", "started_at", "updated_at", "finished_at", "checked", "available", "taken")
+        return dict(zip(keys, row))
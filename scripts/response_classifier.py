@@ -0,0 +1,102 @@
+# scripts/response_classifier.py
+
+import logging
+from typing import Iterable, Optional
+
+classifier_logger = logging.getLogger(__name__)
+
+# Mavjud bo'lmagan profil sahifasining sarlavhasi
+DEFAULT_AVAILABLE_MARKERS = ("Page Not Found",)
+# Profil sahifasining <head> qismidagi Open Graph tegi: band profillar (javoblarning aksariyati)
+# tananing boshidayoq aniqlanadi va qolgan yuzlab KB yuklanmaydi
+DEFAULT_TAKEN_MARKERS = ('property="og:type" content="profile"',)
+# Ikkala marker ham <head> ichida: shuncha bayt ichida hech biri topilmasa, javob 'taken' deb olinadi
+DEFAULT_MAX_SCAN_BYTES = 256 * 1024
+# Instagram mavjud bo'lmagan profil uchun 404 qaytaradi. Dastlabki versiyada 404 HTTP xatosi sifatida
+# tekshirilmagan (None) natija berardi; endi u tanani o'qimasdan 'available' deb tasniflanadi
+DEFAULT_AVAILABLE_STATUS_CODES = (404,)
+
+
+class ClassifierStats:
+    """
+    Bir ishga tushirish davomida yuklab olingan va tejalgan baytlar hisobi.
+    """
+    def __init__(self):
+        self.responses = 0
+        self.early_exits = 0
+        self.bytes_downloaded = 0
+        self.bytes_saved = 0
+
+    def record(self, downloaded: int, content_length: Optional[int], early: bool):
+        self.responses += 1
+        self.bytes_downloaded += downloaded
+        if early:
+            self.early_exits += 1
+            if content_length is not None:
+                self.bytes_saved += max(0, content_length - downloaded)
+
+    def as_dict(self):
+        return {
+            "responses": self.responses,
+            "early_exits": self.early_exits,
+            "bytes_downloaded": self.bytes_downloaded,
+            "bytes_saved": self.bytes_saved,
+        }
+
+
+class MarkerScanner:
+    """
+    Bitta javob tanasini bo'laklab ko'rib chiqadi. Marker ikki bo'lak
+    chegarasiga tushib qolsa ham topilishi uchun oldingi bo'lakning oxiri saqlanadi.
+    """
+    def __init__(self, classifier: "MarkerClassifier"):
+        self.classifier = classifier
+        self.scanned = 0
+        self._tail = b""
+
+    def feed(self, chunk: bytes) -> Optional[str]:
+        window = self._tail + chunk
+        self.scanned += len(chunk)
+        for marker in self.classifier.available_markers:
+            if marker in window:
+                return 'available'
+        for marker in self.classifier.taken_markers:
+            if marker in window:
+                return 'taken'
+        if self.classifier.max_scan_bytes and self.scanned >= self.classifier.max_scan_bytes:
+            return self.classifier.default_status
+        self._tail = window[-self.classifier.overlap:] if self.classifier.overlap else b""
+        return None
+
+    def finish(self) -> str:
+        return self.classifier.default_status
+
+
+class MarkerClassifier:
+    """
+    Javobni status kodi, sarlavhalar va tanadagi markerlar bo'yicha tasniflaydi.
+    Markerlar konstruktor orqali beriladi, shuning uchun yuklab olish kodini o'zgartirish shart emas.
+    """
+    def __init__(self,
+                 available_markers: Iterable[str] = DEFAULT_AVAILABLE_MARKERS,
+                 taken_markers: Iterable[str] = DEFAULT_TAKEN_MARKERS,
+                 available_status_codes: Iterable[int] = DEFAULT_AVAILABLE_STATUS_CODES,
+                 max_scan_bytes: int = DEFAULT_MAX_SCAN_BYTES,
+                 default_status: str = 'taken'):
+        self.available_markers = [m.encode() for m in available_markers if m]
+        self.taken_markers = [m.encode() for m in taken_markers if m]
+        self.available_status_codes = set(available_status_codes)
+        self.max_scan_bytes = max_scan_bytes
+        self.default_status = default_status
+        longest = max((len(m) for m in self.available_markers + self.taken_markers), default=0)
+        self.overlap = max(0, longest - 1)
+        self.stats = ClassifierStats()
+
+    def classify_head(self, status_code: int, headers) -> Optional[str]:
+        # Tanani o'qimasdan, faqat status kodi bo'yicha qaror qabul qilish
+        if status_code in self.available_status_codes:
+            return 'available'
+        return None
+
+    def scanner(self) -> MarkerScanner:
+        return MarkerScanner(self)
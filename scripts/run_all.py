@@ -5,73 +5,182 @@ import sys
 import logging
 from dotenv import load_dotenv
 import asyncio
-import random
 from datetime import datetime, timezone, timedelta
-from tqdm import tqdm
-from colorama import Fore, Style, init
-import re
-from typing import Iterator, List
+import argparse
+import itertools
+import signal
+from typing import TYPE_CHECKING, Optional
 
 # Tizim yo'lini yangilash
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
 
 # Barcha kerakli modullarni import qilish
-from scripts.proxy_handler import ProxyHandler
-from scripts.username_checker import check_username_with_retries
-from scripts.db_manager import DBManager
-from scripts.error_handler import safe_execute, log_exception, notify_critical
-from scripts.metadata_manager import MetadataManager
-from scripts.report_manager import ReportManager
-from scripts.telegram_notifier import TelegramNotifier
-from scripts.system_monitor import get_system_status
+from scripts.username_source import FileUsernameSource, iterate_spans, open_username_source
+from scripts.username_ingest import ingest
+from scripts.check_pipeline import (CheckPipeline, create_proxy_handler, create_proxy_prober, create_client_pool,
+                                    create_classifier, create_rate_limiter, create_recheck_scheduler, probe_enabled,
+                                    retry_max_attempts)
+from scripts.proxy_prober import read_proxy_list
+from scripts.sharded_runner import ShardCoordinator
+from scripts.check_service import CheckService
+from scripts.lease_runner import LeaseCoordinator, LeaseNode
+from scripts.work_leases import DONE, FAILED, LEASED, PENDING, default_node_id, open_lease_store
+from scripts.local_http import LocalHTTPServer
+from scripts.db_manager import DBManager, ResultWriter, fetch_retry_usernames
+from scripts.async_utils import async_safe_execute, create_loop_watchdog, run_blocking
+from scripts.error_handler import get_notifier, log_exception, notify_critical
+from scripts.metadata_manager import CheckpointJournal, MetadataManager
 from scripts.config_validator import ConfigValidator
+from scripts.metrics import REGISTRY, LoopLagMonitor, start_metrics_server
+from scripts.exporter import EXPORT_FORMATS, ResultExporter, default_export_path
+from scripts.logging_setup import setup_logging, shutdown_logging
+
+# Hisobot (jinja2), tizim monitoringi (psutil), progress (tqdm/colorama) va Telegram modullari
+# faqat kerak bo'lganda yuklanadi: ishga tushish birinchi so'rovgacha tezroq bo'ladi
+if TYPE_CHECKING:
+    from scripts.telegram_notifier import TelegramNotifier
 
 # Konfiguratsiya faylini yuklash
 load_dotenv(os.path.join(os.path.dirname(__file__), '..', '.env'))
 
-# Loglash tizimini sozlash
-log_file = os.getenv("LOG_FILE_PATH", "logs/checker.log")
-error_log_file = os.getenv("ERROR_LOG_PATH", "logs/errors.log")
-if not os.path.exists("logs"): os.makedirs("logs")
-
-logger = logging.getLogger()
-logger.setLevel(logging.INFO)
-
-stream_handler = logging.StreamHandler(sys.stdout)
-stream_handler.setFormatter(logging.Formatter('%(asctime)s - %(levelname)s - %(message)s'))
-stream_handler.setLevel(logging.INFO)
-logger.addHandler(stream_handler)
-
-file_handler = logging.FileHandler(log_file)
-file_handler.setFormatter(logging.Formatter('%(asctime)s - %(levelname)s - %(message)s'))
-file_handler.setLevel(logging.INFO)
-logger.addHandler(file_handler)
-
-error_file_handler = logging.FileHandler(error_log_file)
-error_file_handler.setFormatter(logging.Formatter('%(asctime)s - %(levelname)s - %(message)s'))
-error_file_handler.setLevel(logging.ERROR)
-logger.addHandler(error_file_handler)
-
-init()
-
-def username_generator(filepath: str) -> Iterator[str]:
-    with open(filepath, 'r') as f:
-        for line in f:
-            yield line.strip()
-
-def chunkify(iterable: Iterator[str], size: int) -> Iterator[List[str]]:
-    chunk = []
-    for item in iterable:
-        chunk.append(item)
-        if len(chunk) == size:
-            yield chunk
-            chunk = []
-    if chunk:
-        yield chunk
-
-async def main():
+
+def _progress_bar(total: int, initial: int, unit: str = "B"):
+    from tqdm import tqdm
+    from colorama import Fore, Style, init
+    init()
+    # Progress fayl hajmi (yoki shablon manbasida nomzod pozitsiyasi) bo'yicha baholanadi: qatorlarni oldindan sanash shart emas
+    return tqdm(total=total,
+                initial=initial,
+                desc=f"{Fore.CYAN}Tekshirilmoqda{Style.RESET_ALL}",
+                bar_format="{l_bar}{bar}| {n_fmt}/{total_fmt} [{elapsed}<{remaining}, {rate_fmt}{postfix}]",
+                unit=unit,
+                unit_scale=True,
+                unit_divisor=1024 if unit == "B" else 1000,
+                dynamic_ncols=True,
+                colour='green')
+
+def _notify_exhausted(notifier: "TelegramNotifier"):
+    notify_critical("Jiddiy xato: Barcha proksilar ishlamayapti. Loyiha to'xtatildi.", key="proxies-exhausted")
+    notifier.send_message("‼️ Jiddiy xato: Barcha proksilar ishlamayapti. Loyiha to'xtatildi.", key="proxies-exhausted")
+
+async def _probe_proxies(proxies_path: str):
+    if probe_enabled():
+        # Ishlamaydigan proksilar username tekshiruvlarida emas, shu yerda bir vaqtda aniqlanadi
+        prober = create_proxy_prober(proxies_path)
+        await prober.probe_all(await run_blocking(read_proxy_list, proxies_path))
+
+async def _run_single(username_source: FileUsernameSource, metadata_manager: MetadataManager,
+                      result_writer: ResultWriter, proxies_path: str, db_path: str,
+                      notifier: "TelegramNotifier") -> dict:
+    start_offset = metadata_manager.get_resume_offset(username_source)
+    start_index = metadata_manager.get_metadata("total_usernames_checked") or 0
+    source_fingerprint = metadata_manager.get_metadata("source_fingerprint")
+    metadata_manager.save_metadata()
+
+    journal = CheckpointJournal(metadata_manager, result_writer,
+                                interval=float(os.getenv("CHECKPOINT_INTERVAL", "5")),
+                                every=int(os.getenv("CHECKPOINT_EVERY", "1000")))
+    retry_usernames = await run_blocking(fetch_retry_usernames, db_path, retry_max_attempts())
+    if retry_usernames:
+        logging.info(f"Oldingi ishlarda xato bilan tugagan {len(retry_usernames)} ta username birinchi bo'lib qayta tekshiriladi.")
+    proxy_handler = create_proxy_handler(proxies_path)
+    classifier = create_classifier()
+    rate_limiter = create_rate_limiter()
+    recheck_scheduler = await run_blocking(create_recheck_scheduler, db_path)
+    pipeline = CheckPipeline(proxy_handler, create_client_pool(), classifier, rate_limiter,
+                             recheck_scheduler,
+                             worker_count=int(os.getenv("CHECK_WORKERS", "50")),
+                             on_exhausted=lambda: _notify_exhausted(notifier))
+    counters = {"available": 0, "taken": 0, "checked": 0, "processed": 0, "failed": 0}
+
+    try:
+        with _progress_bar(username_source.size, start_offset, getattr(username_source, "unit", "B")) as pbar:
+
+            def checkpoint_state():
+                # Uzluksiz tugallangan qatorlargacha bo'lgan pozitsiya; xato bilan tugaganlari qayta tekshirish
+                # jurnalida, shuning uchun nuqta ular ustidan siljiydi
+                if pipeline.watermark is None:
+                    return None
+                line_index, _, byte_offset, _ = pipeline.watermark
+                return {"source_fingerprint": source_fingerprint, "byte_offset": byte_offset,
+                        "total_usernames_checked": line_index + 1}
+
+            def on_result(item, result):
+                username = item[-1]
+                if isinstance(result, Exception):
+                    result_writer.submit_failure(username)
+                    counters["failed"] += 1
+                elif result:
+                    result_writer.submit(username, result)
+                    if result in counters:
+                        counters[result] += 1
+                    counters["checked"] += 1
+                    metadata_manager.update_metadata("last_checked_username", username)
+
+                counters["processed"] += 1
+                if pipeline.watermark is not None:
+                    pbar.update(pipeline.watermark[2] - pbar.n)
+                pbar.set_postfix(available=counters["available"], taken=counters["taken"], checked=counters["checked"],
+                                 skipped=pipeline.skipped, rate=f"{rate_limiter.global_rate:.1f}/s", refresh=False)
+                if journal.tick():
+                    state = checkpoint_state()
+                    if state is not None:
+                        journal.record(state)
+
+            # Jurnaldagi username'lar resume nuqtasi pozitsiyasi bilan oldinda: ular tugaguncha checkpoint siljimaydi
+            retry_stream = ((start_index - 1, start_offset, start_offset, username) for username in retry_usernames)
+            username_stream = ((index, start, offset, username) for index, (start, offset, username)
+                               in enumerate(iterate_spans(username_source, start_offset), start=start_index))
+            await pipeline.run(itertools.chain(retry_stream, username_stream), on_result)
+            state = checkpoint_state()
+            if state is not None:
+                await journal.finalize(state)
+            if counters["failed"]:
+                logging.warning(f"{counters['failed']} ta username xato bilan yakunlandi: qayta tekshirish jurnaliga "
+                                f"yozildi va keyingi ishga tushirishda birinchi bo'lib tekshiriladi.")
+            if hasattr(username_source, "pruned_invalid"):
+                logging.info(f"Shablon nomzodlari: {username_source.pruned_invalid} ta qoidaga mos emas, "
+                             f"{username_source.pruned_existing} ta bazada bor - tekshirilmadi.")
+    finally:
+        await pipeline.aclose()
+        proxy_handler.save_stats()
+    return classifier.stats.as_dict()
+
+async def _run_sharded(username_source: FileUsernameSource, metadata_manager: MetadataManager,
+                       result_writer: ResultWriter, proxies_path: str, db_path: str,
+                       notifier: "TelegramNotifier", workers: int) -> dict:
+    coordinator = ShardCoordinator(username_source, workers, metadata_manager, result_writer,
+                                   proxies_path, db_path,
+                                   worker_count=int(os.getenv("CHECK_WORKERS", "50")),
+                                   stats_path=os.getenv("PROXY_STATS_PATH"),
+                                   checkpoint_interval=float(os.getenv("CHECKPOINT_INTERVAL", "5")))
+    coordinator.plan()
+    with _progress_bar(username_source.size, coordinator.bytes_done, getattr(username_source, "unit", "B")) as pbar:
+
+        def on_progress(delta, counters):
+            pbar.update(delta)
+            pbar.set_postfix(**counters, refresh=False)
+
+        await coordinator.run(on_progress)
+
+    # Resume'da avval tugallangan shard'lar ishga tushirilmaydi: faqat boshlanganlari bilan solishtiriladi
+    if coordinator.launched and coordinator.exhausted_shards == coordinator.launched:
+        _notify_exhausted(notifier)
+    return coordinator.bandwidth
+
+async def _main(workers: int = 1):
     logging.info("Loyiha ishga tushdi.")
+    from scripts.system_monitor import get_system_status
+    # CPU bir soniya o'lchanadi: tekshiruv fonda, konfiguratsiya, baza va proksilar tayyorlanishi bilan parallel bajariladi
+    system_check = asyncio.ensure_future(run_blocking(get_system_status))
+    try:
+        await _run_main(system_check, workers)
+    finally:
+        # Erta chiqishlarda ham fondagi CPU o'lchovi kutilmay qolib ketmaydi
+        system_check.cancel()
+        await asyncio.gather(system_check, return_exceptions=True)
 
+async def _run_main(system_check: "asyncio.Future", workers: int):
     validator = ConfigValidator(os.path.join(os.path.dirname(__file__), '..', '.env'))
     if validator.validate():
         notify_critical("Loyiha konfiguratsiya xatolari tufayli to'xtatildi.")
@@ -83,114 +192,76 @@ async def main():
     metadata_path = os.getenv("METADATA_PATH", "output/run_metadata.json")
     if not os.path.exists("output"): os.makedirs("output")
     
-    notifier = TelegramNotifier()
-    
-    system_alerts = get_system_status()
-    if system_alerts:
-        alert_message = "\n".join(system_alerts)
-        notifier.send_message(f"🚨 Tizimda muammo aniqlandi:\n{alert_message}")
-        logging.warning(f"Tizimda muammo aniqlandi:\n{alert_message}")
+    notifier = get_notifier()
 
-    proxy_handler = ProxyHandler(proxies_path)
-    db_manager = DBManager(output_db_path)
-    metadata_manager = MetadataManager(metadata_path)
-    report_manager = ReportManager(output_db_path, templates_dir=os.path.join(os.path.dirname(__file__), '..', 'templates'))
-    
+    # Manba baza ochilishidan oldin tekshiriladi: erta chiqishda yopilmay qoladigan ulanish bo'lmaydi
+    username_source = open_username_source(usernames_path, db_path=output_db_path)
     try:
-        with open(usernames_path, 'r') as f:
-            total_lines = sum(1 for line in f if line.strip())
+        source_size = username_source.size
     except FileNotFoundError:
         notify_critical(f"Xato: Foydalanuvchi nomlari fayli topilmadi: {usernames_path}")
         return
 
-    if total_lines == 0:
+    if source_size == 0:
         logging.warning("Foydalanuvchi nomlari fayli bo'sh. Loyiha yakunlanmoqda.")
         # "Waiting" rejimiga o'tish mumkin, bu yerda dastur to'xtaydi
         return
 
-    metadata = metadata_manager.get_metadata("total_usernames_checked")
-    start_index = metadata if metadata is not None else 0
-    
-    if start_index >= total_lines:
-        start_index = 0
-        metadata_manager.update_metadata("total_usernames_checked", 0)
-        metadata_manager.save_metadata()
+    db_manager = await run_blocking(DBManager, output_db_path)
+    result_writer = ResultWriter(db_manager,
+                                 batch_size=int(os.getenv("DB_BATCH_SIZE", "500")),
+                                 flush_interval=float(os.getenv("DB_FLUSH_INTERVAL", "1.0")))
+    metadata_manager = MetadataManager(metadata_path)
 
-    chunk_size = 50
-    available_count = 0 
-    taken_count = 0
-    checked_count = 0
+    await _probe_proxies(proxies_path)
 
+    system_alerts = await system_check
+    if system_alerts:
+        alert_message = "\n".join(system_alerts)
+        notifier.send_message(f"🚨 Tizimda muammo aniqlandi:\n{alert_message}")
+        logging.warning(f"Tizimda muammo aniqlandi:\n{alert_message}")
+
+    bandwidth = {}
+    lag_monitor = LoopLagMonitor()
+    watchdog = create_loop_watchdog()
+    metrics_server = None
     try:
-        with tqdm(total=total_lines,
-                  initial=start_index,
-                  desc=f"{Fore.CYAN}Tekshirilmoqda{Style.RESET_ALL}",
-                  bar_format="{l_bar}{bar}| {n_fmt}/{total_fmt} [{elapsed}<{remaining}, {rate_fmt}{postfix}]",
-                  unit=" username",
-                  dynamic_ncols=True,
-                  colour='green') as pbar:
-
-            username_stream = username_generator(usernames_path)
-            
-            if start_index > 0:
-                for _ in range(start_index):
-                    next(username_stream, None)
-
-            for chunk in chunkify(username_stream, size=chunk_size):
-                
-                # Agar proksi tugagan bo'lsa, loyihani to'xtatish
-                if not (proxy_handler.proxies - proxy_handler.bad_proxies):
-                    notify_critical("Jiddiy xato: Barcha proksilar ishlamayapti. Loyiha to'xtatildi.")
-                    notifier.send_message("‼️ Jiddiy xato: Barcha proksilar ishlamayapti. Loyiha to'xtatildi.")
-                    break
-                    
-                sanitized_chunk = [u for u in chunk if re.match(r"^[a-zA-Z0-9._]+$", u)]
-                
-                if not sanitized_chunk:
-                    continue
-
-                tasks = []
-                for user in sanitized_chunk:
-                    proxy = proxy_handler.get_random_proxy()
-                    if proxy:
-                        tasks.append(check_username_with_retries(user, proxy))
-                    else:
-                        logging.warning(f"Username '{user}' proksi yo'qligi sababli tekshirilmadi.")
-                
-                results = await asyncio.gather(*tasks, return_exceptions=True)
-                
-                for j, result in enumerate(results):
-                    username = sanitized_chunk[j]
-                    if isinstance(result, Exception):
-                        log_exception(result, f"Username '{username}'ni tekshirishda xato")
-                        proxy_handler.mark_as_unusable(proxy_handler.get_random_proxy())
-                        continue
-
-                    status = result
-                    if status:
-                        safe_execute(db_manager.save_result, username, status)
-                        
-                        if status == 'available':
-                            available_count += 1
-                        elif status == 'taken':
-                            taken_count += 1
-
-                        checked_count += 1
-                        metadata_manager.update_metadata("last_checked_username", username)
-                
-                pbar.update(len(chunk))
-                pbar.set_postfix(available=available_count, taken=taken_count, checked=checked_count)
-
-                metadata_manager.update_metadata("total_usernames_checked", pbar.n)
-                metadata_manager.save_metadata()
-                
-                await asyncio.sleep(random.uniform(1.5, 4.0))
+        await run_blocking(db_manager.begin_run)
+        result_writer.start()
+        lag_monitor.start()
+        watchdog.start()
+        metrics_port = os.getenv("METRICS_PORT")
+        if metrics_port:
+            metrics_server = await start_metrics_server(os.getenv("METRICS_HOST", "127.0.0.1"), int(metrics_port))
+        if workers > 1:
+            bandwidth = await _run_sharded(username_source, metadata_manager, result_writer,
+                                           proxies_path, output_db_path, notifier, workers)
+        else:
+            bandwidth = await _run_single(username_source, metadata_manager, result_writer,
+                                          proxies_path, output_db_path, notifier)
 
     except Exception as e:
         log_exception(e, "Faylni o'qishda umumiy xato")
         notifier.send_message(f"‼️ Loyiha kutilmagan xato tufayli to'xtadi: {e}")
     finally:
-        report_manager.generate_report()
+        await result_writer.close()
+        # Band baza (boshqa jarayon yozayotgan) finally'ni uzmasligi kerak: close va hisobot baribir bajariladi
+        await async_safe_execute(db_manager.finish_run, retries=3, delay=1)
+        await run_blocking(db_manager.close)
+        await lag_monitor.stop()
+        await watchdog.stop()
+        if metrics_server is not None:
+            await metrics_server.close()
+        from scripts.report_manager import ReportManager
+        report_manager = ReportManager(output_db_path, templates_dir=os.path.join(os.path.dirname(__file__), '..', 'templates'),
+                                       page_size=int(os.getenv("REPORT_PAGE_SIZE", "1000")))
+        if os.getenv("REPORT_PAGES", "false").lower() == "true":
+            await async_safe_execute(report_manager.generate_pages, retries=3, delay=1)
+        await run_blocking(report_manager.generate_report, runtime_metrics=REGISTRY.summary())
+        if bandwidth:
+            logging.info(f"Yuklab olingan: {bandwidth['bytes_downloaded']} bayt, tejalgan: {bandwidth['bytes_saved']} bayt "
+                         f"({bandwidth['early_exits']}/{bandwidth['responses']} javob erta to'xtatildi).")
+            metadata_manager.update_metadata("last_run_bandwidth", bandwidth)
         end_time = datetime.now(timezone.utc)
         metadata_manager.update_metadata("last_run_time", end_time.isoformat())
         metadata_manager.update_metadata("status", "completed")
@@ -200,5 +271,273 @@ async def main():
     logging.info("Loyiha yakunlandi.")
     notifier.send_message("✅ Loyiha muvaffaqiyatli yakunlandi!")
 
+async def main(workers: int = 1):
+    # Loglash import paytida emas, shu yerda sozlanadi (LOG_* o'zgaruvchilari ishga tushirishdagi qiymatlari bilan)
+    owns_logging = setup_logging()
+    try:
+        await _main(workers)
+    finally:
+        # Navbatda qolgan Telegram xabarlari loop yopilishidan oldin yuboriladi
+        await get_notifier().aclose()
+        if owns_logging:
+            shutdown_logging()
+
+def _stop_event_on_signals() -> asyncio.Event:
+    # Uzoq ishlaydigan rejimlar SIGINT/SIGTERM'da to'xtaydi, lekin boshlangan ishni tugatib, holatni saqlab chiqadi
+    stop_event = asyncio.Event()
+    loop = asyncio.get_running_loop()
+    for sig in (signal.SIGINT, signal.SIGTERM):
+        try:
+            loop.add_signal_handler(sig, stop_event.set)
+        except (NotImplementedError, RuntimeError):
+            pass
+    return stop_event
+
+async def serve(host: str, port: int, tail_path: Optional[str] = None, drop_dir: Optional[str] = None) -> int:
+    """
+    Xizmat rejimi: proksilar, HTTP klientlar va baza bir marta tayyorlanadi, keyin username'lar
+    mahalliy API, kuzatilayotgan fayl yoki drop papkasi orqali qabul qilinadi. SIGINT/SIGTERM bilan to'xtaydi.
+    """
+    owns_logging = setup_logging()
+    proxies_path = os.getenv("PROXY_LIST_PATH")
+    db_path = os.getenv("OUTPUT_DB_PATH")
+    notifier = get_notifier()
+    stop_event = _stop_event_on_signals()
+
+    try:
+        if not proxies_path or not os.path.exists(proxies_path) or not db_path:
+            logging.error("Xizmat uchun PROXY_LIST_PATH va OUTPUT_DB_PATH sozlanishi kerak.")
+            return 1
+        await _probe_proxies(proxies_path)
+        db_manager = await run_blocking(DBManager, db_path)
+        result_writer = ResultWriter(db_manager,
+                                     batch_size=int(os.getenv("DB_BATCH_SIZE", "500")),
+                                     flush_interval=float(os.getenv("DB_FLUSH_INTERVAL", "1.0")))
+        proxy_handler = create_proxy_handler(proxies_path)
+        pipeline = CheckPipeline(proxy_handler, create_client_pool(), create_classifier(), create_rate_limiter(),
+                                 worker_count=int(os.getenv("CHECK_WORKERS", "50")),
+                                 on_exhausted=lambda: _notify_exhausted(notifier),
+                                 stop_on_exhausted=False)
+        service = CheckService(pipeline, result_writer, db_path,
+                               recheck_scheduler=create_recheck_scheduler(),
+                               state=MetadataManager(os.getenv("SERVICE_STATE_PATH", os.path.join("output", "service_state.json"))),
+                               tail_path=tail_path, drop_dir=drop_dir,
+                               poll_interval=float(os.getenv("SERVICE_POLL_INTERVAL", "1")))
+        server = LocalHTTPServer(host, port)
+        service.attach(server)
+        lag_monitor = LoopLagMonitor()
+        watchdog = create_loop_watchdog()
+        metrics_server = None
+        try:
+            await run_blocking(db_manager.begin_run)
+            result_writer.start()
+            lag_monitor.start()
+            watchdog.start()
+            await server.start()
+            metrics_port = os.getenv("METRICS_PORT")
+            if metrics_port:
+                metrics_server = await start_metrics_server(os.getenv("METRICS_HOST", "127.0.0.1"), int(metrics_port))
+            logging.info(f"Xizmat tayyor: http://{host}:{server.port} (POST /check, GET /results, GET /status)")
+            await service.run(stop_event)
+        finally:
+            await server.close()
+            if metrics_server is not None:
+                await metrics_server.close()
+            await pipeline.aclose()
+            await run_blocking(proxy_handler.save_stats)
+            await result_writer.close()
+            await async_safe_execute(db_manager.finish_run, retries=3, delay=1)
+            await run_blocking(db_manager.close)
+            await lag_monitor.stop()
+            await watchdog.stop()
+        return 0
+    finally:
+        await notifier.aclose()
+        if owns_logging:
+            shutdown_logging()
+
+async def coordinate(store_url: str, range_count: int, replan: bool = False, retry_failed: bool = False) -> int:
+    """
+    Ko'p mashinali rejim koordinatori: username manbasini oraliqlarga bo'lib umumiy omborga yozadi va
+    tugunlar yuborgan natijalarni OUTPUT_DB_PATH bazasiga ko'chiradi. Barcha oraliqlar tugagach chiqadi;
+    urinishlar chegarasidan keyin tugallanmagan oraliqlar qolsa, 1 qaytaradi.
+    """
+    owns_logging = setup_logging()
+    stop_event = _stop_event_on_signals()
+    try:
+        usernames_path = os.getenv("USERNAME_LIST_PATH")
+        db_path = os.getenv("OUTPUT_DB_PATH")
+        if not usernames_path or not os.path.exists(usernames_path) or not db_path:
+            logging.error("Koordinator uchun USERNAME_LIST_PATH va OUTPUT_DB_PATH sozlanishi kerak.")
+            return 1
+        store = open_lease_store(store_url)
+        source = open_username_source(usernames_path)
+        db_manager = await run_blocking(DBManager, db_path)
+        result_writer = ResultWriter(db_manager,
+                                     batch_size=int(os.getenv("DB_BATCH_SIZE", "500")),
+                                     flush_interval=float(os.getenv("DB_FLUSH_INTERVAL", "1.0")))
+        coordinator = LeaseCoordinator(store, source, result_writer, range_count=range_count)
+        try:
+            await run_blocking(db_manager.begin_run)
+            result_writer.start()
+            await run_blocking(coordinator.plan, replan, retry_failed)
+            with _progress_bar(range_count, 0, unit="oraliq") as pbar:
+
+                def on_progress(summary):
+                    pbar.total = summary[PENDING] + summary[LEASED] + summary[DONE] + summary[FAILED]
+                    pbar.update(summary[DONE] + summary[FAILED] - pbar.n)
+                    pbar.set_postfix(leased=summary[LEASED], expired=summary["expired"], failed=summary[FAILED],
+                                     checked=summary["checked"], refresh=False)
+
+                summary = await coordinator.run(stop_event, on_progress)
+        finally:
+            await result_writer.close()
+            await async_safe_execute(db_manager.finish_run, retries=3, delay=1)
+            await run_blocking(db_manager.close)
+        if summary[FAILED]:
+            get_notifier().send_message(f"⚠️ {summary[FAILED]} ta oraliq urinishlar chegarasidan keyin tugallanmadi "
+                                        f"(qayta urinish: coordinate --retry-failed).")
+            return 1
+        return 0
+    finally:
+        await get_notifier().aclose()
+        if owns_logging:
+            shutdown_logging()
+
+async def run_node(store_url: str, node_id: str) -> int:
+    """
+    Ko'p mashinali rejim tuguni: o'z proksilari bilan umumiy ombordan oraliqlarni ijaraga olib tekshiradi.
+    """
+    owns_logging = setup_logging()
+    stop_event = _stop_event_on_signals()
+    notifier = get_notifier()
+    try:
+        proxies_path = os.getenv("PROXY_LIST_PATH")
+        usernames_path = os.getenv("USERNAME_LIST_PATH")
+        if not proxies_path or not os.path.exists(proxies_path) or not usernames_path or not os.path.exists(usernames_path):
+            logging.error("Tugun uchun PROXY_LIST_PATH va USERNAME_LIST_PATH sozlanishi kerak.")
+            return 1
+        await _probe_proxies(proxies_path)
+        store = open_lease_store(store_url)
+        proxy_handler = create_proxy_handler(proxies_path)
+        client_pool = create_client_pool()
+        node = LeaseNode(store, open_username_source(usernames_path), proxy_handler, client_pool,
+                         create_classifier(), create_rate_limiter(), node_id,
+                         worker_count=int(os.getenv("CHECK_WORKERS", "50")),
+                         lease_ttl=float(os.getenv("LEASE_TTL", "30")),
+                         report_interval=float(os.getenv("LEASE_REPORT_INTERVAL", "1")),
+                         max_attempts=int(os.getenv("LEASE_MAX_ATTEMPTS", "5")))
+        watchdog = create_loop_watchdog()
+        watchdog.start()
+        try:
+            await node.run(stop_event)
+        finally:
+            await watchdog.stop()
+            await client_pool.aclose()
+            await run_blocking(proxy_handler.save_stats)
+        if node.exhausted:
+            _notify_exhausted(notifier)
+        return 0
+    finally:
+        await notifier.aclose()
+        if owns_logging:
+            shutdown_logging()
+
+def run_export(args) -> int:
+    db_path = os.getenv("OUTPUT_DB_PATH")
+    if not db_path or not os.path.exists(db_path):
+        logging.error(f"Ma'lumotlar bazasi topilmadi: {db_path}")
+        return 1
+    exporter = ResultExporter(db_path,
+                              state_path=os.getenv("EXPORT_STATE_PATH", os.path.join("output", "export_state.json")),
+                              chunk_size=args.chunk_size,
+                              safety_lag=args.lag)
+    output_path = args.output or default_export_path(os.path.dirname(db_path), args.format, args.gzip)
+    try:
+        exporter.export(output_path, fmt=args.format, name=args.name, incremental=args.incremental,
+                        status=args.status, compress=args.gzip, compression=args.compression)
+    except (RuntimeError, ValueError) as e:
+        logging.error(str(e))
+        return 1
+    return 0
+
+def run_ingest(args) -> int:
+    missing = [path for path in args.inputs if not os.path.exists(path)]
+    if missing:
+        logging.error(f"Fayl topilmadi: {', '.join(missing)}")
+        return 1
+    ingest(args.inputs, args.output, chunk_size=args.chunk_size, temp_dir=args.temp_dir, rejects_path=args.rejects)
+    return 0
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(description="Instagram username tekshiruvchi")
+    parser.add_argument("--workers", type=int, default=int(os.getenv("CHECK_PROCESSES", "1")),
+                        help="Parallel jarayonlar (shard'lar) soni")
+    subparsers = parser.add_subparsers(dest="command")
+
+    export_parser = subparsers.add_parser("export", help="Natijalarni CSV/NDJSON/Parquet fayliga eksport qilish")
+    export_parser.add_argument("--format", choices=EXPORT_FORMATS, default="csv")
+    export_parser.add_argument("--output", help="Natija fayli (standart: output/exports/results-<vaqt>.<format>)")
+    export_parser.add_argument("--incremental", action="store_true",
+                               help="Faqat oxirgi eksportdan keyin yozilgan natijalar")
+    export_parser.add_argument("--name", default="default", help="Eksport belgisi (watermark) nomi")
+    export_parser.add_argument("--status", help="Faqat shu statusdagi natijalar (masalan, available)")
+    export_parser.add_argument("--gzip", action="store_true", help="CSV/NDJSON ni gzip bilan siqish")
+    export_parser.add_argument("--compression", default="snappy", help="Parquet siqish algoritmi")
+    export_parser.add_argument("--chunk-size", type=int, default=int(os.getenv("EXPORT_CHUNK_SIZE", "10000")))
+    export_parser.add_argument("--lag", type=float, default=float(os.getenv("EXPORT_SAFETY_LAG", "60")),
+                               help="Oxirgi shuncha soniyadagi natijalar keyingi eksportga qoldiriladi")
+
+    ingest_parser = subparsers.add_parser("ingest", help="Username ro'yxatlarini tozalash va .ulist formatiga kompilyatsiya qilish")
+    ingest_parser.add_argument("inputs", nargs="+", help="Kiruvchi matn fayllari (har qatorda bitta username)")
+    ingest_parser.add_argument("--output", required=True, help="Natija fayli, masalan data/usernames.ulist")
+    ingest_parser.add_argument("--chunk-size", type=int, default=1_000_000,
+                               help="Xotirada saralanadigan username'lar soni (tashqi saralash bo'lagi)")
+    ingest_parser.add_argument("--temp-dir", help="Vaqtinchalik fayllar papkasi")
+    ingest_parser.add_argument("--rejects", help="Qoidalarga mos kelmagan qatorlar yoziladigan fayl")
+
+    serve_parser = subparsers.add_parser("serve", help="Doimiy ishlaydigan xizmat: mahalliy API, fayl va papka kuzatuvi")
+    serve_parser.add_argument("--host", default=os.getenv("SERVICE_HOST", "127.0.0.1"))
+    serve_parser.add_argument("--port", type=int, default=int(os.getenv("SERVICE_PORT", "8787")))
+    serve_parser.add_argument("--tail", default=os.getenv("SERVICE_TAIL_PATH"),
+                              help="Oxiriga qo'shilgan yangi qatorlari tekshiriladigan username fayli")
+    serve_parser.add_argument("--drop-dir", default=os.getenv("SERVICE_DROP_DIR"),
+                              help="Tashlangan *.txt fayllar tekshirilib, processed/ ichiga ko'chiriladigan papka")
+
+    coordinate_parser = subparsers.add_parser("coordinate", help="Ko'p mashinali rejim: ishni oraliqlarga bo'lish va natijalarni yig'ish")
+    coordinate_parser.add_argument("--store", default=os.getenv("LEASE_STORE"), required=not os.getenv("LEASE_STORE"),
+                                   help="Umumiy ijara ombori, masalan sqlite:///mnt/shared/work.db")
+    coordinate_parser.add_argument("--ranges", type=int, default=int(os.getenv("LEASE_RANGES", "64")),
+                                   help="Username manbasi bo'linadigan oraliqlar soni (tugunlar sonidan bir necha barobar ko'p)")
+    coordinate_parser.add_argument("--replan", action="store_true",
+                                   help="Mavjud rejani (tugallangan bo'lsa ham) tashlab, ishni boshidan boshlash")
+    coordinate_parser.add_argument("--retry-failed", action="store_true",
+                                   help="Urinishlar chegarasiga yetgan oraliqlarni qayta navbatga qo'yish")
+
+    node_parser = subparsers.add_parser("node", help="Ko'p mashinali rejim: umumiy ombordan ish olib tekshiruvchi tugun")
+    node_parser.add_argument("--store", default=os.getenv("LEASE_STORE"), required=not os.getenv("LEASE_STORE"),
+                             help="Umumiy ijara ombori, masalan sqlite:///mnt/shared/work.db")
+    node_parser.add_argument("--node-id", default=os.getenv("NODE_ID") or default_node_id(),
+                             help="Tugun nomi (standart: host-pid)")
+    return parser
+
 if __name__ == "__main__":
-    asyncio.run(main())
+    args = build_parser().parse_args()
+    # Loglash bu yerda egallanadi: buyruqlar ichidagi setup_logging() hech narsa qilmaydi, shuning uchun
+    # navbatdagi yozuvlar (sys.exit bilan chiqilganda ham) shu yerda yozib bo'linadi
+    setup_logging()
+    try:
+        if args.command == "export":
+            sys.exit(run_export(args))
+        if args.command == "ingest":
+            sys.exit(run_ingest(args))
+        if args.command == "coordinate":
+            sys.exit(asyncio.run(coordinate(args.store, args.ranges, replan=args.replan,
+                                            retry_failed=args.retry_failed)))
+        if args.command == "node":
+            sys.exit(asyncio.run(run_node(args.store, args.node_id)))
+        if args.command == "serve":
+            sys.exit(asyncio.run(serve(args.host, args.port, tail_path=args.tail, drop_dir=args.drop_dir)))
+        asyncio.run(main(workers=args.workers))
+    finally:
+        shutdown_logging()
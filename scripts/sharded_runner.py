@@ -0,0 +1,248 @@
+# scripts/sharded_runner.py
+
+import asyncio
+import itertools
+import logging
+import multiprocessing
+import os
+import queue
+import time
+from datetime import datetime
+from typing import Callable, Dict, List, Optional
+
+from scripts.async_utils import create_loop_watchdog, run_blocking
+from scripts.check_pipeline import (CheckPipeline, create_proxy_handler, create_client_pool, create_classifier,
+                                    create_rate_limiter, create_recheck_scheduler, retry_max_attempts)
+from scripts.db_manager import fetch_retry_usernames
+from scripts.logging_setup import setup_child_logging, start_log_forwarding
+from scripts.metadata_manager import CheckpointJournal
+from scripts.metrics import REGISTRY, LoopLagMonitor
+from scripts.proxy_handler import merge_proxy_stats
+from scripts.username_source import FileUsernameSource, iterate_spans, open_username_source
+
+RESULT_BATCH_SIZE = 200
+RESULT_FLUSH_INTERVAL = 0.5
+METRICS_SNAPSHOT_INTERVAL = 5.0
+
+
+def _shard_main(shard_id: int, shard_count: int, usernames_path: str, start: int, end: int, offset: int,
+                proxies_path: str, db_path: str, worker_count: int, out_queue, stop_event, log_queue,
+                retry_usernames: List[str]):
+    # Har bir jarayon o'zining event loop'i va proksilar qismi bilan ishlaydi
+    setup_child_logging(log_queue, shard=shard_id)
+    try:
+        asyncio.run(_run_shard(shard_id, shard_count, usernames_path, end, offset,
+                               proxies_path, db_path, worker_count, out_queue, stop_event, retry_usernames))
+    except KeyboardInterrupt:
+        pass
+
+
+async def _run_shard(shard_id: int, shard_count: int, usernames_path: str, end: int, offset: int,
+                     proxies_path: str, db_path: str, worker_count: int, out_queue, stop_event,
+                     retry_usernames: List[str]):
+    source = open_username_source(usernames_path, db_path=db_path)
+    proxy_handler = create_proxy_handler(proxies_path, partition=(shard_id, shard_count))
+    classifier = create_classifier()
+    recheck_scheduler = await run_blocking(create_recheck_scheduler, db_path)
+    pipeline = CheckPipeline(proxy_handler, create_client_pool(), classifier, create_rate_limiter(shard_count),
+                             recheck_scheduler, worker_count=worker_count)
+    rows = []
+    processed = 0
+    last_flush = time.monotonic()
+    last_metrics = last_flush
+
+    def flush():
+        # Natijalar (xato bilan tugaganlari status=None bilan) va uzluksiz tugallangan ofset bitta xabarda yuboriladi
+        nonlocal rows, processed, last_flush, last_metrics
+        watermark = pipeline.watermark
+        done_offset = watermark[1] if watermark else offset
+        out_queue.put(("progress", shard_id, rows, done_offset, processed))
+        rows = []
+        processed = 0
+        last_flush = time.monotonic()
+        if last_flush - last_metrics >= METRICS_SNAPSHOT_INTERVAL:
+            out_queue.put(("metrics", shard_id, REGISTRY.snapshot()))
+            last_metrics = last_flush
+
+    def on_result(item, result):
+        nonlocal processed
+        username = item[-1]
+        if isinstance(result, Exception):
+            rows.append((username, None, datetime.now().isoformat()))
+        elif result:
+            rows.append((username, result, datetime.now().isoformat()))
+        processed += 1
+        if len(rows) >= RESULT_BATCH_SIZE or time.monotonic() - last_flush >= RESULT_FLUSH_INTERVAL:
+            flush()
+
+    async def watch_stop():
+        while not stop_event.is_set():
+            await asyncio.sleep(0.5)
+        pipeline.work_queue.stop()
+
+    watcher = asyncio.create_task(watch_stop())
+    lag_monitor = LoopLagMonitor()
+    lag_monitor.start()
+    watchdog = create_loop_watchdog()
+    watchdog.start()
+    try:
+        # Jurnaldagi username'lar shard ofseti bilan oldinda: ular tugaguncha checkpoint siljimaydi
+        retry_stream = ((offset, offset, username) for username in retry_usernames)
+        await pipeline.run(itertools.chain(retry_stream, iterate_spans(source, offset, end)), on_result)
+    finally:
+        watcher.cancel()
+        await lag_monitor.stop()
+        await watchdog.stop()
+        flush()
+        await pipeline.aclose()
+        out_queue.put(("metrics", shard_id, REGISTRY.snapshot()))
+        out_queue.put(("done", shard_id, proxy_handler.stats_snapshot(), classifier.stats.as_dict(),
+                       pipeline.exhausted, pipeline.skipped))
+
+
+class ShardCoordinator:
+    """
+    Username faylini bayt oraliqlariga (shard) bo'lib, har biri uchun alohida jarayon ishga tushiradi.
+    Barcha natijalar bitta ResultWriter orqali yoziladi, shard ofsetlari esa metadata'da saqlanadi.
+    """
+    def __init__(self, source: FileUsernameSource, shard_count: int, metadata_manager, result_writer,
+                 proxies_path: str, db_path: str, worker_count: int, stats_path: Optional[str] = None,
+                 checkpoint_interval: float = 5.0):
+        self.source = source
+        self.shard_count = shard_count
+        self.metadata_manager = metadata_manager
+        self.result_writer = result_writer
+        self.proxies_path = proxies_path
+        self.db_path = db_path
+        self.worker_count = worker_count
+        self.stats_path = stats_path or os.path.join(os.path.dirname(proxies_path), 'proxy_stats.json')
+        self.checkpoint_interval = checkpoint_interval
+        self.counters = {"available": 0, "taken": 0, "checked": 0, "skipped": 0, "failed": 0}
+        self.bandwidth = {"responses": 0, "early_exits": 0, "bytes_downloaded": 0, "bytes_saved": 0}
+        self.exhausted_shards = 0
+        # Shu ishga tushirishda boshlangan shard'lar (resume'da tugallanganlari qayta ishga tushirilmaydi)
+        self.launched = 0
+        self.shards: List[dict] = []
+        self.journal = CheckpointJournal(metadata_manager, result_writer, interval=checkpoint_interval)
+        self._progress: Dict[int, int] = {}
+        self._stop_event = None
+
+    def plan(self) -> List[dict]:
+        fingerprint = self.source.fingerprint()
+        saved = self.metadata_manager.get_metadata("shards")
+        if (saved and self.metadata_manager.get_metadata("source_fingerprint") == fingerprint
+                and any(s["offset"] < s["end"] for s in saved)):
+            # Oldingi bo'linish saqlanadi, aks holda ofsetlar mos kelmay qoladi
+            if len(saved) != self.shard_count:
+                logging.warning(f"Oldingi ish {len(saved)} ta shard bilan boshlangan, shu bo'linish davom ettiriladi.")
+            self.shards = saved
+        else:
+            self.shards = [{"start": start, "end": end, "offset": start, "lines": 0}
+                           for start, end in self.source.split(self.shard_count)]
+            self.metadata_manager.update_metadata("source_fingerprint", fingerprint)
+        self.metadata_manager.update_metadata("shards", self.shards)
+        return self.shards
+
+    @property
+    def bytes_done(self) -> int:
+        return sum(s["offset"] - s["start"] for s in self.shards)
+
+    def _checkpoint_state(self) -> dict:
+        # Nusxa olinadi: holat yozuvchi commit qilguncha navbatda kutadi, shard'lar esa o'zgarishda davom etadi
+        shards = [dict(shard) for shard in self.shards]
+        return {"shards": shards, "total_usernames_checked": sum(s["lines"] for s in shards)}
+
+    def stop(self):
+        if self._stop_event is not None:
+            self._stop_event.set()
+
+    @staticmethod
+    def _get(out_queue):
+        try:
+            return out_queue.get(timeout=0.5)
+        except queue.Empty:
+            return None
+
+    async def run(self, on_progress: Optional[Callable[[int, Dict[str, int]], None]] = None):
+        if not self.shards:
+            self.plan()
+        ctx = multiprocessing.get_context("spawn")
+        out_queue = ctx.Queue()
+        log_queue = ctx.Queue()
+        log_listener = start_log_forwarding(log_queue)
+        self._stop_event = ctx.Event()
+        shard_count = len(self.shards)
+        launch = [shard_id for shard_id, shard in enumerate(self.shards) if shard["offset"] < shard["end"]]
+        retry_usernames = await run_blocking(fetch_retry_usernames, self.db_path, retry_max_attempts())
+        if retry_usernames:
+            logging.info(f"Oldingi ishlarda xato bilan tugagan {len(retry_usernames)} ta username qayta tekshiriladi.")
+
+        processes = {}
+        for index, shard_id in enumerate(launch):
+            shard = self.shards[shard_id]
+            process = ctx.Process(target=_shard_main, name=f"shard-{shard_id}", daemon=True,
+                                  args=(shard_id, shard_count, self.source.path, shard["start"], shard["end"],
+                                        shard["offset"], self.proxies_path, self.db_path, self.worker_count,
+                                        out_queue, self._stop_event, log_queue, retry_usernames[index::len(launch)]))
+            process.start()
+            processes[shard_id] = process
+        self.launched = len(processes)
+        logging.info(f"{len(processes)} ta shard jarayoni ishga tushirildi.")
+
+        pending = set(processes)
+        merged_stats = {}
+        last_checkpoint = time.monotonic()
+        try:
+            while pending:
+                message = await run_blocking(self._get, out_queue)
+                if message is None:
+                    for shard_id in list(pending):
+                        if not processes[shard_id].is_alive():
+                            logging.error(f"Shard {shard_id} jarayoni kutilmaganda to'xtadi (kod {processes[shard_id].exitcode}).")
+                            pending.discard(shard_id)
+                    continue
+
+                kind, shard_id = message[0], message[1]
+                if kind == "progress":
+                    _, _, rows, offset, processed = message
+                    for username, status, checked_at in rows:
+                        if status is None:
+                            self.result_writer.submit_failure(username, checked_at)
+                            self.counters["failed"] += 1
+                            continue
+                        self.result_writer.submit(username, status, checked_at)
+                        if status in self.counters:
+                            self.counters[status] += 1
+                        self.counters["checked"] += 1
+                    shard = self.shards[shard_id]
+                    seen = self._progress.get(shard_id, shard["offset"])
+                    delta = offset - seen
+                    self._progress[shard_id] = offset
+                    shard["offset"] = offset
+                    shard["lines"] += processed
+                    if on_progress is not None:
+                        on_progress(delta, self.counters)
+                elif kind == "metrics":
+                    REGISTRY.merge_remote(f"shard-{shard_id}", message[2])
+                elif kind == "done":
+                    _, _, proxy_stats, bandwidth, exhausted, skipped = message
+                    merged_stats.update(proxy_stats)
+                    for key, value in bandwidth.items():
+                        self.bandwidth[key] = self.bandwidth.get(key, 0) + value
+                    self.counters["skipped"] += skipped
+                    self.exhausted_shards += int(exhausted)
+                    pending.discard(shard_id)
+
+                if time.monotonic() - last_checkpoint >= self.checkpoint_interval:
+                    self.journal.record(self._checkpoint_state())
+                    last_checkpoint = time.monotonic()
+        finally:
+            self._stop_event.set()
+            for process in processes.values():
+                process.join(timeout=10)
+                if process.is_alive():
+                    process.terminate()
+            log_listener.stop()
+            if merged_stats:
+                merge_proxy_stats(self.stats_path, merged_stats)
+            await self.journal.finalize(self._checkpoint_state())
@@ -4,10 +4,11 @@ import psutil
 import shutil
 import logging
 
-def get_system_status(disk_threshold=10, ram_threshold=90, cpu_threshold=90):
+def get_system_status(disk_threshold=10, ram_threshold=90, cpu_threshold=90, cpu_interval=1.0):
     """
     Tizim resurslari (disk, RAM, CPU) holatini tekshiradi.
     Biron bir resurs belgilangan chegara (threshold) dan oshsa, ogohlantirish matnini qaytaradi.
+    CPU cpu_interval soniya davomida o'lchanadi va chaqiruvchi thread bloklanadi: event loop'dan run_blocking orqali chaqiring.
     """
     alerts = []
 
@@ -30,9 +31,9 @@ def get_system_status(disk_threshold=10, ram_threshold=90, cpu_threshold=90):
     except Exception as e:
         logging.error(f"RAM holatini tekshirishda xato yuz berdi: {e}")
 
-    # CPU holatini tekshirish (1 soniya davomida)
+    # CPU holatini tekshirish
     try:
-        if psutil.cpu_percent(interval=1) > cpu_threshold:
+        if psutil.cpu_percent(interval=cpu_interval) > cpu_threshold:
             alerts.append("❗CPUdan foydalanish juda yuqori!")
             logging.warning("CPUdan foydalanish juda yuqori.")
     except Exception as e:
@@ -1,26 +1,192 @@
 import os
-import requests
+import time
+import asyncio
+import logging
+from collections import OrderedDict, deque
+from itertools import count
+from typing import Optional
+
+import httpx
 from dotenv import load_dotenv
 
 load_dotenv(os.path.join(os.path.dirname(__file__), '..', '.env'))
 
+notifier_logger = logging.getLogger(__name__)
+
+# Bot API cheklovlari: bitta chatga taxminan 1 xabar/s, guruhga 20 xabar/daqiqa
+MIN_SEND_INTERVAL = 1.0
+MAX_PER_MINUTE = 20
+MAX_MESSAGE_LENGTH = 4096
+
+
 class TelegramNotifier:
-    def __init__(self):
-        self.bot_token = os.getenv("TELEGRAM_BOT_TOKEN")
-        self.chat_id = os.getenv("TELEGRAM_CHAT_ID")
-        self.api_url = f"https://api.telegram.org/bot{self.bot_token}/sendMessage"
+    """
+    Xabarlarni fon navbati orqali yuboradi: send_message darhol qaytadi, HTTP so'rov esa
+    event loop ichidagi alohida vazifada timeout va Bot API tezlik cheklovlari bilan bajariladi.
+    Bir xil kalit (key) bilan kelgan xabarlar oyna davomida bittaga birlashtiriladi.
+    """
+    def __init__(self, bot_token: Optional[str] = None, chat_id: Optional[str] = None,
+                 api_base: Optional[str] = None, timeout: Optional[float] = None,
+                 coalesce_window: Optional[float] = None, max_pending: int = 100,
+                 min_interval: float = MIN_SEND_INTERVAL, max_per_minute: int = MAX_PER_MINUTE):
+        self.bot_token = bot_token or os.getenv("TELEGRAM_BOT_TOKEN")
+        self.chat_id = chat_id or os.getenv("TELEGRAM_CHAT_ID")
+        api_base = (api_base or os.getenv("TELEGRAM_API_URL", "https://api.telegram.org")).rstrip("/")
+        self.api_url = f"{api_base}/bot{self.bot_token}/sendMessage"
+        self.timeout = timeout if timeout is not None else float(os.getenv("TELEGRAM_TIMEOUT", "10"))
+        self.coalesce_window = (coalesce_window if coalesce_window is not None
+                                else float(os.getenv("TELEGRAM_COALESCE_WINDOW", "30")))
+        self.max_pending = max_pending
+        self.min_interval = min_interval
+        self.max_per_minute = max_per_minute
+        self.sent = 0
+        self.dropped = 0
+        # kalit -> [xabar, takrorlar soni, birinchi kelgan vaqt, birlashtiriladimi]
+        self._pending: "OrderedDict[str, list]" = OrderedDict()
+        self._ids = count()
+        self._send_times = deque()
+        self._wakeup: Optional[asyncio.Event] = None
+        self._task: Optional[asyncio.Task] = None
+        self._busy = False
+
+    @property
+    def enabled(self) -> bool:
+        return bool(self.bot_token and self.chat_id)
 
-    def send_message(self, message):
-        if not self.bot_token or not self.chat_id:
+    def send_message(self, message: str, key: Optional[str] = None) -> bool:
+        """
+        Xabarni navbatga qo'yadi va darhol qaytadi. key berilsa, shu kalitli xabarlar birlashtiriladi.
+        Event loop bo'lmasa (masalan, CLI'ning sinxron qismida) xabar timeout bilan shu yerning o'zida yuboriladi.
+        """
+        if not self.enabled:
             return False
-        
         try:
-            payload = {
-                'chat_id': self.chat_id,
-                'text': message
-            }
-            requests.post(self.api_url, data=payload)
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            return self._send_sync(message)
+
+        if key is not None and key in self._pending:
+            self._pending[key][1] += 1
             return True
-        except requests.exceptions.RequestException as e:
-            print(f"Telegram'ga xabar yuborishda xato: {e}")
+        if len(self._pending) >= self.max_pending:
+            # Navbat to'lgan: eng eski xabar tashlab yuboriladi, tekshiruv yo'li kutib qolmaydi
+            self._pending.popitem(last=False)
+            self.dropped += 1
+        self._pending[key if key is not None else f"#{next(self._ids)}"] = [message, 1, time.monotonic(), key is not None]
+        self._ensure_worker(loop)
+        self._wakeup.set()
+        return True
+
+    def _ensure_worker(self, loop: asyncio.AbstractEventLoop):
+        if self._task is None or self._task.done() or self._task.get_loop() is not loop:
+            self._wakeup = asyncio.Event()
+            self._task = loop.create_task(self._run())
+
+    @staticmethod
+    def _format(message: str, repeats: int) -> str:
+        if repeats > 1:
+            message = f"{message}\n(yana {repeats - 1} marta takrorlandi)"
+        return message[:MAX_MESSAGE_LENGTH]
+
+    def _next_ready(self):
+        # Birlashtiriladigan xabar oyna tugaguncha kutadi, qolganlari navbat tartibida darhol yuboriladi
+        now = time.monotonic()
+        wait = None
+        for key, (_, _, first_seen, coalesced) in self._pending.items():
+            remaining = first_seen + self.coalesce_window - now if coalesced else 0.0
+            if remaining <= 0:
+                return key, 0.0
+            wait = remaining if wait is None else min(wait, remaining)
+        return None, wait
+
+    async def _throttle(self):
+        now = time.monotonic()
+        while self._send_times and now - self._send_times[0] >= 60:
+            self._send_times.popleft()
+        delay = 0.0
+        if self._send_times:
+            delay = max(delay, self._send_times[-1] + self.min_interval - now)
+        if len(self._send_times) >= self.max_per_minute:
+            delay = max(delay, self._send_times[0] + 60 - now)
+        if delay > 0:
+            await asyncio.sleep(delay)
+
+    async def _run(self):
+        async with httpx.AsyncClient(timeout=self.timeout) as client:
+            while True:
+                if not self._pending:
+                    self._wakeup.clear()
+                    await self._wakeup.wait()
+                    continue
+                key, wait = self._next_ready()
+                if key is None:
+                    self._wakeup.clear()
+                    try:
+                        await asyncio.wait_for(self._wakeup.wait(), wait)
+                    except asyncio.TimeoutError:
+                        pass
+                    continue
+                message, repeats, _, _ = self._pending.pop(key)
+                self._busy = True
+                try:
+                    await self._throttle()
+                    await self._post(client, self._format(message, repeats))
+                finally:
+                    self._busy = False
+
+    async def _post(self, client: httpx.AsyncClient, text: str):
+        for _ in range(2):
+            self._send_times.append(time.monotonic())
+            try:
+                response = await client.post(self.api_url, data={'chat_id': self.chat_id, 'text': text})
+            except httpx.HTTPError as e:
+                notifier_logger.error(f"Telegram'ga xabar yuborishda xato: {e}")
+                return
+            if response.status_code == 429:
+                # Bot API qancha kutish kerakligini parameters.retry_after'da aytadi
+                try:
+                    retry_after = float(response.json().get("parameters", {}).get("retry_after", 5))
+                except ValueError:
+                    retry_after = 5.0
+                notifier_logger.warning(f"Telegram tezlik cheklovi: {retry_after} s kutilmoqda.")
+                await asyncio.sleep(retry_after)
+                continue
+            if response.status_code >= 400:
+                notifier_logger.error(f"Telegram xabarni qabul qilmadi: HTTP {response.status_code}")
+                return
+            self.sent += 1
+            return
+
+    def _send_sync(self, message: str) -> bool:
+        try:
+            httpx.post(self.api_url, data={'chat_id': self.chat_id, 'text': self._format(message, 1)},
+                       timeout=self.timeout)
+            self.sent += 1
+            return True
+        except httpx.HTTPError as e:
+            notifier_logger.error(f"Telegram'ga xabar yuborishda xato: {e}")
             return False
+
+    async def aclose(self, timeout: Optional[float] = None):
+        """
+        Navbatdagi xabarlarni (birlashtirish oynasini kutmasdan) yuborib, fon vazifasini to'xtatadi.
+        """
+        if self._task is None:
+            return
+        for entry in self._pending.values():
+            entry[3] = False
+        if self._wakeup is not None:
+            self._wakeup.set()
+        deadline = time.monotonic() + (timeout if timeout is not None else self.timeout)
+        while (self._pending or self._busy) and not self._task.done() and time.monotonic() < deadline:
+            await asyncio.sleep(0.05)
+        if self._pending:
+            self.dropped += len(self._pending)
+            notifier_logger.warning(f"{len(self._pending)} ta Telegram xabari yuborilmay qoldi.")
+            self._pending.clear()
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+        self._task = None
@@ -1,11 +1,20 @@
 # scripts/username_checker.py
 
+import os
 import httpx
 import logging
 import asyncio
-from tenacity import retry, wait_exponential, stop_after_attempt, retry_if_exception_type, before_sleep_log
-from httpx import ReadTimeout, ConnectError, HTTPStatusError
+from tenacity import AsyncRetrying, wait_exponential, stop_after_attempt, retry_if_exception, before_sleep_log
+from httpx import HTTPStatusError, TransportError
 import random
+import time
+from typing import Optional
+
+from scripts.http_client_pool import ClientPool, normalize_proxy_url
+from scripts.response_classifier import MarkerClassifier
+from scripts.proxy_handler import ProxyHandler
+from scripts.rate_limiter import AdaptiveRateLimiter, parse_retry_after
+from scripts.metrics import ATTEMPTS, BYTES_DOWNLOADED, REQUEST_SECONDS, THROTTLED, proxy_label
 
 checker_logger = logging.getLogger(__name__)
 
@@ -18,44 +27,138 @@ USER_AGENTS = [
     "Mozilla/5.0 (Windows NT 6.1; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/100.0.4896.88 Safari/537.36",
 ]
 
-async def check_username(username: str, proxy: str) -> str:
-    url = f"https://www.instagram.com/{username}/"
+DEFAULT_CLASSIFIER = MarkerClassifier()
+
+# Benchmark va sinovlar uchun mahalliy stand-in serverga yo'naltirish imkoniyati
+INSTAGRAM_BASE_URL = os.getenv("INSTAGRAM_BASE_URL", "https://www.instagram.com").rstrip("/")
+
+def _content_length(response: httpx.Response) -> Optional[int]:
+    try:
+        return int(response.headers["Content-Length"])
+    except (KeyError, ValueError):
+        return None
+
+async def _fetch(client: httpx.AsyncClient, username: str, proxy: str,
+                 classifier: MarkerClassifier, drain_limit: int) -> str:
+    url = f"{INSTAGRAM_BASE_URL}/{username}/"
     headers = {
         'User-Agent': random.choice(USER_AGENTS) # User-Agent rotatsiyasi
     }
-    
-    try:
-        async with httpx.AsyncClient(proxies={'http://': proxy, 'https://': proxy},
-                                     timeout=15,
-                                     follow_redirects=True) as client:
-            checker_logger.info(f"Tekshirilmoqda: {username} (proksi: {proxy})")
-            response = await client.get(url, headers=headers)
+    # Har bir username uchun yoziladigan xabar: sampling filtri uni soniyasiga LOG_SAMPLE_RATE tagacha kamaytiradi
+    checker_logger.info("Tekshirilmoqda: %s (proksi: %s)", username, proxy_label(proxy),
+                        extra={"username": username, "proxy": proxy_label(proxy), "sampled": True})
+    async with client.stream("GET", url, headers=headers) as response:
+        content_length = _content_length(response)
+        status = classifier.classify_head(response.status_code, response.headers)
+        early = status is not None
+        chunks = response.aiter_bytes()
+        if status is None:
             response.raise_for_status()
-
-            if "Page Not Found" in response.text:
-                return 'available'
+            scanner = classifier.scanner()
+            async for chunk in chunks:
+                status = scanner.feed(chunk)
+                if status is not None:
+                    early = True
+                    break
             else:
-                return 'taken'
-    except (ReadTimeout, ConnectError) as e:
+                status = scanner.finish()
+
+        if early and content_length is not None:
+            remaining = content_length - response.num_bytes_downloaded
+            if 0 < remaining <= drain_limit:
+                # Qolgan qism kichik bo'lsa, ulanishni keep-alive uchun saqlab qolish arzonroq
+                async for _ in chunks:
+                    pass
+                early = False
+        # Erta to'xtatilgan oqim context'dan chiqishda yopiladi
+        classifier.stats.record(response.num_bytes_downloaded, content_length, early)
+        BYTES_DOWNLOADED.inc(response.num_bytes_downloaded)
+        return status
+
+async def check_username(username: str, proxy: str, client_pool: Optional[ClientPool] = None,
+                         classifier: Optional[MarkerClassifier] = None, drain_limit: int = 16384,
+                         proxy_handler: Optional[ProxyHandler] = None,
+                         rate_limiter: Optional[AdaptiveRateLimiter] = None) -> str:
+    classifier = classifier or DEFAULT_CLASSIFIER
+    if rate_limiter is not None:
+        await rate_limiter.acquire(proxy)
+    started = time.monotonic()
+    try:
+        if client_pool is not None:
+            # Pool'dagi klient yopilmaydi, ulanish keyingi tekshiruvlarda qayta ishlatiladi
+            async with client_pool.borrow(proxy) as client:
+                status = await _fetch(client, username, proxy, classifier, drain_limit)
+        else:
+            async with httpx.AsyncClient(proxy=normalize_proxy_url(proxy),
+                                         timeout=15,
+                                         follow_redirects=True) as client:
+                status = await _fetch(client, username, proxy, classifier, drain_limit)
+        if proxy_handler is not None:
+            proxy_handler.report_success(proxy, time.monotonic() - started)
+        if rate_limiter is not None:
+            rate_limiter.on_success(proxy)
+        return status
+    except TransportError as e:
+        # ReadTimeout, ConnectError va proksi ulanishni uzgandagi RemoteProtocolError/ReadError
         checker_logger.error(f"Username {username}ni tekshirishda tarmoq xatosi: {e}")
+        _report_failure(proxy_handler, proxy, type(e).__name__)
         raise
     except HTTPStatusError as e:
+        _report_failure(proxy_handler, proxy, f"http_{e.response.status_code}")
         if e.response.status_code == 429:
+            THROTTLED.inc()
             checker_logger.warning(f"Username {username} uchun 'Too Many Requests' (429) xatosi.")
+            if rate_limiter is not None:
+                rate_limiter.on_throttled(proxy, parse_retry_after(e.response.headers.get("Retry-After")))
             raise
         else:
             checker_logger.error(f"Username {username} uchun HTTP status xatosi: {e}")
             return None
     except Exception as e:
         checker_logger.critical(f"Kutilmagan xato yuz berdi: {e}")
+        _report_failure(proxy_handler, proxy, type(e).__name__)
         raise
+    finally:
+        REQUEST_SECONDS.labels(proxy_label(proxy)).observe(time.monotonic() - started)
+
+def _report_failure(proxy_handler: Optional[ProxyHandler], proxy: str, error_kind: str):
+    # Xato aynan shu so'rovni bajargan proksiga yoziladi
+    if proxy_handler is not None:
+        proxy_handler.report_failure(proxy, error_kind)
+
+_exponential_wait = wait_exponential(multiplier=1, min=2, max=10)
+
+def _wait_retry_after(retry_state) -> float:
+    # 429 javobidagi Retry-After eksponensial kutishdan uzunroq bo'lsa, o'shancha kutiladi
+    wait = _exponential_wait(retry_state)
+    exception = retry_state.outcome.exception() if retry_state.outcome else None
+    if isinstance(exception, HTTPStatusError) and exception.response.status_code == 429:
+        retry_after = parse_retry_after(exception.response.headers.get("Retry-After"))
+        if retry_after:
+            wait = max(wait, min(retry_after, 60))
+    return wait
 
-@retry(
-    stop=stop_after_attempt(3),
-    wait=wait_exponential(multiplier=1, min=2, max=10),
-    retry=retry_if_exception_type((ReadTimeout, ConnectError, HTTPStatusError)),
-    before_sleep=before_sleep_log(checker_logger, logging.WARNING)
-)
-async def check_username_with_retries(username: str, proxy: str) -> str:
-    return await check_username(username, proxy)
+async def check_username_with_retries(username: str, proxy: str, client_pool: Optional[ClientPool] = None,
+                                      classifier: Optional[MarkerClassifier] = None,
+                                      proxy_handler: Optional[ProxyHandler] = None,
+                                      rate_limiter: Optional[AdaptiveRateLimiter] = None) -> str:
+    def should_retry(exception: BaseException) -> bool:
+        # Ishlaydigan proksi qolmagan bo'lsa, qayta urinish befoyda
+        if proxy_handler is not None and not proxy_handler.has_usable_proxies():
+            return False
+        return isinstance(exception, (TransportError, HTTPStatusError))
 
+    retrying = AsyncRetrying(
+        stop=stop_after_attempt(3),
+        wait=_wait_retry_after,
+        retry=retry_if_exception(should_retry),
+        before_sleep=before_sleep_log(checker_logger, logging.WARNING)
+    )
+    async for attempt in retrying:
+        with attempt:
+            ATTEMPTS.labels(str(attempt.retry_state.attempt_number)).inc()
+            if attempt.retry_state.attempt_number > 1 and proxy_handler is not None:
+                # Qayta urinish boshqa (sog'lomroq) proksi orqali bajariladi
+                proxy = proxy_handler.get_random_proxy() or proxy
+            return await check_username(username, proxy, client_pool, classifier,
+                                        proxy_handler=proxy_handler, rate_limiter=rate_limiter)
@@ -0,0 +1,122 @@
+# scripts/username_ingest.py
+
+import heapq
+import logging
+import os
+import shutil
+import tempfile
+from typing import Iterable, Iterator, List, Optional
+
+from scripts.username_rules import clean_username
+from scripts.username_source import write_compiled
+
+MAX_OPEN_RUNS = 128
+
+
+class IngestStats:
+    def __init__(self):
+        self.read = 0
+        self.invalid = 0
+        self.duplicates = 0
+        self.written = 0
+
+    def as_dict(self):
+        return {"read": self.read, "invalid": self.invalid, "duplicates": self.duplicates, "written": self.written}
+
+
+def _read_lines(path: str) -> Iterator[str]:
+    with open(path, 'r', encoding='utf-8', errors='replace') as f:
+        yield from f
+
+
+def _write_run(names: List[str], directory: str) -> str:
+    fd, path = tempfile.mkstemp(prefix="run-", suffix=".txt", dir=directory)
+    with os.fdopen(fd, 'w', encoding='ascii') as f:
+        f.write("\n".join(names))
+        f.write("\n")
+    return path
+
+
+def _iter_run(path: str) -> Iterator[str]:
+    with open(path, 'r', encoding='ascii') as f:
+        for line in f:
+            yield line[:-1]
+
+
+def _unique(names: Iterable[str], stats: IngestStats) -> Iterator[str]:
+    # Tartiblangan oqimdagi takrorlarni tashlab yuborish
+    previous = None
+    for name in names:
+        if name == previous:
+            stats.duplicates += 1
+            continue
+        previous = name
+        yield name
+
+
+def _merge(paths: List[str], directory: str, stats: IngestStats) -> List[str]:
+    # Ochiq fayllar soni cheklangan: runlar ko'p bo'lsa, bir necha bosqichda birlashtiriladi
+    while len(paths) > MAX_OPEN_RUNS:
+        merged = []
+        for i in range(0, len(paths), MAX_OPEN_RUNS):
+            group = paths[i:i + MAX_OPEN_RUNS]
+            fd, path = tempfile.mkstemp(prefix="merge-", suffix=".txt", dir=directory)
+            with os.fdopen(fd, 'w', encoding='ascii') as f:
+                for name in _unique(heapq.merge(*(_iter_run(p) for p in group)), stats):
+                    f.write(name + "\n")
+            for p in group:
+                os.remove(p)
+            merged.append(path)
+        paths = merged
+    return paths
+
+
+def ingest(inputs: List[str], output_path: str, chunk_size: int = 1_000_000,
+           temp_dir: Optional[str] = None, rejects_path: Optional[str] = None) -> IngestStats:
+    """
+    Bir yoki bir nechta matn ro'yxatini normallashtiradi (kichik harf), Instagram qoidalari bo'yicha tekshiradi,
+    takrorlarni tashqi saralash (external sort) bilan olib tashlaydi va .ulist faylga kompilyatsiya qiladi.
+    Xotirada bir vaqtda ko'pi bilan chunk_size ta username turadi.
+    """
+    stats = IngestStats()
+    work_dir = tempfile.mkdtemp(prefix="ingest-", dir=temp_dir or os.path.dirname(os.path.abspath(output_path)))
+    rejects = open(rejects_path, 'w', encoding='utf-8') if rejects_path else None
+    try:
+        runs: List[str] = []
+        chunk = set()
+        for path in inputs:
+            for line in _read_lines(path):
+                if not line.strip():
+                    continue
+                stats.read += 1
+                username = clean_username(line)
+                if username is None:
+                    stats.invalid += 1
+                    if rejects is not None:
+                        rejects.write(line if line.endswith("\n") else line + "\n")
+                    continue
+                if username in chunk:
+                    stats.duplicates += 1
+                    continue
+                chunk.add(username)
+                if len(chunk) >= chunk_size:
+                    runs.append(_write_run(sorted(chunk), work_dir))
+                    chunk = set()
+
+        if runs:
+            if chunk:
+                runs.append(_write_run(sorted(chunk), work_dir))
+            runs = _merge(runs, work_dir, stats)
+            names = heapq.merge(*(_iter_run(p) for p in runs))
+        else:
+            # Hammasi xotiraga sig'di: vaqtinchalik fayllarsiz
+            names = iter(sorted(chunk))
+        stats.written = write_compiled(output_path, _unique(names, stats), sorted_names=True)
+    finally:
+        if rejects is not None:
+            rejects.close()
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+    logging.info(f"Ingest yakunlandi: {stats.read} ta o'qildi, {stats.invalid} ta noto'g'ri, "
+                 f"{stats.duplicates} ta takror, {stats.written} ta yozildi -> {output_path}")
+    return stats
@@ -0,0 +1,25 @@
+# scripts/username_rules.py
+
+import re
+from typing import Optional
+
+MAX_USERNAME_LENGTH = 30
+USERNAME_ALPHABET = "abcdefghijklmnopqrstuvwxyz0123456789._"
+
+# Instagram qoidalari: 1-30 belgi, faqat kichik lotin harflari, raqamlar, nuqta va pastki chiziq;
+# nuqta bilan boshlanmaydi va tugamaydi, ketma-ket ikki nuqta bo'lmaydi
+USERNAME_RE = re.compile(r"(?!\.)(?!.*\.\.)[a-z0-9._]{1,30}(?<!\.)")
+
+
+def normalize_username(raw: str) -> str:
+    # Instagram username'lari katta-kichik harfni farqlamaydi
+    return raw.strip().lstrip("@").lower()
+
+
+def is_valid_username(username: str) -> bool:
+    return USERNAME_RE.fullmatch(username) is not None
+
+
+def clean_username(raw: str) -> Optional[str]:
+    username = normalize_username(raw)
+    return username if is_valid_username(username) else None
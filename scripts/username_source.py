@@ -0,0 +1,336 @@
+# scripts/username_source.py
+
+import bisect
+import hashlib
+import mmap
+import os
+import sqlite3
+import struct
+from typing import Iterable, Iterator, List, Optional, Sequence, Tuple
+
+from scripts.username_rules import MAX_USERNAME_LENGTH, is_valid_username, normalize_username
+
+FINGERPRINT_BYTES = 65536
+
+# Kompilyatsiya qilingan ro'yxat (.ulist): 32 baytli sarlavha, so'ng 32 baytli yozuvlar.
+# Har bir yozuv - NUL bilan to'ldirilgan ASCII username, shuning uchun i-chi username ofseti HEADER + i * 32
+ULIST_MAGIC = b"ULIST\x00\x00\x01"
+ULIST_HEADER = struct.Struct("<8sHHIQ8x")
+RECORD_SIZE = 32
+ULIST_VERSION = 1
+FLAG_SORTED = 1
+
+
+class FileUsernameSource:
+    """
+    Username fayli ustidan bayt ofsetlari bilan ishlaydigan manba.
+    Har bir username keyingi qator boshlanadigan ofset bilan qaytariladi,
+    shuning uchun resume faylni qayta o'qimasdan to'g'ridan-to'g'ri seek qiladi.
+    """
+    def __init__(self, path: str):
+        self.path = path
+
+    @property
+    def size(self) -> int:
+        return os.path.getsize(self.path)
+
+    def fingerprint(self) -> str:
+        # Fayl boshidagi qism xeshi: fayl oxiriga qator qo'shilsa ham ofset yaroqli qoladi
+        with open(self.path, 'rb') as f:
+            head = f.read(FINGERPRINT_BYTES)
+        return f"sha1:{hashlib.sha1(head).hexdigest()}"
+
+    def iterate(self, offset: int = 0, end: Optional[int] = None) -> Iterator[Tuple[int, str]]:
+        with open(self.path, 'rb') as f:
+            f.seek(offset)
+            for line in f:
+                if end is not None and offset >= end:
+                    break
+                offset += len(line)
+                yield offset, normalize_username(line.decode('utf-8', 'replace'))
+
+    def split(self, count: int) -> List[Tuple[int, int]]:
+        """
+        Faylni qator chegaralariga to'g'rilangan taxminan teng bayt oraliqlariga bo'ladi.
+        """
+        size = self.size
+        bounds = [0]
+        with open(self.path, 'rb') as f:
+            for i in range(1, count):
+                f.seek(max(size * i // count, bounds[-1]))
+                if f.tell() > 0:
+                    f.seek(f.tell() - 1)
+                    f.readline()
+                bounds.append(min(f.tell(), size))
+        bounds.append(size)
+        return [(start, end) for start, end in zip(bounds, bounds[1:]) if end > start]
+
+    def offset_after_lines(self, line_count: int) -> int:
+        # Eski (qator soni bo'yicha) metadata'dan bir martalik o'tish uchun
+        offset = 0
+        for offset, _ in self.iterate():
+            line_count -= 1
+            if line_count <= 0:
+                break
+        return offset
+
+
+class CompiledUsernameSource:
+    """
+    ingest bosqichi yaratgan .ulist fayli ustidagi manba. Fayl mmap qilinadi va yozuvlar
+    qat'iy uzunlikda bo'lgani uchun qatorlarni ajratish yoki tekshirish kerak emas.
+    FileUsernameSource bilan bir xil interfeys: ofsetlar bayt bo'yicha, resume va shard'lar o'zgarishsiz ishlaydi.
+    """
+    def __init__(self, path: str):
+        self.path = path
+        with open(path, 'rb') as f:
+            header = f.read(ULIST_HEADER.size)
+        if len(header) < ULIST_HEADER.size:
+            raise ValueError(f"Kompilyatsiya qilingan ro'yxat sarlavhasi to'liq emas: {path}")
+        magic, version, record_size, self.flags, self.count = ULIST_HEADER.unpack(header)
+        if magic != ULIST_MAGIC or version != ULIST_VERSION or record_size != RECORD_SIZE:
+            raise ValueError(f"Noma'lum ro'yxat formati: {path}")
+
+    @property
+    def size(self) -> int:
+        return ULIST_HEADER.size + self.count * RECORD_SIZE
+
+    def fingerprint(self) -> str:
+        with open(self.path, 'rb') as f:
+            head = f.read(FINGERPRINT_BYTES)
+        return f"ulist:{hashlib.sha1(head).hexdigest()}"
+
+    def _align(self, offset: int) -> int:
+        offset = max(offset, ULIST_HEADER.size)
+        return offset - (offset - ULIST_HEADER.size) % RECORD_SIZE
+
+    def iterate(self, offset: int = 0, end: Optional[int] = None) -> Iterator[Tuple[int, str]]:
+        end = self.size if end is None else min(end, self.size)
+        offset = self._align(offset)
+        if offset >= end:
+            return
+        with open(self.path, 'rb') as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            while offset < end:
+                record = mm[offset:offset + RECORD_SIZE]
+                offset += RECORD_SIZE
+                yield offset, record.rstrip(b"\x00").decode('ascii')
+
+    def split(self, count: int) -> List[Tuple[int, int]]:
+        size = self.size
+        bounds = [ULIST_HEADER.size] + [self._align(ULIST_HEADER.size + (size - ULIST_HEADER.size) * i // count)
+                                        for i in range(1, count)] + [size]
+        return [(start, end) for start, end in zip(bounds, bounds[1:]) if end > start]
+
+    def offset_after_lines(self, line_count: int) -> int:
+        return min(ULIST_HEADER.size + line_count * RECORD_SIZE, self.size)
+
+
+PATTERN_CHARSETS = {
+    "l": "abcdefghijklmnopqrstuvwxyz",
+    "d": "0123456789",
+    "s": "._",
+}
+PATTERN_CHARSETS["a"] = PATTERN_CHARSETS["l"] + PATTERN_CHARSETS["d"] + PATTERN_CHARSETS["s"]
+PRUNE_BATCH = 500
+
+
+def parse_pattern(pattern: str, words: Sequence[str] = ()) -> List[Sequence[str]]:
+    """
+    Shablonni pozitsiyalar ro'yxatiga aylantiradi: ?l harf, ?d raqam, ?s nuqta/pastki chiziq,
+    ?a ularning hammasi, ?w so'zlar ro'yxatidan bitta so'z; qolgan belgilar o'zgarmas.
+    """
+    tokens: List[Sequence[str]] = []
+    i = 0
+    while i < len(pattern):
+        char = pattern[i]
+        if char == "?" and i + 1 < len(pattern):
+            code = pattern[i + 1]
+            if code == "w":
+                tokens.append(words)
+            elif code in PATTERN_CHARSETS:
+                tokens.append(PATTERN_CHARSETS[code])
+            else:
+                raise ValueError(f"Noma'lum shablon belgisi: ?{code}")
+            i += 2
+        else:
+            tokens.append(char.lower())
+            i += 1
+    return tokens
+
+
+class PatternUsernameSource:
+    """
+    .patterns faylidagi shablonlardan nomzodlarni dangasa (lazy) yaratadigan manba.
+    Har bir nomzodning tartib raqami (pozitsiya) aralash asosli son sifatida hisoblanadi,
+    shuning uchun "ofset" - pozitsiya: resume va shard'lar fayl manbalari bilan bir xil ishlaydi.
+    Instagram qoidalariga mos kelmagan va bazada allaqachon bor nomzodlar tekshiruvchiga yetib bormaydi.
+    """
+    unit = "nomzod"
+
+    def __init__(self, path: str, db_path: Optional[str] = None, wordlist_path: Optional[str] = None):
+        self.path = path
+        self.db_path = db_path
+        self.wordlist_path = wordlist_path or os.getenv("PATTERN_WORDLIST_PATH")
+        self.words = self._load_words(self.wordlist_path)
+        with open(path, 'r', encoding='utf-8') as f:
+            self.pattern_lines = [line.strip() for line in f if line.strip() and not line.lstrip().startswith("#")]
+        self.patterns = [parse_pattern(line, self.words) for line in self.pattern_lines]
+        self.sizes = []
+        for tokens in self.patterns:
+            size = 1
+            for token in tokens:
+                size *= len(token)
+            self.sizes.append(size)
+        self.starts = [0]
+        for size in self.sizes:
+            self.starts.append(self.starts[-1] + size)
+        self.pruned_invalid = 0
+        self.pruned_existing = 0
+
+    @staticmethod
+    def _load_words(path: Optional[str]) -> List[str]:
+        if not path:
+            return []
+        words, seen = [], set()
+        with open(path, 'r', encoding='utf-8', errors='replace') as f:
+            for line in f:
+                word = normalize_username(line)
+                if word and word not in seen:
+                    seen.add(word)
+                    words.append(word)
+        return words
+
+    @property
+    def size(self) -> int:
+        return self.starts[-1]
+
+    def fingerprint(self) -> str:
+        digest = hashlib.sha1("\n".join(self.pattern_lines).encode())
+        digest.update("\n".join(self.words).encode())
+        return f"pattern:{digest.hexdigest()}"
+
+    def _walk(self, position: int, end: int) -> Iterator[Tuple[int, str]]:
+        index = bisect.bisect_right(self.starts, position) - 1
+        while position < end and index < len(self.patterns):
+            tokens = self.patterns[index]
+            stop = min(end, self.starts[index + 1])
+            if position >= stop:
+                index += 1
+                continue
+            # Boshlang'ich pozitsiyani raqamlarga ajratish, so'ng odometr kabi oshirib borish
+            local = position - self.starts[index]
+            digits = []
+            for token in reversed(tokens):
+                local, digit = divmod(local, len(token))
+                digits.append(digit)
+            digits.reverse()
+            parts = [token[digit] for token, digit in zip(tokens, digits)]
+            while position < stop:
+                yield position, "".join(parts)
+                position += 1
+                i = len(tokens) - 1
+                while i >= 0:
+                    digits[i] += 1
+                    if digits[i] < len(tokens[i]):
+                        parts[i] = tokens[i][digits[i]]
+                        break
+                    digits[i] = 0
+                    parts[i] = tokens[i][0]
+                    i -= 1
+            index += 1
+
+    def _existing(self, conn: Optional[sqlite3.Connection], names: List[str]) -> set:
+        if conn is None or not names:
+            return set()
+        placeholders = ",".join("?" * len(names))
+        return {row[0] for row in conn.execute(f"SELECT username FROM results WHERE username IN ({placeholders})", names)}
+
+    def iterate(self, offset: int = 0, end: Optional[int] = None) -> Iterator[Tuple[int, str]]:
+        end = self.size if end is None else min(end, self.size)
+        conn = None
+        if self.db_path and os.path.exists(self.db_path):
+            conn = sqlite3.connect(f"file:{self.db_path}?mode=ro", uri=True)
+        try:
+            batch: List[Tuple[int, str]] = []
+            for position, name in self._walk(offset, end):
+                if not is_valid_username(name):
+                    self.pruned_invalid += 1
+                    continue
+                batch.append((position, name))
+                if len(batch) >= PRUNE_BATCH:
+                    yield from self._flush(conn, batch)
+                    batch = []
+            yield from self._flush(conn, batch)
+        finally:
+            if conn is not None:
+                conn.close()
+
+    def _flush(self, conn, batch: List[Tuple[int, str]]) -> Iterator[Tuple[int, str]]:
+        # Bazadagi nomzodlar bitta IN so'rovi bilan (username indeksi orqali) chiqarib tashlanadi
+        existing = self._existing(conn, [name for _, name in batch])
+        self.pruned_existing += len(existing)
+        for position, name in batch:
+            if name not in existing:
+                yield position + 1, name
+
+    def split(self, count: int) -> List[Tuple[int, int]]:
+        size = self.size
+        bounds = [size * i // count for i in range(count + 1)]
+        return [(start, end) for start, end in zip(bounds, bounds[1:]) if end > start]
+
+    def offset_after_lines(self, line_count: int) -> int:
+        return min(line_count, self.size)
+
+
+def write_compiled(path: str, usernames: Iterable[str], sorted_names: bool = False) -> int:
+    """
+    Username'larni .ulist formatida yozadi (avval vaqtinchalik faylga, so'ng atomik almashtirish).
+    Username'lar oldindan normallashtirilgan va tekshirilgan bo'lishi kerak.
+    """
+    tmp_path = f"{path}.tmp"
+    count = 0
+    with open(tmp_path, 'wb') as f:
+        f.write(b"\x00" * ULIST_HEADER.size)
+        buffer = []
+        for username in usernames:
+            encoded = username.encode('ascii')
+            if len(encoded) > MAX_USERNAME_LENGTH:
+                raise ValueError(f"Username juda uzun: {username}")
+            buffer.append(encoded.ljust(RECORD_SIZE, b"\x00"))
+            if len(buffer) >= 65536:
+                f.write(b"".join(buffer))
+                count += len(buffer)
+                buffer = []
+        f.write(b"".join(buffer))
+        count += len(buffer)
+        f.seek(0)
+        f.write(ULIST_HEADER.pack(ULIST_MAGIC, ULIST_VERSION, RECORD_SIZE, FLAG_SORTED if sorted_names else 0, count))
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_path, path)
+    return count
+
+
+def iterate_spans(source, offset: int = 0, end: Optional[int] = None) -> Iterator[Tuple[int, int, str]]:
+    """
+    (boshlanish ofseti, keyingi ofset, username) uchliklarini qaytaradi: xato bo'lgan element
+    qayerdan qayta o'qilishi kerakligi checkpoint uchun shu boshlanish ofsetidan olinadi.
+    """
+    start = offset
+    for next_offset, username in source.iterate(offset, end):
+        yield start, next_offset, username
+        start = next_offset
+
+
+def open_username_source(path: str, db_path: Optional[str] = None):
+    # Fayl turi aniqlanadi: .patterns - shablon generatori, .ulist sarlavhali - mmap manba, aks holda matn fayli
+    if path.endswith(".patterns") and os.path.exists(path):
+        return PatternUsernameSource(path, db_path=db_path)
+    try:
+        with open(path, 'rb') as f:
+            magic = f.read(len(ULIST_MAGIC))
+    except FileNotFoundError:
+        return FileUsernameSource(path)
+    if magic == ULIST_MAGIC:
+        return CompiledUsernameSource(path)
+    return FileUsernameSource(path)
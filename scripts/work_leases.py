@@ -0,0 +1,386 @@
+# scripts/work_leases.py
+
+import logging
+import os
+import socket
+import sqlite3
+import threading
+import time
+from abc import ABC, abstractmethod
+from contextlib import closing
+from typing import Callable, Dict, List, Optional, Tuple
+
+PENDING = 'pending'
+LEASED = 'leased'
+DONE = 'done'
+# Ijara urinishlari max_attempts'ga yetgan oraliq: boshqa tugunga berilmaydi, --retry-failed bilan qaytariladi
+FAILED = 'failed'
+
+LEASE_SCHEMA = """
+CREATE TABLE IF NOT EXISTS lease_plan (
+    name TEXT PRIMARY KEY,
+    value TEXT
+);
+CREATE TABLE IF NOT EXISTS work_ranges (
+    range_id INTEGER PRIMARY KEY,
+    start INTEGER NOT NULL,
+    "end" INTEGER NOT NULL,
+    "offset" INTEGER NOT NULL,
+    status TEXT NOT NULL DEFAULT 'pending',
+    owner TEXT,
+    generation INTEGER NOT NULL DEFAULT 0,
+    lease_expires REAL NOT NULL DEFAULT 0,
+    attempts INTEGER NOT NULL DEFAULT 0,
+    checked INTEGER NOT NULL DEFAULT 0
+);
+CREATE INDEX IF NOT EXISTS idx_work_ranges_status ON work_ranges (status, lease_expires);
+CREATE TABLE IF NOT EXISTS lease_results (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    username TEXT NOT NULL,
+    status TEXT,
+    checked_at TEXT NOT NULL
+);
+"""
+
+
+def default_node_id() -> str:
+    return f"{socket.gethostname()}-{os.getpid()}"
+
+
+class Lease:
+    __slots__ = ('range_id', 'start', 'end', 'offset', 'owner', 'generation', 'expires')
+
+    def __init__(self, range_id: int, start: int, end: int, offset: int, owner: str, generation: int, expires: float):
+        self.range_id = range_id
+        self.start = start
+        self.end = end
+        self.offset = offset
+        self.owner = owner
+        self.generation = generation
+        self.expires = expires
+
+    def __repr__(self):
+        return f"Lease(range={self.range_id}, offset={self.offset}/{self.end}, owner={self.owner}, gen={self.generation})"
+
+
+class LeaseStore(ABC):
+    """
+    Bir nechta tugun (node) o'rtasida bo'lingan ish oraliqlari jadvali. Tugun oraliqni muddatli ijaraga (lease) oladi,
+    natijalar va erishilgan ofsetni heartbeat bilan birga yuboradi; muddati o'tgan ijara boshqa tugunga beriladi.
+    Har bir ijara generation raqami bilan himoyalangan: ijarani yo'qotgan tugunning kechikkan yozuvi rad etiladi.
+    """
+    @abstractmethod
+    def plan(self, fingerprint: str, ranges: List[Tuple[int, int]], replan: bool = False) -> bool:
+        """
+        Yangi reja yozadi va True qaytaradi; shu manba uchun reja allaqachon bo'lsa, o'zgartirmaydi.
+        replan=True bo'lsa, mavjud reja (holati va ijaralari bilan) tashlanib, ish boshidan boshlanadi.
+        """
+
+    @abstractmethod
+    def fingerprint(self) -> Optional[str]:
+        pass
+
+    @abstractmethod
+    def claim(self, owner: str, ttl: float, max_attempts: int = 0) -> Optional[Lease]:
+        """
+        Bo'sh yoki muddati o'tgan oraliqni ijaraga beradi. max_attempts > 0 bo'lsa, shuncha marta ijaraga berilib
+        tugallanmagan oraliq FAILED deb belgilanadi va boshqa berilmaydi (0 - cheklanmagan).
+        """
+
+    @abstractmethod
+    def report(self, lease: Lease, rows: List[Tuple[str, str, str]], offset: int, ttl: float,
+               checked: int = 0) -> bool:
+        """
+        Natijalarni yozadi (status None - xato bilan tugagan tekshiruv), ofsetni siljitadi va ijarani uzaytiradi
+        (bitta tranzaksiyada).
+        Ijara boshqa tugunga o'tgan bo'lsa, hech narsa yozilmaydi va False qaytadi.
+        """
+
+    @abstractmethod
+    def complete(self, lease: Lease) -> bool:
+        pass
+
+    @abstractmethod
+    def release(self, lease: Lease, count_attempt: bool = True) -> bool:
+        """
+        Oraliq tugallanmay qaytariladi (xato yoki to'xtatish): keyingi tugun saqlangan ofsetdan davom etadi.
+        count_attempt=False (tugunni to'xtatish) bo'lsa, bu ijara urinishlar soniga kirmaydi.
+        """
+
+    @abstractmethod
+    def reset_failed(self) -> int:
+        # FAILED oraliqlar urinishlar hisobi nolga tushirilib qayta navbatga qo'yiladi; qaytarilganlar soni
+        pass
+
+    @abstractmethod
+    def fetch_results(self, limit: int = 1000) -> List[Tuple[int, str, str, str]]:
+        pass
+
+    @abstractmethod
+    def ack_results(self, last_id: int):
+        pass
+
+    @abstractmethod
+    def summary(self) -> Dict[str, int]:
+        pass
+
+
+class MemoryLeaseStore(LeaseStore):
+    """
+    Bitta jarayon ichidagi o'rinbosar: sinovlar va tugunlarni bitta mashinada sinab ko'rish uchun.
+    """
+    def __init__(self, clock: Callable[[], float] = time.time):
+        self.clock = clock
+        self._lock = threading.Lock()
+        self._fingerprint: Optional[str] = None
+        self._ranges: Dict[int, dict] = {}
+        self._results: List[Tuple[int, str, str, str]] = []
+        self._next_result_id = 1
+
+    def plan(self, fingerprint, ranges, replan=False):
+        with self._lock:
+            if self._fingerprint == fingerprint and self._ranges and not replan:
+                return False
+            self._fingerprint = fingerprint
+            self._ranges = {i: {"start": s, "end": e, "offset": s, "status": PENDING, "owner": None,
+                                "generation": 0, "lease_expires": 0.0, "attempts": 0, "checked": 0}
+                            for i, (s, e) in enumerate(ranges)}
+            return True
+
+    def fingerprint(self):
+        return self._fingerprint
+
+    def claim(self, owner, ttl, max_attempts=0):
+        with self._lock:
+            now = self.clock()
+            for range_id, r in sorted(self._ranges.items()):
+                if r["status"] == PENDING or (r["status"] == LEASED and r["lease_expires"] < now):
+                    if max_attempts and r["attempts"] >= max_attempts:
+                        r.update(status=FAILED, owner=None, lease_expires=0.0)
+                        continue
+                    r.update(status=LEASED, owner=owner, generation=r["generation"] + 1,
+                             lease_expires=now + ttl, attempts=r["attempts"] + 1)
+                    return Lease(range_id, r["start"], r["end"], r["offset"], owner, r["generation"], now + ttl)
+            return None
+
+    def _owned(self, lease: Lease) -> Optional[dict]:
+        r = self._ranges.get(lease.range_id)
+        if r is None or r["status"] != LEASED or r["owner"] != lease.owner or r["generation"] != lease.generation:
+            return None
+        return r
+
+    def report(self, lease, rows, offset, ttl, checked=0):
+        with self._lock:
+            r = self._owned(lease)
+            if r is None:
+                return False
+            for username, status, checked_at in rows:
+                self._results.append((self._next_result_id, username, status, checked_at))
+                self._next_result_id += 1
+            r["offset"] = max(r["offset"], offset)
+            r["checked"] += checked
+            r["lease_expires"] = lease.expires = self.clock() + ttl
+            lease.offset = r["offset"]
+            return True
+
+    def complete(self, lease):
+        with self._lock:
+            r = self._owned(lease)
+            if r is None:
+                return False
+            r.update(status=DONE, offset=r["end"], owner=None)
+            return True
+
+    def release(self, lease, count_attempt=True):
+        with self._lock:
+            r = self._owned(lease)
+            if r is None:
+                return False
+            r.update(status=PENDING, owner=None, lease_expires=0.0,
+                     attempts=r["attempts"] if count_attempt else r["attempts"] - 1)
+            return True
+
+    def reset_failed(self):
+        with self._lock:
+            failed = [r for r in self._ranges.values() if r["status"] == FAILED]
+            for r in failed:
+                r.update(status=PENDING, attempts=0)
+            return len(failed)
+
+    def fetch_results(self, limit=1000):
+        with self._lock:
+            return self._results[:limit]
+
+    def ack_results(self, last_id):
+        with self._lock:
+            self._results = [row for row in self._results if row[0] > last_id]
+
+    def summary(self):
+        with self._lock:
+            now = self.clock()
+            counts = {PENDING: 0, LEASED: 0, DONE: 0, FAILED: 0, "expired": 0, "checked": 0, "results_pending": len(self._results)}
+            for r in self._ranges.values():
+                counts[r["status"]] += 1
+                counts["checked"] += r["checked"]
+                if r["status"] == LEASED and r["lease_expires"] < now:
+                    counts["expired"] += 1
+            return counts
+
+
+class SQLiteLeaseStore(LeaseStore):
+    """
+    Umumiy papkadagi (NFS/SMB) SQLite fayli. Tarmoq fayl tizimida WAL ishlamaydi, shuning uchun
+    odatiy rollback journal va qisqa BEGIN IMMEDIATE tranzaksiyalari ishlatiladi.
+    Ijara muddatlari tugunlarning soatiga tayanadi: soatlar NTP bilan sinxron bo'lishi kerak.
+    """
+    def __init__(self, path: str, timeout: float = 30, clock: Callable[[], float] = time.time):
+        self.path = path
+        self.timeout = timeout
+        self.clock = clock
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        with closing(self._connect()) as conn:
+            conn.executescript(LEASE_SCHEMA)
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = sqlite3.connect(self.path, timeout=self.timeout, isolation_level=None)
+        conn.execute("PRAGMA journal_mode=DELETE")
+        conn.execute(f"PRAGMA busy_timeout={int(self.timeout * 1000)}")
+        return conn
+
+    def _transaction(self, func):
+        # Har bir amal alohida qisqa ulanish va yozish qulfi bilan: uzoq ochiq ulanishlar umumiy papkada qulfni ushlab qoladi
+        with closing(self._connect()) as conn:
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                result = func(conn)
+            except BaseException:
+                conn.execute("ROLLBACK")
+                raise
+            conn.execute("COMMIT")
+            return result
+
+    def plan(self, fingerprint, ranges, replan=False):
+        def apply(conn):
+            row = conn.execute("SELECT value FROM lease_plan WHERE name = 'fingerprint'").fetchone()
+            if row is not None and row[0] == fingerprint and not replan:
+                return False
+            conn.execute("DELETE FROM work_ranges")
+            conn.executemany('INSERT INTO work_ranges (range_id, start, "end", "offset") VALUES (?, ?, ?, ?)',
+                             [(i, s, e, s) for i, (s, e) in enumerate(ranges)])
+            conn.execute("INSERT OR REPLACE INTO lease_plan (name, value) VALUES ('fingerprint', ?)", (fingerprint,))
+            return True
+        return self._transaction(apply)
+
+    def fingerprint(self):
+        with closing(self._connect()) as conn:
+            row = conn.execute("SELECT value FROM lease_plan WHERE name = 'fingerprint'").fetchone()
+        return row[0] if row else None
+
+    def claim(self, owner, ttl, max_attempts=0):
+        def apply(conn):
+            now = self.clock()
+            if max_attempts:
+                conn.execute("UPDATE work_ranges SET status = 'failed', owner = NULL, lease_expires = 0 "
+                             "WHERE attempts >= ? AND (status = 'pending' OR (status = 'leased' AND lease_expires < ?))",
+                             (max_attempts, now))
+            row = conn.execute(
+                'SELECT range_id, start, "end", "offset", generation FROM work_ranges '
+                "WHERE status = 'pending' OR (status = 'leased' AND lease_expires < ?) ORDER BY range_id LIMIT 1",
+                (now,)
+            ).fetchone()
+            if row is None:
+                return None
+            range_id, start, end, offset, generation = row
+            conn.execute("UPDATE work_ranges SET status = 'leased', owner = ?, generation = ?, lease_expires = ?, "
+                         "attempts = attempts + 1 WHERE range_id = ?", (owner, generation + 1, now + ttl, range_id))
+            return Lease(range_id, start, end, offset, owner, generation + 1, now + ttl)
+        return self._transaction(apply)
+
+    @staticmethod
+    def _owned(conn, lease: Lease) -> bool:
+        row = conn.execute("SELECT 1 FROM work_ranges WHERE range_id = ? AND status = 'leased' "
+                           "AND owner = ? AND generation = ?", (lease.range_id, lease.owner, lease.generation)).fetchone()
+        return row is not None
+
+    def report(self, lease, rows, offset, ttl, checked=0):
+        def apply(conn):
+            if not self._owned(conn, lease):
+                return False
+            conn.executemany("INSERT INTO lease_results (username, status, checked_at) VALUES (?, ?, ?)", rows)
+            expires = self.clock() + ttl
+            conn.execute('UPDATE work_ranges SET "offset" = MAX("offset", ?), checked = checked + ?, lease_expires = ? '
+                         "WHERE range_id = ?", (offset, checked, expires, lease.range_id))
+            lease.expires = expires
+            lease.offset = max(lease.offset, offset)
+            return True
+        return self._transaction(apply)
+
+    def complete(self, lease):
+        def apply(conn):
+            if not self._owned(conn, lease):
+                return False
+            conn.execute("UPDATE work_ranges SET status = 'done', \"offset\" = \"end\", owner = NULL WHERE range_id = ?",
+                         (lease.range_id,))
+            return True
+        return self._transaction(apply)
+
+    def release(self, lease, count_attempt=True):
+        def apply(conn):
+            if not self._owned(conn, lease):
+                return False
+            conn.execute("UPDATE work_ranges SET status = 'pending', owner = NULL, lease_expires = 0, "
+                         "attempts = attempts - ? WHERE range_id = ?", (0 if count_attempt else 1, lease.range_id))
+            return True
+        return self._transaction(apply)
+
+    def reset_failed(self):
+        return self._transaction(lambda conn: conn.execute(
+            "UPDATE work_ranges SET status = 'pending', attempts = 0 WHERE status = 'failed'").rowcount)
+
+    def fetch_results(self, limit=1000):
+        with closing(self._connect()) as conn:
+            return conn.execute("SELECT id, username, status, checked_at FROM lease_results ORDER BY id LIMIT ?",
+                                (limit,)).fetchall()
+
+    def ack_results(self, last_id):
+        self._transaction(lambda conn: conn.execute("DELETE FROM lease_results WHERE id <= ?", (last_id,)))
+
+    def summary(self):
+        now = self.clock()
+        with closing(self._connect()) as conn:
+            counts = {PENDING: 0, LEASED: 0, DONE: 0, FAILED: 0}
+            counts.update(conn.execute("SELECT status, COUNT(*) FROM work_ranges GROUP BY status").fetchall())
+            counts["expired"] = conn.execute("SELECT COUNT(*) FROM work_ranges WHERE status = 'leased' "
+                                             "AND lease_expires < ?", (now,)).fetchone()[0]
+            counts["checked"] = conn.execute("SELECT COALESCE(SUM(checked), 0) FROM work_ranges").fetchone()[0]
+            counts["results_pending"] = conn.execute("SELECT COUNT(*) FROM lease_results").fetchone()[0]
+        return counts
+
+
+_memory_stores: Dict[str, MemoryLeaseStore] = {}
+
+
+def _memory_store(name: str) -> MemoryLeaseStore:
+    # Bir xil nomli "memory://" manzillari bitta jarayon ichida bitta omborni ko'radi
+    return _memory_stores.setdefault(name, MemoryLeaseStore())
+
+
+# Yangi backend (masalan, tarmoq xizmati) shu yerga sxema nomi bilan qo'shiladi
+LEASE_BACKENDS: Dict[str, Callable[[str], LeaseStore]] = {
+    "sqlite": SQLiteLeaseStore,
+    "memory": _memory_store,
+}
+
+
+def open_lease_store(url: str) -> LeaseStore:
+    """
+    "sqlite:///mnt/shared/work.db", "memory://" yoki oddiy fayl yo'li (SQLite deb hisoblanadi).
+    """
+    scheme, sep, rest = url.partition("://")
+    if not sep:
+        scheme, rest = "sqlite", url
+    factory = LEASE_BACKENDS.get(scheme)
+    if factory is None:
+        raise ValueError(f"Noma'lum lease backend: {scheme}")
+    logging.debug(f"Lease backend: {scheme} ({rest})")
+    return factory(rest)
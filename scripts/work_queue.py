@@ -0,0 +1,99 @@
+# scripts/work_queue.py
+
+import asyncio
+import logging
+import time
+from typing import Any, Awaitable, Callable, Dict, Optional
+
+from scripts.metrics import QUEUE_WAIT_SECONDS
+
+queue_logger = logging.getLogger(__name__)
+
+
+class WorkQueue:
+    """
+    Cheklangan asyncio.Queue orqali ishlaydigan producer/consumer mexanizmi.
+    N ta worker doimiy ravishda navbatdan element olib, handler'ni chaqiradi,
+    shuning uchun bir paytda N ta so'rov doim bajarilib turadi (chunk to'siqlari yo'q).
+    """
+    def __init__(self, worker_count: int = 50, queue_size: Optional[int] = None):
+        self.worker_count = max(1, worker_count)
+        self.queue_size = queue_size or self.worker_count * 2
+        self._stopped = False
+        # Tugallangan elementlar ketma-ketligini kuzatish (resume uchun)
+        self._next_seq = 0
+        self._done_out_of_order: Dict[int, Any] = {}
+        self.watermark: Any = None
+        self.completed = 0
+
+    def stop(self):
+        # Yangi elementlar olinmaydi, bajarilayotganlari yakunlanadi
+        self._stopped = True
+
+    @property
+    def stopped(self) -> bool:
+        return self._stopped
+
+    def _mark_done(self, seq: int, item: Any):
+        self.completed += 1
+        self._done_out_of_order[seq] = item
+        while self._next_seq in self._done_out_of_order:
+            self.watermark = self._done_out_of_order.pop(self._next_seq)
+            self._next_seq += 1
+
+    async def _produce(self, source, queue: asyncio.Queue):
+        seq = 0
+        try:
+            if hasattr(source, '__aiter__'):
+                async for item in source:
+                    if self._stopped:
+                        break
+                    await queue.put((seq, item, time.monotonic()))
+                    seq += 1
+            else:
+                for item in source:
+                    if self._stopped:
+                        break
+                    await queue.put((seq, item, time.monotonic()))
+                    seq += 1
+        finally:
+            for _ in range(self.worker_count):
+                await queue.put(None)
+
+    async def _work(self, queue: asyncio.Queue,
+                    handler: Callable[[Any], Awaitable[Any]],
+                    on_result: Callable[[Any, Any], None]):
+        while True:
+            entry = await queue.get()
+            if entry is None:
+                return
+            seq, item, enqueued_at = entry
+            if self._stopped:
+                # To'xtatilgandan keyin navbatdagi elementlar bajarilmaydi
+                continue
+            QUEUE_WAIT_SECONDS.observe(time.monotonic() - enqueued_at)
+            try:
+                result = await handler(item)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                result = e
+            try:
+                on_result(item, result)
+            except Exception as e:
+                queue_logger.error(f"Natijani qayta ishlashda xato: {e}")
+            self._mark_done(seq, item)
+
+    async def run(self, source,
+                  handler: Callable[[Any], Awaitable[Any]],
+                  on_result: Callable[[Any, Any], None]):
+        queue: asyncio.Queue = asyncio.Queue(maxsize=self.queue_size)
+        workers = [asyncio.create_task(self._work(queue, handler, on_result))
+                   for _ in range(self.worker_count)]
+        try:
+            await self._produce(source, queue)
+            await asyncio.gather(*workers)
+        finally:
+            for worker in workers:
+                worker.cancel()
+            await asyncio.gather(*workers, return_exceptions=True)
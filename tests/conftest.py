@@ -0,0 +1,29 @@
+from contextlib import asynccontextmanager
+
+import httpx
+import pytest
+
+
+class FakePool:
+    """
+    ClientPool o'rnini bosadi: barcha so'rovlar handler'ga (httpx.MockTransport) yo'naltiriladi,
+    so'ralgan username'lar esa requests ro'yxatiga yoziladi. handler oddiy yoki async funksiya bo'lishi mumkin.
+    """
+    def __init__(self, handler):
+        self.requests = []
+        self._handler = handler
+        self.client = httpx.AsyncClient(transport=httpx.MockTransport(self._handle))
+
+    def _handle(self, request):
+        self.requests.append(request.url.path.strip("/"))
+        return self._handler(request)
+
+    @asynccontextmanager
+    async def borrow(self, proxy):
+        yield self.client
+
+
+@pytest.fixture
+def fake_pool():
+    # Fabrika: har bir test o'z handler'i bilan kerakli miqdorda pool yaratadi
+    return FakePool
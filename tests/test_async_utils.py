@@ -0,0 +1,57 @@
+import os
+import sys
+import time
+import asyncio
+import logging
+import pytest
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from scripts.async_utils import LoopWatchdog, async_safe_execute, run_blocking
+
+
+def _slow_helper():
+    time.sleep(0.4)
+
+
+@pytest.mark.asyncio
+async def test_watchdog_logs_stack_of_blocking_call(caplog):
+    watchdog = LoopWatchdog(threshold=0.1, interval=0.02)
+    watchdog.start()
+    with caplog.at_level(logging.WARNING, logger="scripts.async_utils"):
+        await asyncio.sleep(0.05)
+        _slow_helper()
+        await asyncio.sleep(0.05)
+    await watchdog.stop()
+    assert watchdog.stalls == 1
+    assert "_slow_helper" in caplog.text
+
+
+@pytest.mark.asyncio
+async def test_blocking_work_runs_off_the_loop():
+    ticks = 0
+
+    async def ticker():
+        nonlocal ticks
+        while True:
+            ticks += 1
+            await asyncio.sleep(0.01)
+
+    task = asyncio.create_task(ticker())
+    await run_blocking(time.sleep, 0.2)
+    task.cancel()
+    assert ticks >= 5
+
+
+@pytest.mark.asyncio
+async def test_async_safe_execute_retries():
+    calls = []
+
+    def flaky():
+        calls.append(1)
+        if len(calls) < 3:
+            raise OSError("vaqtincha xato")
+        return "ok"
+
+    assert await async_safe_execute(flaky, retries=3, delay=0) == "ok"
+    assert len(calls) == 3
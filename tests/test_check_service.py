@@ -0,0 +1,113 @@
+import os
+import sys
+import asyncio
+from datetime import timedelta
+
+import httpx
+import pytest
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from scripts.check_pipeline import CheckPipeline
+from scripts.check_service import CheckService
+from scripts.db_manager import DBManager, ResultWriter
+from scripts.local_http import LocalHTTPServer
+from scripts.metadata_manager import MetadataManager
+from scripts.proxy_handler import ProxyHandler
+from scripts.rate_limiter import AdaptiveRateLimiter
+from scripts.recheck_scheduler import RecheckScheduler
+from scripts.response_classifier import MarkerClassifier
+
+
+def _instagram(request):
+    # "free" bilan boshlanadigan username'lar bo'sh, qolganlari band
+    if request.url.path.strip("/").startswith("free"):
+        return httpx.Response(404, content=b"Page Not Found")
+    return httpx.Response(200, content=b"<body>Profile</body>")
+
+
+def _make_service(tmp_path, fake_pool, **kwargs):
+    db_manager = DBManager(str(tmp_path / "results.db"))
+    writer = ResultWriter(db_manager, batch_size=10, flush_interval=0.05)
+    proxies_path = tmp_path / "proxies.txt"
+    proxies_path.write_text("10.0.0.1:8080\n10.0.0.2:8080\n")
+    pool = fake_pool(_instagram)
+    pipeline = CheckPipeline(ProxyHandler(str(proxies_path), cooldown_time=0), pool, MarkerClassifier(),
+                             AdaptiveRateLimiter(global_rate=1000, proxy_rate=1000,
+                                                 max_global_rate=1000, max_proxy_rate=1000),
+                             worker_count=4, stop_on_exhausted=False)
+    ttl = timedelta(hours=1)
+    service = CheckService(pipeline, writer, db_manager.db_path,
+                           recheck_scheduler=RecheckScheduler({'available': ttl, 'taken': ttl}),
+                           state=MetadataManager(str(tmp_path / "service_state.json")),
+                           poll_interval=0.05, **kwargs)
+    return service, db_manager, writer, pool
+
+
+@pytest.mark.asyncio
+async def test_api_checks_new_names_and_answers_known_ones_from_db(tmp_path, fake_pool):
+    service, db_manager, writer, pool = _make_service(tmp_path, fake_pool)
+    server = LocalHTTPServer("127.0.0.1", 0)
+    service.attach(server)
+    await server.start()
+    writer.start()
+    stop_event = asyncio.Event()
+    runner = asyncio.create_task(service.run(stop_event))
+    base = f"http://127.0.0.1:{server.port}"
+    try:
+        async with httpx.AsyncClient() as client:
+            response = await client.post(f"{base}/check", json={"usernames": ["free_one", "@Taken.One", "bad..name"],
+                                                                "wait": 5})
+            assert response.status_code == 200
+            body = response.json()
+            assert body["results"] == {"free_one": {"status": "available"}, "taken.one": {"status": "taken"}}
+            assert body["invalid"] == ["bad..name"]
+
+            # Natija bazaga yozilgach, takroriy so'rov tarmoqqa chiqmasdan bazadan javob oladi
+            await writer.sync()
+            response = await client.post(f"{base}/check", json={"usernames": ["free_one"], "wait": 5})
+            assert response.json()["results"]["free_one"]["status"] == "available"
+            assert response.json()["queued"] == []
+            assert pool.requests.count("free_one") == 1
+
+            response = await client.get(f"{base}/results", params={"username": "taken.one,nobody"})
+            assert response.json()["results"]["taken.one"]["status"] == "taken"
+            assert response.json()["unknown"] == ["nobody"]
+            status = (await client.get(f"{base}/status")).json()
+            assert status["checked"] == 2 and status["cached"] == 1
+    finally:
+        stop_event.set()
+        await runner
+        await server.close()
+        await writer.close()
+        db_manager.close()
+
+
+@pytest.mark.asyncio
+async def test_tails_file_and_drop_dir(tmp_path, fake_pool):
+    tail_path = tmp_path / "usernames.txt"
+    tail_path.write_text("old_name\n")
+    drop_dir = tmp_path / "drop"
+    service, db_manager, writer, pool = _make_service(tmp_path, fake_pool, tail_path=str(tail_path), drop_dir=str(drop_dir))
+    writer.start()
+    stop_event = asyncio.Event()
+    runner = asyncio.create_task(service.run(stop_event))
+    try:
+        await asyncio.sleep(0.1)
+        with open(tail_path, "a") as f:
+            f.write("free_tail\npartial")
+        (drop_dir / "batch.txt").write_text("dropped_one\nfree_tail\n")
+        for _ in range(100):
+            if service.counters["checked"] >= 2 and not (drop_dir / "batch.txt").exists():
+                break
+            await asyncio.sleep(0.05)
+    finally:
+        stop_event.set()
+        await runner
+        await writer.close()
+        db_manager.close()
+
+    # Mavjud qator va tugallanmagan oxirgi qator tekshirilmaydi, takror username bir marta tekshiriladi
+    assert sorted(pool.requests) == ["dropped_one", "free_tail"]
+    assert service.state.get_metadata("tail_offset") == len("old_name\nfree_tail\n")
+    assert os.listdir(drop_dir / "processed")[0].endswith("batch.txt")
@@ -0,0 +1,85 @@
+import os
+import sys
+import httpx
+import pytest
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from scripts.response_classifier import MarkerClassifier
+from scripts.username_checker import check_username
+
+
+def test_marker_split_across_chunks_is_found():
+    scanner = MarkerClassifier().scanner()
+    assert scanner.feed(b"<title>Page Not") is None
+    assert scanner.feed(b" Found</title>") == 'available'
+
+
+def test_max_scan_bytes_falls_back_to_default_status():
+    scanner = MarkerClassifier(max_scan_bytes=10).scanner()
+    assert scanner.feed(b"x" * 6) is None
+    assert scanner.feed(b"x" * 6) == 'taken'
+
+
+@pytest.mark.asyncio
+async def test_check_username_stops_reading_after_marker(fake_pool):
+    body = b"<html><title>Page Not Found</title>" + b"x" * 500_000
+
+    async def stream():
+        for i in range(0, len(body), 4096):
+            yield body[i:i + 4096]
+
+    def handler(request):
+        return httpx.Response(200, headers={"Content-Length": str(len(body))}, content=stream())
+
+    classifier = MarkerClassifier()
+    status = await check_username("someone", "127.0.0.1:8080", fake_pool(handler), classifier)
+
+    assert status == 'available'
+    assert classifier.stats.early_exits == 1
+    assert classifier.stats.bytes_saved > 400_000
+
+
+@pytest.mark.asyncio
+async def test_check_username_classifies_404_from_status_code(fake_pool):
+    classifier = MarkerClassifier()
+    pool = fake_pool(lambda request: httpx.Response(404, content=b"not found"))
+    assert await check_username("someone", "127.0.0.1:8080", pool, classifier) == 'available'
+
+    pool = fake_pool(lambda request: httpx.Response(200, content=b"<body>Profile</body>"))
+    assert await check_username("someone", "127.0.0.1:8080", pool, classifier) == 'taken'
+
+
+@pytest.mark.asyncio
+async def test_default_classifier_stops_at_taken_marker_and_404_can_be_disabled(fake_pool):
+    body = (b'<html><head><meta property="og:type" content="profile" /><title>Instagram</title></head>'
+            + b"x" * 500_000)
+
+    async def stream():
+        for i in range(0, len(body), 4096):
+            yield body[i:i + 4096]
+
+    classifier = MarkerClassifier()
+    pool = fake_pool(lambda request: httpx.Response(200, headers={"Content-Length": str(len(body))}, content=stream()))
+    assert await check_username("someone", "127.0.0.1:8080", pool, classifier) == 'taken'
+    assert classifier.stats.bytes_saved > 400_000
+
+    # 404 kodlari o'chirilsa, avvalgi xatti-harakat: HTTP xato, natija yo'q (None)
+    legacy = MarkerClassifier(available_status_codes=())
+    pool = fake_pool(lambda request: httpx.Response(404, content=b"not found"))
+    assert await check_username("someone", "127.0.0.1:8080", pool, legacy) is None
+
+
+@pytest.mark.asyncio
+async def test_429_retry_after_blocks_proxy_and_lowers_rate(fake_pool):
+    from scripts.rate_limiter import AdaptiveRateLimiter
+
+    limiter = AdaptiveRateLimiter(global_rate=8, proxy_rate=2)
+    pool = fake_pool(lambda request: httpx.Response(429, headers={"Retry-After": "30"}))
+
+    with pytest.raises(httpx.HTTPStatusError):
+        await check_username("someone", "127.0.0.1:8080", pool, rate_limiter=limiter)
+
+    assert limiter.throttled == 1
+    assert limiter.global_rate == 4
+    assert limiter._bucket("127.0.0.1:8080").reserve() > 25
@@ -0,0 +1,111 @@
+import os
+import sys
+import sqlite3
+import asyncio
+import pytest
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from scripts.db_manager import DBManager, ResultWriter, fetch_retry_usernames
+
+
+@pytest.mark.asyncio
+async def test_result_writer_batches_and_upserts(tmp_path):
+    db_path = str(tmp_path / "results.db")
+    db_manager = DBManager(db_path)
+    writer = ResultWriter(db_manager, batch_size=10, flush_interval=0.05)
+    writer.start()
+
+    for i in range(25):
+        writer.submit(f"user{i}", "taken")
+    writer.submit("user0", "available")
+    await asyncio.sleep(0.1)
+    await writer.close()
+    db_manager.close()
+
+    conn = sqlite3.connect(db_path)
+    assert conn.execute("SELECT COUNT(*) FROM results").fetchone()[0] == 25
+    assert conn.execute("SELECT status FROM results WHERE username='user0'").fetchone()[0] == 'available'
+    assert conn.execute("PRAGMA journal_mode").fetchone()[0] == 'wal'
+    conn.close()
+    assert writer.written == 26
+
+
+def test_summary_tables_follow_upserts_and_backfill_old_databases(tmp_path):
+    db_path = str(tmp_path / "results.db")
+    conn = sqlite3.connect(db_path)
+    conn.execute("CREATE TABLE results (username TEXT NOT NULL UNIQUE, status TEXT NOT NULL, checked_at TEXT NOT NULL)")
+    conn.executemany("INSERT INTO results VALUES (?, ?, ?)",
+                     [("old1", "taken", "2024-01-01T00:00:00"), ("old2", "available", "2024-01-01T00:00:01")])
+    conn.commit()
+    conn.close()
+
+    db_manager = DBManager(db_path)
+    run_id = db_manager.begin_run()
+    db_manager.save_results([("old1", "available", "2024-01-02T00:00:00"),
+                             ("new1", "taken", "2024-01-02T00:00:01")])
+    db_manager.finish_run()
+    db_manager.close()
+
+    conn = sqlite3.connect(db_path)
+    counts = dict(conn.execute("SELECT status, count FROM status_counts"))
+    assert counts == {"available": 2, "taken": 1}
+    assert counts == dict(conn.execute("SELECT status, COUNT(*) FROM results GROUP BY status"))
+    run = conn.execute("SELECT checked, available, taken, finished_at FROM run_stats WHERE run_id = ?",
+                       (run_id,)).fetchone()
+    assert run[:3] == (2, 1, 1) and run[3] is not None
+    plan = " ".join(row[-1] for row in conn.execute("EXPLAIN QUERY PLAN SELECT MAX(checked_at) FROM results"))
+    assert "idx_results_checked_at_username" in plan
+    conn.close()
+
+
+def test_backup_is_skipped_when_unchanged_and_full_check_is_scheduled(tmp_path, caplog):
+    db_path = str(tmp_path / "results.db")
+    first = DBManager(db_path, full_check_days=7)
+    first.save_results([("user1", "taken", "2024-01-01T00:00:00")])
+    first.close()
+
+    second = DBManager(db_path, full_check_days=7)
+    second.close()
+    backup = sqlite3.connect(db_path + ".bak")
+    assert backup.execute("SELECT username FROM results").fetchall() == [("user1",)]
+    backup.close()
+
+    import logging
+    with caplog.at_level(logging.INFO):
+        third = DBManager(db_path, full_check_days=7)
+        third.close()
+    assert "zaxiralash o'tkazib yuborildi" in caplog.text
+    assert "butunligi tekshiruvidan o'tdi" in caplog.text
+
+    conn = sqlite3.connect(db_path)
+    last_full = conn.execute("SELECT value FROM maintenance WHERE name = 'last_full_check'").fetchone()
+    conn.close()
+    assert last_full is not None
+
+
+@pytest.mark.asyncio
+async def test_failed_checks_go_to_retry_journal_until_a_result_arrives(tmp_path):
+    db_path = str(tmp_path / "results.db")
+    db_manager = DBManager(db_path)
+    writer = ResultWriter(db_manager, batch_size=10, flush_interval=0.05)
+    writer.start()
+    writer.submit("ok1", "taken")
+    writer.submit_failure("flaky", "2024-01-01T00:00:00")
+    writer.submit_failure("broken", "2024-01-01T00:00:01")
+    await writer.sync()
+    # Xato qatorlari ham ticket oladi: checkpoint ular jurnalga yozilgandan keyin o'tadi
+    assert writer.durable == writer.submitted == 3
+    assert fetch_retry_usernames(db_path) == ["flaky", "broken"]
+
+    writer.submit_failure("broken")
+    writer.submit("flaky", "available")
+    await writer.close()
+    db_manager.close()
+
+    assert fetch_retry_usernames(db_path) == ["broken"]
+    assert fetch_retry_usernames(db_path, max_attempts=2) == []
+    conn = sqlite3.connect(db_path)
+    assert conn.execute("SELECT COUNT(*) FROM results").fetchone()[0] == 2
+    assert dict(conn.execute("SELECT status, count FROM status_counts")) == {"available": 1, "taken": 1}
+    conn.close()
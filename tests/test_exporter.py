@@ -0,0 +1,58 @@
+import os
+import sys
+import csv
+import gzip
+import json
+import pytest
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from scripts.db_manager import DBManager
+from scripts.exporter import ResultExporter
+
+
+def test_incremental_export_resumes_from_watermark(tmp_path):
+    db_path = str(tmp_path / "results.db")
+    db_manager = DBManager(db_path)
+    db_manager.save_results([(f"user{i}", "taken" if i % 2 else "available", f"2024-01-01T00:00:{i:02d}")
+                             for i in range(10)])
+
+    exporter = ResultExporter(db_path, str(tmp_path / "export_state.json"), chunk_size=3)
+    first = str(tmp_path / "first.csv.gz")
+    exporter.export(first, fmt="csv", incremental=True, compress=True)
+    with gzip.open(first, 'rt') as f:
+        rows = list(csv.reader(f))
+    assert rows[0] == ["username", "status", "checked_at"]
+    assert [r[0] for r in rows[1:]] == [f"user{i}" for i in range(10)]
+
+    db_manager.save_results([("user3", "available", "2024-01-02T00:00:00"), ("late", "taken", "2024-01-02T00:00:01")])
+    db_manager.close()
+    second = str(tmp_path / "second.ndjson")
+    entry = exporter.export(second, fmt="ndjson", incremental=True)
+    with open(second) as f:
+        exported = [json.loads(line) for line in f]
+    assert [r["username"] for r in exported] == ["user3", "late"]
+    assert exported[0]["status"] == "available"
+    assert entry["username"] == "late" and entry["rows"] == 2
+
+    third = str(tmp_path / "third.ndjson")
+    assert exporter.export(third, fmt="ndjson", incremental=True)["rows"] == 0
+    assert not os.path.exists(third + ".tmp")
+
+
+def test_filtered_export_does_not_move_incremental_watermark(tmp_path):
+    db_path = str(tmp_path / "results.db")
+    db_manager = DBManager(db_path)
+    db_manager.save_results([(f"u{i}", "available" if i == 5 else "taken", f"2024-01-01T00:00:0{i}")
+                             for i in (1, 3, 5)])
+    db_manager.close()
+    exporter = ResultExporter(db_path, str(tmp_path / "export_state.json"))
+
+    # Filtrlangan, noinkremental eksport belgini siljitmaydi: keyingi inkremental eksport hamma qatorni oladi
+    exporter.export(str(tmp_path / "available.csv"), status="available")
+    assert exporter.export(str(tmp_path / "all.csv"), incremental=True)["rows"] == 3
+
+    with pytest.raises(ValueError):
+        exporter.export(str(tmp_path / "taken.csv"), incremental=True, status="taken")
+    entry = exporter.export(str(tmp_path / "taken.csv"), name="taken", incremental=True, status="taken")
+    assert entry["rows"] == 2 and entry["status"] == "taken"
@@ -0,0 +1,53 @@
+import os
+import sys
+import asyncio
+import pytest
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from scripts.http_client_pool import ClientPool
+
+
+@pytest.mark.asyncio
+async def test_reuses_one_client_per_proxy_with_keepalive_sized_to_connections():
+    pool = ClientPool(max_connections_per_proxy=20)
+    try:
+        async with pool.borrow("10.0.0.1:8080") as first:
+            async with pool.borrow("10.0.0.1:8080") as again:
+                assert again is first
+        async with pool.borrow("10.0.0.2:8080") as other:
+            assert other is not first
+        assert len(pool) == 2
+        assert pool.limits.max_keepalive_connections == 20
+    finally:
+        await pool.aclose()
+
+
+@pytest.mark.asyncio
+async def test_evicted_client_is_closed_only_after_last_borrower_returns():
+    pool = ClientPool(max_clients=1)
+    async with pool.borrow("10.0.0.1:8080") as busy:
+        # Ikkinchi proksi birinchisini LRU'dan chiqaradi, lekin u hali ishlatilmoqda
+        async with pool.borrow("10.0.0.2:8080") as newer:
+            await asyncio.sleep(0)
+            assert not busy.is_closed
+    await asyncio.sleep(0.01)
+    assert busy.is_closed
+    assert not newer.is_closed
+    assert len(pool) == 1
+
+    # Hech kim ishlatmayotgan klient chiqarilganda darhol yopiladi
+    async with pool.borrow("10.0.0.3:8080"):
+        pass
+    await asyncio.sleep(0.01)
+    assert newer.is_closed
+
+
+@pytest.mark.asyncio
+async def test_aclose_closes_pooled_and_retired_clients():
+    pool = ClientPool(max_clients=1)
+    async with pool.borrow("10.0.0.1:8080") as retired:
+        async with pool.borrow("10.0.0.2:8080") as pooled:
+            await pool.aclose()
+    assert retired.is_closed and pooled.is_closed
+    assert len(pool) == 0
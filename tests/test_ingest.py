@@ -0,0 +1,60 @@
+import os
+import sys
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import scripts.username_ingest as username_ingest
+from scripts.username_rules import clean_username, is_valid_username
+from scripts.username_source import CompiledUsernameSource, FileUsernameSource, open_username_source
+
+
+def test_instagram_username_rules():
+    assert is_valid_username("john.doe_1")
+    assert is_valid_username("a" * 30)
+    assert not is_valid_username("a" * 31)
+    assert not is_valid_username(".john")
+    assert not is_valid_username("john.")
+    assert not is_valid_username("jo..hn")
+    assert not is_valid_username("jo-hn")
+    assert not is_valid_username("")
+    assert clean_username("  @John.Doe \n") == "john.doe"
+
+
+def test_ingest_dedupes_with_external_sort_and_compiles(tmp_path, monkeypatch):
+    monkeypatch.setattr(username_ingest, "MAX_OPEN_RUNS", 2)
+    first = tmp_path / "a.txt"
+    second = tmp_path / "b.txt"
+    first.write_text("Zed\nalpha\nbad..name\nBeta\nalpha\n\n")
+    second.write_text("beta\nzed\ngamma\n.dot\ndelta\nALPHA\n")
+    output = str(tmp_path / "usernames.ulist")
+
+    stats = username_ingest.ingest([str(first), str(second)], output, chunk_size=2,
+                                   rejects_path=str(tmp_path / "rejects.txt"))
+
+    assert stats.as_dict() == {"read": 11, "invalid": 2, "duplicates": 4, "written": 5}
+    assert (tmp_path / "rejects.txt").read_text() == "bad..name\n.dot\n"
+    source = open_username_source(output)
+    assert isinstance(source, CompiledUsernameSource)
+    names = [name for _, name in source.iterate()]
+    assert names == ["alpha", "beta", "delta", "gamma", "zed"]
+    assert [p for p in os.listdir(tmp_path) if p.startswith("ingest-")] == []
+
+
+def test_compiled_source_resumes_and_splits_on_record_boundaries(tmp_path):
+    path = str(tmp_path / "names.txt")
+    with open(path, "w") as f:
+        f.write("\n".join(f"user{i:03d}" for i in range(100)))
+    output = str(tmp_path / "names.ulist")
+    username_ingest.ingest([path], output)
+    source = CompiledUsernameSource(output)
+
+    offsets = list(source.iterate())
+    resumed = [name for _, name in source.iterate(offsets[41][0])]
+    assert resumed[0] == "user042" and len(resumed) == 58
+    assert source.offset_after_lines(42) == offsets[41][0]
+
+    shards = source.split(3)
+    assert shards[0][0] == 32 and shards[-1][1] == source.size
+    names = [name for start, end in shards for _, name in source.iterate(start, end)]
+    assert names == [f"user{i:03d}" for i in range(100)]
+    assert isinstance(open_username_source(path), FileUsernameSource)
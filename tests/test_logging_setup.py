@@ -0,0 +1,58 @@
+import os
+import sys
+import gzip
+import json
+import logging
+import pytest
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from scripts.logging_setup import SamplingFilter, setup_logging, shutdown_logging
+
+
+def _record(level, sampled):
+    record = logging.LogRecord("scripts.username_checker", level, __file__, 1, "Tekshirilmoqda: %s", ("u",), None)
+    if sampled:
+        record.sampled = True
+    return record
+
+
+def test_sampling_keeps_errors_and_limits_per_username_events():
+    sampling = SamplingFilter(rate=5)
+    passed = [sampling.filter(_record(logging.INFO, True)) for _ in range(100)]
+    assert sum(passed) <= 10
+    assert all(sampling.filter(_record(logging.ERROR, True)) for _ in range(100))
+    assert all(sampling.filter(_record(logging.INFO, False)) for _ in range(100))
+
+
+@pytest.fixture
+def logging_env(monkeypatch):
+    monkeypatch.setenv("LOG_MAX_BYTES", "2000")
+    monkeypatch.setenv("LOG_BACKUP_COUNT", "3")
+    monkeypatch.delenv("LOG_ROTATE_WHEN", raising=False)
+    yield
+    shutdown_logging()
+
+
+def test_json_lines_and_compressed_rotation(tmp_path, logging_env):
+    log_file = tmp_path / "logs" / "checker.log"
+    assert setup_logging(str(log_file), str(tmp_path / "logs" / "errors.log"), log_format="json", sample_rate=0)
+    assert setup_logging() is False
+
+    log = logging.getLogger("scripts.test")
+    for i in range(100):
+        log.info("xabar %d", i, extra={"username": f"user{i}"})
+    try:
+        raise ValueError("buzildi")
+    except ValueError:
+        log.exception("xato")
+    shutdown_logging()
+
+    rotated = sorted(p.name for p in log_file.parent.glob("checker.log.*"))
+    assert rotated and all(name.endswith(".gz") for name in rotated)
+    with gzip.open(log_file.parent / rotated[0], 'rt') as f:
+        first = json.loads(f.readline())
+    assert first["message"].startswith("xabar") and first["username"].startswith("user")
+
+    errors = [json.loads(line) for line in (tmp_path / "logs" / "errors.log").read_text().splitlines()]
+    assert errors[-1]["level"] == "ERROR" and "ValueError" in errors[-1]["exception"]
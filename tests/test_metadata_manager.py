@@ -0,0 +1,128 @@
+import os
+import sys
+import json
+import sqlite3
+import pytest
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from scripts.db_manager import DBManager, ResultWriter
+from scripts.metadata_manager import CheckpointJournal, MetadataManager
+from scripts.username_source import FileUsernameSource
+
+
+class _FailingDB:
+    def __init__(self, fail_calls):
+        self.fail_calls = set(fail_calls)
+        self.calls = 0
+
+    def save_results(self, rows):
+        self.calls += 1
+        if self.calls in self.fail_calls:
+            raise sqlite3.OperationalError("database is locked")
+
+
+@pytest.mark.asyncio
+async def test_checkpoint_waits_for_database_commit(tmp_path):
+    metadata_path = str(tmp_path / "run_metadata.json")
+    db_manager = DBManager(str(tmp_path / "results.db"))
+    writer = ResultWriter(db_manager, batch_size=100, flush_interval=60)
+    writer.start()
+    metadata = MetadataManager(metadata_path)
+    journal = CheckpointJournal(metadata, writer, interval=60, every=1000)
+
+    writer.submit("user1", "taken")
+    # Natija hali bazaga yozilmagan: checkpoint navbatda qoladi
+    assert journal.record({"byte_offset": 6, "total_usernames_checked": 1}) is False
+    assert not os.path.exists(metadata_path)
+
+    assert await journal.finalize({"byte_offset": 6, "total_usernames_checked": 1}) is True
+    with open(metadata_path) as f:
+        assert json.load(f)["byte_offset"] == 6
+    assert not os.path.exists(metadata_path + ".tmp")
+    await writer.close()
+    db_manager.close()
+
+
+@pytest.mark.asyncio
+async def test_checkpoint_does_not_pass_failed_batch(tmp_path):
+    writer = ResultWriter(_FailingDB(fail_calls={1, 2}), batch_size=2, flush_interval=60, retries=2, retry_delay=0)
+    writer.start()
+    metadata = MetadataManager(str(tmp_path / "run_metadata.json"))
+    journal = CheckpointJournal(metadata, writer)
+
+    journal.record({"byte_offset": 0})
+    writer.submit("a", "taken")
+    writer.submit("b", "taken")
+    journal.record({"byte_offset": 10})
+    writer.submit("c", "taken")
+    await journal.finalize({"byte_offset": 15})
+    await writer.close()
+
+    # Birinchi paket yozilmadi: keyingi paket muvaffaqiyatli bo'lsa ham resume nuqtasi uning oldida qoladi
+    assert writer.failed == 2 and writer.written == 1
+    assert writer.durable == 0
+    assert metadata.get_metadata("byte_offset") == 0
+
+
+@pytest.mark.asyncio
+async def test_checkpoint_fsyncs_only_on_finalize(tmp_path, monkeypatch):
+    synced = []
+    monkeypatch.setattr(os, "fsync", lambda fd: synced.append(fd))
+    metadata_path = str(tmp_path / "run_metadata.json")
+    journal = CheckpointJournal(MetadataManager(metadata_path))
+
+    # Yozuvchisiz oraliq checkpoint'lar darhol saqlanadi, lekin fsync qilinmaydi
+    assert journal.record({"byte_offset": 6}) is True
+    assert journal.record({"byte_offset": 12}) is True
+    assert synced == []
+
+    assert await journal.finalize({"byte_offset": 18}) is True
+    assert len(synced) == 1
+    with open(metadata_path) as f:
+        assert json.load(f)["byte_offset"] == 18
+
+
+def _write_usernames(path, names):
+    path.write_text("".join(f"{name}\n" for name in names))
+    return FileUsernameSource(str(path))
+
+
+def test_resume_seeks_to_saved_byte_offset_after_reload(tmp_path):
+    names = [f"user{i:05d}" for i in range(10000)]
+    source = _write_usernames(tmp_path / "usernames.txt", names)
+    metadata_path = str(tmp_path / "run_metadata.json")
+    metadata = MetadataManager(metadata_path)
+    assert metadata.get_resume_offset(source) == 0
+    offset = len("user00000\n") * 9990
+    metadata.set_checkpoint(source.fingerprint(), offset, 9990)
+    metadata.save_metadata()
+
+    # Fingerprint fayl boshidagi 64 KB dan olinadi: oxiriga qator qo'shilsa ham ofset yaroqli qoladi
+    with open(source.path, "a") as f:
+        f.write("appended\n")
+    assert MetadataManager(metadata_path).get_resume_offset(source) == offset
+    assert [name for _, name in source.iterate(offset)] == names[9990:] + ["appended"]
+
+
+def test_resume_rejects_checkpoint_when_file_fingerprint_differs(tmp_path):
+    source = _write_usernames(tmp_path / "usernames.txt", ["alpha", "beta", "gamma"])
+    metadata = MetadataManager(str(tmp_path / "run_metadata.json"))
+    metadata.set_checkpoint(source.fingerprint(), len("alpha\n"), 1)
+
+    _write_usernames(tmp_path / "usernames.txt", ["other", "beta", "gamma"])
+    assert metadata.get_resume_offset(source) == 0
+    assert metadata.get_metadata("source_fingerprint") == source.fingerprint()
+    assert metadata.get_metadata("total_usernames_checked") == 0
+
+
+def test_resume_migrates_legacy_line_count_checkpoint(tmp_path):
+    source = _write_usernames(tmp_path / "usernames.txt", ["alpha", "beta", "gamma"])
+    metadata_path = tmp_path / "run_metadata.json"
+    # Ofset va fingerprint'siz eski format: faqat tekshirilgan qatorlar soni
+    metadata_path.write_text(json.dumps({"total_usernames_checked": 2, "status": "completed"}))
+    metadata = MetadataManager(str(metadata_path))
+
+    offset = metadata.get_resume_offset(source)
+    assert offset == len("alpha\nbeta\n")
+    assert [name for _, name in source.iterate(offset)] == ["gamma"]
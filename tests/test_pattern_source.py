@@ -0,0 +1,43 @@
+import os
+import sys
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from scripts.db_manager import DBManager
+from scripts.username_source import PatternUsernameSource, open_username_source
+
+
+def _write(path, text):
+    with open(path, 'w', encoding='utf-8') as f:
+        f.write(text)
+    return str(path)
+
+
+def test_pattern_source_is_ordered_and_resumable(tmp_path):
+    words = _write(tmp_path / "words.txt", "Cat\ndog\ncat\n")
+    path = _write(tmp_path / "names.patterns", "# izoh\n?d?d\nx?w\n")
+    source = PatternUsernameSource(path, wordlist_path=words)
+
+    assert source.size == 100 + 2
+    items = list(source.iterate())
+    assert items[0] == (1, "00") and items[99] == (100, "99")
+    assert items[100:] == [(101, "xcat"), (102, "xdog")]
+
+    # Pozitsiyadan davom ettirish va shard oraliqlari hamma nomzodni bir martadan qamrab oladi
+    assert list(source.iterate(57, 59)) == [(58, "57"), (59, "58")]
+    shards = [name for start, end in source.split(3) for _, name in source.iterate(start, end)]
+    assert shards == [name for _, name in items]
+
+
+def test_pattern_source_prunes_invalid_and_known_usernames(tmp_path):
+    db_path = str(tmp_path / "results.db")
+    DBManager(db_path).save_results([("ab", "taken", "2024-01-01T00:00:00")])
+    path = _write(tmp_path / "names.patterns", "?s?l\n?l?l\n")
+    source = open_username_source(path, db_path=db_path)
+
+    assert isinstance(source, PatternUsernameSource)
+    names = [name for _, name in source.iterate(0, 2 * 26 + 26)]
+    assert "_a" in names and ".a" not in names
+    assert "aa" in names and "ab" not in names
+    assert source.pruned_invalid == 26
+    assert source.pruned_existing == 1
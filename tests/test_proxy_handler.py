@@ -0,0 +1,98 @@
+import os
+import sys
+import time
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from scripts.proxy_handler import ProxyHandler
+
+
+def make_handler(tmp_path, proxies, cooldown_time=120):
+    proxies_path = tmp_path / "proxies.txt"
+    proxies_path.write_text("".join(f"{p}\n" for p in proxies))
+    return ProxyHandler(str(proxies_path), cooldown_time=cooldown_time)
+
+
+def test_each_ready_proxy_is_used_once_before_cooldown_fallback(tmp_path):
+    proxies = [f"10.0.0.{i}:8080" for i in range(20)]
+    handler = make_handler(tmp_path, proxies)
+
+    picked = [handler.get_random_proxy() for _ in range(20)]
+    assert sorted(picked) == sorted(proxies)
+
+    # Hammasi cooldown'da: eng uzoq ishlatilmagan proksi qaytariladi
+    assert handler.get_random_proxy() == picked[0]
+
+
+def test_cooled_down_proxy_returns_to_ready_pool(tmp_path):
+    handler = make_handler(tmp_path, ["10.0.0.1:8080", "10.0.0.2:8080"], cooldown_time=0.05)
+    first = handler.get_random_proxy()
+    second = handler.get_random_proxy()
+    assert {first, second} == {"10.0.0.1:8080", "10.0.0.2:8080"}
+    time.sleep(0.06)
+    assert handler.get_random_proxy() in {first, second}
+    assert len(handler._ready) == 1
+
+
+def test_banned_proxy_is_never_returned_and_appended_to_file(tmp_path):
+    handler = make_handler(tmp_path, ["10.0.0.1:8080", "10.0.0.2:8080"])
+    handler.mark_as_unusable("10.0.0.1:8080")
+
+    assert handler.usable_count == 1
+    assert {handler.get_random_proxy() for _ in range(5)} == {"10.0.0.2:8080"}
+    handler.mark_as_unusable("10.0.0.2:8080")
+    assert not handler.has_usable_proxies()
+    assert handler.get_random_proxy() is None
+    assert (tmp_path / "bad_proxies.txt").read_text() == "10.0.0.1:8080\n10.0.0.2:8080\n"
+
+
+def test_failing_proxy_opens_circuit_and_recovers_through_half_open(tmp_path):
+    handler = make_handler(tmp_path, ["10.0.0.1:8080", "10.0.0.2:8080"], cooldown_time=0)
+    handler.open_time = 0.05
+
+    for _ in range(handler.failure_threshold):
+        handler.report_failure("10.0.0.1:8080", "ConnectError")
+    assert handler.stats["10.0.0.1:8080"].state == 'open'
+    assert {handler.get_random_proxy() for _ in range(10)} == {"10.0.0.2:8080"}
+
+    time.sleep(0.06)
+    assert "10.0.0.1:8080" in {handler.get_random_proxy() for _ in range(20)}
+    assert handler.stats["10.0.0.1:8080"].state == 'half_open'
+    handler.report_success("10.0.0.1:8080", 0.2)
+    assert handler.stats["10.0.0.1:8080"].state == 'closed'
+    assert handler.usable_count == 2
+
+
+def test_stale_cooldown_entry_does_not_release_reused_proxy_early(tmp_path, monkeypatch):
+    clock = [1000.0]
+    monkeypatch.setattr(time, "time", lambda: clock[0])
+    handler = make_handler(tmp_path, ["10.0.0.1:8080"])
+    handler.sample_size = 1
+
+    proxy = handler.get_random_proxy()
+    for _ in range(handler.failure_threshold):
+        handler.report_failure(proxy, "ConnectError")
+    assert handler.stats[proxy].state == 'open'
+
+    # Circuit yopilgach (t+62) proksi half-open qaytadi va qayta ishlatiladi: yangi cooldown t+182 gacha
+    clock[0] += 62
+    assert handler.get_random_proxy() == proxy
+    assert handler.stats[proxy].state == 'half_open'
+
+    # Birinchi foydalanishdan qolgan t+120 yozuvi proksini muddatidan oldin tayyor ro'yxatga qaytarmaydi
+    clock[0] += 60
+    handler._release_cooled(clock[0])
+    assert handler._ready == []
+    clock[0] += 60
+    handler._release_cooled(clock[0])
+    assert handler._ready == [proxy]
+
+
+def test_stats_persist_between_runs(tmp_path):
+    handler = make_handler(tmp_path, ["10.0.0.1:8080"])
+    handler.report_success("10.0.0.1:8080", 0.3)
+    handler.save_stats()
+
+    restarted = make_handler(tmp_path, ["10.0.0.1:8080"])
+    assert restarted.stats["10.0.0.1:8080"].successes == 1
+    assert restarted.stats["10.0.0.1:8080"].latency < 1.0
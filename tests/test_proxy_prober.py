@@ -0,0 +1,79 @@
+import os
+import sys
+import socket
+import asyncio
+import pytest
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from scripts.local_http import LocalHTTPServer
+from scripts.proxy_handler import ProxyHandler
+from scripts.proxy_prober import ProxyProber, rank_live
+
+TEST_URL = "http://probe.test/robots.txt"
+
+
+async def _start_proxy(delay: float = 0.0, status: int = 200):
+    # Oddiy HTTP proksi kabi: so'rov "GET http://probe.test/robots.txt" ko'rinishida keladi
+    server = LocalHTTPServer("127.0.0.1", 0)
+
+    async def robots(request):
+        await asyncio.sleep(delay)
+        return status, b"User-agent: *", "text/plain"
+
+    server.route("GET", "/robots.txt", robots)
+    await server.start()
+    return server
+
+
+def _closed_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+@pytest.mark.asyncio
+async def test_probe_all_measures_latency_ranks_and_caches(tmp_path):
+    fast, slow, auth = await _start_proxy(), await _start_proxy(delay=0.2), await _start_proxy(status=407)
+    proxies = [f"127.0.0.1:{slow.port}", f"127.0.0.1:{fast.port}", f"127.0.0.1:{auth.port}",
+               f"127.0.0.1:{_closed_port()}"]
+    cache_path = str(tmp_path / "proxy_probe.json")
+    prober = ProxyProber(TEST_URL, timeout=2, concurrency=10, cache_path=cache_path)
+    try:
+        results = await prober.probe_all(proxies)
+    finally:
+        for server in (fast, slow, auth):
+            await server.close()
+
+    assert rank_live(results) == [f"127.0.0.1:{fast.port}", f"127.0.0.1:{slow.port}"]
+    assert results[proxies[0]]["ttfb"] >= 0.2 > results[proxies[1]]["ttfb"]
+    assert results[proxies[1]]["connect"] is not None
+    assert results[proxies[2]]["status"] == 407 and not results[proxies[2]]["alive"]
+    assert results[proxies[3]]["error"] == "ConnectError"
+
+    # Serverlar to'xtagan, lekin TTL tugamagan: natijalar keshdan olinadi
+    cached = await ProxyProber(TEST_URL, timeout=2, cache_path=cache_path).probe_all(proxies)
+    assert rank_live(cached) == rank_live(results)
+    # TTL tugagan yoki test manzili boshqa bo'lsa, qayta tekshiriladi
+    expired = await ProxyProber(TEST_URL, timeout=2, cache_path=cache_path, ttl=0).probe_all(proxies[:1])
+    assert not expired[proxies[0]]["alive"]
+    assert ProxyProber("http://other.test/", cache_path=cache_path).cached_results() == {}
+
+
+def test_proxy_handler_uses_only_live_probed_proxies(tmp_path):
+    proxies_path = tmp_path / "proxies.txt"
+    proxies_path.write_text("10.0.0.1:8080\n10.0.0.2:8080\n10.0.0.3:8080\n")
+    probe_results = {
+        "10.0.0.1:8080": {"alive": True, "ttfb": 0.3},
+        "10.0.0.2:8080": {"alive": False, "ttfb": None},
+    }
+    handler = ProxyHandler(str(proxies_path), probe_results=probe_results)
+    # Tekshirilmagan proksi qoladi, javob bermagani chetlatiladi
+    assert handler.proxies == {"10.0.0.1:8080", "10.0.0.3:8080"}
+    assert handler.stats["10.0.0.1:8080"].latency == 0.3
+    assert handler.stats["10.0.0.3:8080"].latency == 1.0
+
+    # Hech biri javob bermasa (masalan, test manzili o'zi ishlamasa), butun ro'yxat ishlatiladi
+    all_dead = {p: {"alive": False} for p in ("10.0.0.1:8080", "10.0.0.2:8080", "10.0.0.3:8080")}
+    handler = ProxyHandler(str(proxies_path), stats_path=str(tmp_path / "stats2.json"), probe_results=all_dead)
+    assert len(handler.proxies) == 3
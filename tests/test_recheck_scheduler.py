@@ -0,0 +1,49 @@
+import os
+import sys
+from datetime import datetime, timedelta
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from scripts.db_manager import DBManager
+from scripts.recheck_scheduler import RecheckScheduler
+
+
+def _ago(**kwargs) -> str:
+    return (datetime.now() - timedelta(**kwargs)).isoformat()
+
+
+def test_load_skips_only_results_within_their_status_ttl(tmp_path):
+    db_path = str(tmp_path / "results.db")
+    db_manager = DBManager(db_path)
+    db_manager.save_results([
+        ("fresh_free", "available", _ago(hours=1)),
+        ("stale_free", "available", _ago(hours=7)),
+        ("fresh_taken", "taken", _ago(days=29)),
+        ("stale_taken", "taken", _ago(days=31)),
+        ("odd_status", "unknown", _ago(minutes=1)),
+    ])
+    db_manager.close()
+
+    scheduler = RecheckScheduler({'available': timedelta(hours=6), 'taken': timedelta(days=30)})
+    assert scheduler.load(db_path) == 2
+
+    # TTL'i tugamagan username'lar tarmoqqa chiqmaydi, qolganlari (va TTL'siz status) qayta tekshiriladi
+    assert not scheduler.should_check("fresh_free")
+    assert not scheduler.should_check("fresh_taken")
+    assert scheduler.should_check("stale_free")
+    assert scheduler.should_check("stale_taken")
+    assert scheduler.should_check("odd_status")
+    assert scheduler.should_check("never_seen")
+    assert scheduler.skipped == 2
+
+
+def test_is_fresh_uses_per_status_ttl_and_missing_db_loads_nothing(tmp_path):
+    scheduler = RecheckScheduler({'available': timedelta(hours=6), 'taken': timedelta(days=30)})
+    now = datetime(2024, 6, 1, 12, 0)
+    assert scheduler.is_fresh('available', datetime(2024, 6, 1, 7, 0).isoformat(), now)
+    assert not scheduler.is_fresh('available', datetime(2024, 6, 1, 5, 0).isoformat(), now)
+    assert scheduler.is_fresh('taken', datetime(2024, 5, 5).isoformat(), now)
+    assert not scheduler.is_fresh('unknown', now.isoformat(), now)
+
+    assert scheduler.load(str(tmp_path / "missing.db")) == 0
+    assert len(scheduler) == 0
@@ -0,0 +1,32 @@
+import os
+import sys
+import json
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from scripts.db_manager import DBManager
+from scripts.report_manager import ReportManager
+
+TEMPLATES = os.path.join(os.path.dirname(__file__), '..', 'templates')
+
+
+def test_generate_pages_splits_by_status_and_first_letter(tmp_path):
+    db_path = str(tmp_path / "results.db")
+    db_manager = DBManager(db_path)
+    rows = [(f"a{i:02d}", "taken", "2024-01-01T00:00:00") for i in range(5)]
+    rows += [("b1", "taken", "2024-01-01T00:00:00"), ("_x", "available", "2024-01-01T00:00:00")]
+    db_manager.save_results(rows)
+    db_manager.close()
+
+    report_dir = ReportManager(db_path, templates_dir=TEMPLATES, page_size=2).generate_pages()
+
+    index = json.loads((tmp_path / "report" / "taken" / "a" / "index.json").read_text())
+    assert index["count"] == 5
+    assert [(p["first"], p["last"]) for p in index["pages"]] == [("a00", "a01"), ("a02", "a03"), ("a04", "a04")]
+    assert (tmp_path / "report" / "taken" / "a" / "page-0003.html").exists()
+    assert 'page-0002.html' in (tmp_path / "report" / "taken" / "a" / "page-0001.html").read_text()
+    assert "Keyingi" not in (tmp_path / "report" / "taken" / "a" / "page-0003.html").read_text()
+    assert (tmp_path / "report" / "available" / "u005f" / "page-0001.html").exists()
+    assert "b1" in (tmp_path / "report" / "taken" / "b" / "page-0001.html").read_text()
+    assert report_dir == str(tmp_path / "report")
+    assert not (tmp_path / "report.tmp").exists()
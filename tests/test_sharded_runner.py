@@ -0,0 +1,106 @@
+import os
+import sys
+import asyncio
+import logging
+import sqlite3
+import pytest
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from benchmarks.mock_server import MockConfig, MockServer
+from scripts.db_manager import DBManager, ResultWriter
+from scripts.metadata_manager import MetadataManager
+from scripts.sharded_runner import ShardCoordinator
+from scripts.username_source import FileUsernameSource
+
+
+def _source(tmp_path, count=300):
+    names = [f"user{i:04d}" for i in range(count)]
+    path = tmp_path / "usernames.txt"
+    path.write_text("".join(f"{name}\n" for name in names))
+    return FileUsernameSource(str(path)), names
+
+
+def _coordinator(tmp_path, source, shard_count, result_writer=None):
+    metadata = MetadataManager(str(tmp_path / "run_metadata.json"))
+    return ShardCoordinator(source, shard_count, metadata, result_writer, str(tmp_path / "proxies.txt"),
+                            str(tmp_path / "results.db"), worker_count=8,
+                            stats_path=str(tmp_path / "proxy_stats.json"), checkpoint_interval=0.2)
+
+
+def test_plan_splits_on_line_boundaries_and_keeps_saved_split_on_resume(tmp_path):
+    source, _ = _source(tmp_path)
+    coordinator = _coordinator(tmp_path, source, 3)
+    shards = coordinator.plan()
+    assert len(shards) == 3
+    assert shards[0]["start"] == 0 and shards[-1]["end"] == source.size
+    content = open(source.path, "rb").read()
+    for previous, shard in zip(shards, shards[1:]):
+        assert previous["end"] == shard["start"]
+        assert content[shard["start"] - 1:shard["start"]] == b"\n"
+
+    # Tugallanmagan ish boshqa --workers bilan davom ettirilsa ham oldingi bo'linish saqlanadi
+    shards[0]["offset"] = shards[0]["end"]
+    coordinator.metadata_manager.save_metadata()
+    resumed = _coordinator(tmp_path, source, 5)
+    assert resumed.plan() == shards
+    assert resumed.bytes_done == shards[0]["end"]
+
+    # Fayl o'zgargan bo'lsa, bo'linish va ofsetlar yangidan
+    with open(source.path, "r+") as f:
+        f.write("changed!")
+    fresh = _coordinator(tmp_path, source, 2).plan()
+    assert len(fresh) == 2 and all(s["offset"] == s["start"] for s in fresh)
+
+
+async def _run_shards(tmp_path, monkeypatch, config: MockConfig, source, done_shards):
+    server = MockServer(config)
+    await server.start()
+    (tmp_path / "proxies.txt").write_text("".join(f"127.0.0.1:{port}\n" for port in server.proxy_ports))
+    for key, value in {"INSTAGRAM_BASE_URL": f"http://127.0.0.1:{server.origin_port}", "PROXY_PROBE": "false",
+                       "RATE_LIMIT_GLOBAL": "1000", "RATE_LIMIT_PER_PROXY": "1000", "PROXY_COOLDOWN": "0",
+                       "PROXY_FAILURE_THRESHOLD": "1", "PROXY_MAX_TRIPS": "1"}.items():
+        monkeypatch.setenv(key, value)
+
+    db_manager = DBManager(str(tmp_path / "results.db"))
+    writer = ResultWriter(db_manager, batch_size=50, flush_interval=0.05)
+    writer.start()
+    coordinator = _coordinator(tmp_path, source, 3, writer)
+    shards = coordinator.plan()
+    for shard_id in done_shards:
+        shards[shard_id]["offset"] = shards[shard_id]["end"]
+    try:
+        await asyncio.wait_for(coordinator.run(), timeout=60)
+    finally:
+        await writer.close()
+        db_manager.close()
+        await server.close()
+    return coordinator
+
+
+@pytest.mark.asyncio
+async def test_resume_launches_only_unfinished_shards_and_forwards_child_logs(tmp_path, monkeypatch, caplog):
+    caplog.set_level(logging.INFO)
+    source, names = _source(tmp_path)
+    coordinator = await _run_shards(tmp_path, monkeypatch, MockConfig(proxies=2, latency_ms=1, page_kb=1),
+                                    source, done_shards=[0])
+
+    assert coordinator.launched == 2
+    assert all(shard["offset"] == shard["end"] for shard in coordinator.shards)
+    conn = sqlite3.connect(str(tmp_path / "results.db"))
+    checked = {row[0] for row in conn.execute("SELECT username FROM results")}
+    conn.close()
+    first_shard = {name for _, name in source.iterate(0, coordinator.shards[0]["end"])}
+    assert checked == set(names) - first_shard
+    # Bola jarayonlarning yozuvlari ota jarayon logger'lariga shard raqami bilan yetib keladi
+    assert {getattr(record, "shard", None) for record in caplog.records} >= {1, 2}
+
+
+@pytest.mark.asyncio
+async def test_exhaustion_is_detected_against_launched_shards(tmp_path, monkeypatch):
+    source, _ = _source(tmp_path)
+    coordinator = await _run_shards(tmp_path, monkeypatch, MockConfig(proxies=2, dead_proxies=2, latency_ms=1),
+                                    source, done_shards=[0])
+
+    assert coordinator.launched == 2
+    assert coordinator.exhausted_shards == coordinator.launched
@@ -0,0 +1,64 @@
+import os
+import sys
+import time
+import asyncio
+import pytest
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from scripts.local_http import LocalHTTPServer, json_response
+from scripts.telegram_notifier import TelegramNotifier
+
+
+async def _start_bot_api(delay: float = 0.0):
+    received = []
+    server = LocalHTTPServer("127.0.0.1", 0)
+
+    async def send_message(request):
+        await asyncio.sleep(delay)
+        received.append(request.body.decode())
+        return json_response({"ok": True})
+
+    server.route("POST", "/botTOKEN/sendMessage", send_message)
+    await server.start()
+    return server, received
+
+
+@pytest.mark.asyncio
+async def test_send_message_does_not_wait_for_slow_api():
+    server, received = await _start_bot_api(delay=0.5)
+    notifier = TelegramNotifier("TOKEN", "1", api_base=f"http://127.0.0.1:{server.port}", min_interval=0)
+    try:
+        started = time.monotonic()
+        assert notifier.send_message("salom") is True
+        assert time.monotonic() - started < 0.05
+        await notifier.aclose()
+    finally:
+        await server.close()
+    assert len(received) == 1 and "salom" in received[0]
+
+
+@pytest.mark.asyncio
+async def test_repeated_alerts_are_coalesced():
+    server, received = await _start_bot_api()
+    notifier = TelegramNotifier("TOKEN", "1", api_base=f"http://127.0.0.1:{server.port}",
+                                coalesce_window=60, min_interval=0)
+    try:
+        for _ in range(500):
+            notifier.send_message("Proksi ishlamayapti", key="proxy-failure")
+        notifier.send_message("Boshqa xabar")
+        await asyncio.sleep(0.2)
+        # Kalitsiz xabar darhol ketadi, birlashtirilgani esa oyna tugashini kutadi
+        assert len(received) == 1 and "Boshqa" in received[0]
+        await notifier.aclose()
+    finally:
+        await server.close()
+    assert len(received) == 2
+    assert "499" in received[1]
+    assert notifier.sent == 2
+
+
+def test_disabled_without_credentials(monkeypatch):
+    monkeypatch.delenv("TELEGRAM_BOT_TOKEN", raising=False)
+    monkeypatch.delenv("TELEGRAM_CHAT_ID", raising=False)
+    assert TelegramNotifier().send_message("salom") is False
@@ -0,0 +1,219 @@
+import os
+import sys
+import sqlite3
+import asyncio
+
+import httpx
+import pytest
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from scripts.db_manager import DBManager, ResultWriter, fetch_retry_usernames
+from scripts.lease_runner import LeaseCoordinator, LeaseNode
+from scripts.proxy_handler import ProxyHandler
+from scripts.rate_limiter import AdaptiveRateLimiter
+from scripts.response_classifier import MarkerClassifier
+from scripts.username_source import FileUsernameSource
+from scripts.work_leases import DONE, FAILED, PENDING, LeaseStore, MemoryLeaseStore, SQLiteLeaseStore
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+class _LockedOnceDB:
+    # Birinchi yozish "database is locked" bilan yiqiladi, keyingilari haqiqiy bazaga tushadi
+    def __init__(self, db_manager):
+        self.db_manager = db_manager
+        self.calls = 0
+
+    def save_results(self, rows):
+        self.calls += 1
+        if self.calls == 1:
+            raise sqlite3.OperationalError("database is locked")
+        self.db_manager.save_results(rows)
+
+
+async def _instagram(request):
+    await asyncio.sleep(0.002)
+    username = request.url.path.strip("/")
+    if username.startswith("broken"):
+        raise RuntimeError("proksi javobi buzilgan")
+    return httpx.Response(404 if username.startswith("free") else 200, content=b"<body>Profile</body>")
+
+
+def test_sqlite_store_reclaims_expired_lease_and_fences_old_owner(tmp_path):
+    clock = FakeClock()
+    store = SQLiteLeaseStore(str(tmp_path / "work.db"), clock=clock)
+    assert store.plan("sha1:a", [(0, 100), (100, 200)])
+    assert not store.plan("sha1:a", [(0, 50)])
+
+    first = store.claim("node-a", ttl=30)
+    second = store.claim("node-b", ttl=30)
+    assert (first.range_id, second.range_id) == (0, 1)
+    assert store.claim("node-c", ttl=30) is None
+    assert store.report(first, [("user1", "taken", "2024-01-01T00:00:00")], offset=40, ttl=30, checked=1)
+
+    # node-a heartbeat yubormay qoldi: muddat o'tgach oraliq saqlangan ofsetdan boshqa tugunga beriladi
+    clock.now += 31
+    assert store.report(second, [], offset=150, ttl=30)
+    reclaimed = store.claim("node-c", ttl=30)
+    assert (reclaimed.range_id, reclaimed.offset) == (0, 40)
+    assert not store.report(first, [("late", "taken", "2024-01-01T00:00:00")], offset=100, ttl=30)
+    assert not store.complete(first)
+
+    assert store.complete(reclaimed) and store.complete(second)
+    summary = store.summary()
+    assert summary[DONE] == 2 and summary["checked"] == 1
+    rows = store.fetch_results()
+    assert [row[1] for row in rows] == ["user1"]
+    store.ack_results(rows[-1][0])
+    assert store.fetch_results() == []
+
+
+@pytest.mark.parametrize("backend", ["memory", "sqlite"])
+def test_range_fails_after_max_attempts_and_can_be_retried_or_replanned(tmp_path, backend):
+    clock = FakeClock()
+    store = MemoryLeaseStore(clock=clock) if backend == "memory" else SQLiteLeaseStore(str(tmp_path / "work.db"), clock=clock)
+    store.plan("sha1:a", [(0, 100), (100, 200)])
+
+    # To'xtatish bilan qaytarilgan ijara urinish hisoblanmaydi
+    for _ in range(3):
+        assert store.release(store.claim("node-a", ttl=30, max_attempts=2), count_attempt=False)
+    first = store.claim("node-a", ttl=30, max_attempts=2)
+    assert first.range_id == 0 and store.release(first)
+    # Har safar tugunni qulatadigan oraliq: ikkinchi ijara ham muddati o'tib yo'qoladi
+    assert store.claim("node-b", ttl=30, max_attempts=2).range_id == 0
+    clock.now += 31
+    other = store.claim("node-c", ttl=30, max_attempts=2)
+    assert other.range_id == 1
+    assert store.complete(other)
+    assert store.claim("node-c", ttl=30, max_attempts=2) is None
+    summary = store.summary()
+    assert (summary[FAILED], summary[DONE], summary[PENDING]) == (1, 1, 0)
+
+    assert store.reset_failed() == 1
+    retried = store.claim("node-c", ttl=30, max_attempts=2)
+    assert retried.range_id == 0 and store.complete(retried)
+    assert store.summary()[DONE] == 2
+
+    # Tugallangan reja shu manba uchun faqat replan bilan qaytadan tuziladi
+    assert not store.plan("sha1:a", [(0, 200)])
+    assert store.plan("sha1:a", [(0, 200)], replan=True)
+    assert store.summary()[PENDING] == 1
+
+
+def test_lease_store_is_abstract():
+    class Partial(LeaseStore):
+        def fingerprint(self):
+            return None
+
+    with pytest.raises(TypeError):
+        Partial()
+
+
+@pytest.mark.asyncio
+async def test_nodes_share_ranges_and_take_over_crashed_lease(tmp_path, fake_pool):
+    names = [f"{'free' if i % 10 == 0 else 'user'}{i:04d}" for i in range(400)]
+    usernames_path = tmp_path / "usernames.txt"
+    usernames_path.write_text("".join(f"{name}\n" for name in names))
+    source = FileUsernameSource(str(usernames_path))
+    store = MemoryLeaseStore()
+
+    db_manager = DBManager(str(tmp_path / "results.db"))
+    writer = ResultWriter(db_manager, batch_size=100, flush_interval=0.05)
+    writer.start()
+    coordinator = LeaseCoordinator(store, source, writer, range_count=8, poll_interval=0.05)
+    coordinator.plan()
+    # Qulagan tugun: birinchi oraliqni oldi, lekin hech qachon heartbeat yubormaydi
+    store.claim("crashed", ttl=0.3)
+
+    proxies_path = tmp_path / "proxies.txt"
+    proxies_path.write_text("10.0.0.1:8080\n10.0.0.2:8080\n")
+    nodes = []
+    for node_id in ("node-a", "node-b"):
+        handler = ProxyHandler(str(proxies_path), cooldown_time=0, stats_path=str(tmp_path / f"{node_id}.json"))
+        limiter = AdaptiveRateLimiter(global_rate=1000, proxy_rate=1000, max_global_rate=1000, max_proxy_rate=1000)
+        nodes.append(LeaseNode(store, source, handler, fake_pool(_instagram), MarkerClassifier(), limiter, node_id,
+                               worker_count=8, lease_ttl=5, report_interval=0.05, idle_interval=0.05))
+
+    stop_event = asyncio.Event()
+    counters = await asyncio.wait_for(asyncio.gather(*(node.run(stop_event) for node in nodes)), timeout=10)
+    summary = await asyncio.wait_for(coordinator.run(stop_event), timeout=10)
+    await writer.close()
+    db_manager.close()
+
+    assert summary[DONE] == 8
+    assert all(c["ranges"] > 0 for c in counters)
+    assert sum(c["ranges"] for c in counters) == 8
+    requested = nodes[0].client_pool.requests + nodes[1].client_pool.requests
+    assert sorted(requested) == sorted(names)
+    conn = sqlite3.connect(str(tmp_path / "results.db"))
+    assert conn.execute("SELECT COUNT(*) FROM results").fetchone()[0] == 400
+    assert conn.execute("SELECT COUNT(*) FROM results WHERE status = 'available'").fetchone()[0] == 40
+    conn.close()
+
+
+@pytest.mark.asyncio
+async def test_failed_username_is_journaled_and_does_not_hold_back_range(tmp_path, fake_pool):
+    names = [f"user{i:03d}" for i in range(100)]
+    names[10] = "broken010"
+    usernames_path = tmp_path / "usernames.txt"
+    usernames_path.write_text("".join(f"{name}\n" for name in names))
+    source = FileUsernameSource(str(usernames_path))
+    store = MemoryLeaseStore()
+    db_manager = DBManager(str(tmp_path / "results.db"))
+    writer = ResultWriter(db_manager, batch_size=100, flush_interval=0.05)
+    writer.start()
+    coordinator = LeaseCoordinator(store, source, writer, range_count=1, poll_interval=0.05)
+    coordinator.plan()
+
+    proxies_path = tmp_path / "proxies.txt"
+    proxies_path.write_text("10.0.0.1:8080\n10.0.0.2:8080\n")
+    handler = ProxyHandler(str(proxies_path), cooldown_time=0, stats_path=str(tmp_path / "stats.json"))
+    limiter = AdaptiveRateLimiter(global_rate=1000, proxy_rate=1000, max_global_rate=1000, max_proxy_rate=1000)
+    node = LeaseNode(store, source, handler, fake_pool(_instagram), MarkerClassifier(), limiter, "node-a",
+                     worker_count=4, lease_ttl=5, report_interval=0.05, idle_interval=0.05)
+
+    stop_event = asyncio.Event()
+    counters = await asyncio.wait_for(node.run(stop_event), timeout=10)
+    summary = await asyncio.wait_for(coordinator.run(stop_event), timeout=10)
+    await writer.close()
+    db_manager.close()
+
+    # Bitta xato oraliqni qayta-qayta qaytarib yubormaydi: oraliq bir urinishda tugaydi
+    assert counters["ranges"] == 1 and counters["errors"] == 1
+    assert summary[DONE] == 1
+    assert node.client_pool.requests.count("broken010") == 1
+    assert fetch_retry_usernames(str(tmp_path / "results.db")) == ["broken010"]
+
+
+@pytest.mark.asyncio
+async def test_drain_acks_results_after_earlier_batch_failed(tmp_path):
+    usernames_path = tmp_path / "usernames.txt"
+    usernames_path.write_text("user1\nuser2\n")
+    store = MemoryLeaseStore()
+    db_manager = DBManager(str(tmp_path / "results.db"))
+    writer = ResultWriter(_LockedOnceDB(db_manager), batch_size=100, flush_interval=0.05, retries=1, retry_delay=0)
+    writer.start()
+    coordinator = LeaseCoordinator(store, FileUsernameSource(str(usernames_path)), writer, range_count=1)
+    coordinator.plan()
+    lease = store.claim("node-a", ttl=30)
+    store.report(lease, [("user1", "taken", "2024-01-01T00:00:00"), ("user2", "available", "2024-01-01T00:00:01")],
+                 offset=12, ttl=30, checked=2)
+
+    # Xato paket omborda qoladi; keyingi drain uni yozadi va tasdiqlaydi, garchi writer.durable joyida qolsa ham
+    assert await coordinator.drain() == 0
+    assert store.summary()["results_pending"] == 2
+    assert await coordinator.drain() == 2
+    assert store.summary()["results_pending"] == 0
+    await writer.close()
+
+    conn = sqlite3.connect(str(tmp_path / "results.db"))
+    assert conn.execute("SELECT COUNT(*) FROM results").fetchone()[0] == 2
+    conn.close()
+    db_manager.close()
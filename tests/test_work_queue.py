@@ -0,0 +1,60 @@
+import os
+import sys
+import asyncio
+import random
+import pytest
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from scripts.work_queue import WorkQueue
+
+
+@pytest.mark.asyncio
+async def test_keeps_workers_busy_and_tracks_watermark():
+    """
+    Barcha elementlar bajariladi, bir vaqtdagi ishlar soni worker sonidan oshmaydi
+    va watermark eng oxirgi uzluksiz tugallangan elementni ko'rsatadi.
+    """
+    in_flight = 0
+    peak = 0
+    results = {}
+
+    async def handler(item):
+        nonlocal in_flight, peak
+        in_flight += 1
+        peak = max(peak, in_flight)
+        await asyncio.sleep(random.uniform(0, 0.01))
+        in_flight -= 1
+        return item * 2
+
+    def on_result(item, result):
+        results[item] = result
+
+    queue = WorkQueue(worker_count=5)
+    await queue.run(range(100), handler, on_result)
+
+    assert results == {i: i * 2 for i in range(100)}
+    assert peak == 5
+    assert queue.watermark == 99
+
+
+@pytest.mark.asyncio
+async def test_stop_leaves_unfinished_items_behind_watermark():
+    async def handler(item):
+        if item == 3:
+            raise ValueError("xato")
+        return item
+
+    errors = []
+    queue = WorkQueue(worker_count=1)
+
+    def on_result(item, result):
+        if isinstance(result, Exception):
+            errors.append(item)
+            queue.stop()
+
+    await queue.run(iter(range(10)), handler, on_result)
+
+    assert errors == [3]
+    assert queue.watermark == 3
+    assert queue.completed == 4